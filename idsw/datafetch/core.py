@@ -11,6 +11,9 @@ Marco Cesar Prado Soares, Data Scientist Specialist @ Bayer Crop Science LATAM
 marcosoares.feq@gmail.com
 marco.soares@bayer.com"""
 
+import io
+import pickle
+import numbers
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -195,9 +198,14 @@ class AWSS3Connection:
                 # attention: even though strings may be seem as list of characters, that can be
                 # sliced, we cannot neither simply assign a character to a given position nor delete
                 # a character from a position.
+            
+            else:
+                self.path_to_store_imported_s3_bucket = path_to_store_imported_s3_bucket
 
 
     def get_credentials(self):
+
+        from getpass import getpass
             
         # Ask the user to provide the credentials:
         ACCESS_KEY = input("Enter your AWS Access Key ID here (in the right). It is the value stored in the field \'Access key ID\' from your AWS user credentials CSV file.")
@@ -278,7 +286,7 @@ class AWSS3Connection:
             # s3_path: path that the file should have in S3:
             self.s3_path = "" # empty string for the root directory
         
-        elif ((s3_obj_prefix == "/") | (s3_obj_prefix == '')):
+        elif ((self.s3_obj_prefix == "/") | (self.s3_obj_prefix == '')):
             
             self.s3_obj_prefix = None
             # The root directory in the bucket must not be specified starting with the slash
@@ -320,7 +328,7 @@ class AWSS3Connection:
             
             print("AWS Access Credentials, and bucket\'s prefix, object or subdirectory provided.\n")
 
-            return self
+        return self
     
 
     def connect_to_s3(self):
@@ -358,7 +366,7 @@ class AWSS3Connection:
             # Connect to the bucket specified as 'bucket_name'.
             # The bucket is started as the object 's3_bucket':
             self.s3_bucket = self.s3_client.Bucket(self.s3_bucket_name)
-            print(f"Connection with bucket \'{s3_bucket_name}\' stablished.\n")
+            print(f"Connection with bucket \'{self.s3_bucket_name}\' stablished.\n")
             
         except:
             
@@ -372,9 +380,18 @@ class AWSS3Connection:
 
         import os
 
-         # Then, let's obtain a list of all objects in the bucket (list bucket_objects):
+        # Then, let's obtain a list of all objects in the bucket (list bucket_objects).
+        # When a prefix is provided, S3 filters the keys on the server side, so only the
+        # objects from the prefix are listed (each listing request returns up to 1000 objects):
+        if (self.s3_obj_prefix is None):
+            bucket_objects = self.s3_bucket.objects.all()
+        else:
+            bucket_objects = self.s3_bucket.objects.filter(Prefix = self.s3_obj_prefix)
         
-        bucket_objects_list = [str(stored_obj.key) for stored_obj in self.s3_bucket.objects.all()]
+        # Store the size and the ETag returned by the listing for each object. They are used 
+        # for skipping the objects already copied to the workspace, with no extra request per object:
+        self.bucket_objects_info = {str(stored_obj.key): (stored_obj.size, stored_obj.e_tag) for stored_obj in bucket_objects}
+        bucket_objects_list = list(self.bucket_objects_info.keys())
 
         # Now get a list to store only the elements from bucket_objects_list that are not folders or directories
         # (objects with extensions).
@@ -406,25 +423,236 @@ class AWSS3Connection:
             # Slice the string stored_obj from position 0 (1st character) to position prefix_len - 1,
             # The position that the prefix should end: obj_name_first_part = (stored_obj)[0:(self.prefix_len)]
             # If this first part is the prefix, then append the object to list:
-            self.bucket_objects_list = [stored_obj for stored_obj in bucket_objects_list if ((stored_obj)[0:(self.prefix_len)] == (self.s3_obj_prefix))]
+            self.bucket_objects_list = [stored_obj for stored_obj in self.bucket_objects_list if ((stored_obj)[0:(self.prefix_len)] == (self.s3_obj_prefix))]
            
         # Now, bucket_objects_list contains the names of all objects from the bucket that must be copied.
 
         print("Finished mapping objects to fetch. Now, all these objects from S3 bucket will be copied to the notebook\'s workspace, in the specified directory.\n")
         print(f"A total of {len(self.bucket_objects_list)} files were found in the specified bucket\'s prefix (\'{self.s3_obj_prefix}\').")
-        print(f"The first file found is \'{self.bucket_objects_list[0]}\'; whereas the last file found is \'{self.bucket_objects_list[len(self.bucket_objects_list) - 1]}\'.")
+        
+        if (len(self.bucket_objects_list) > 0):
+            print(f"The first file found is \'{self.bucket_objects_list[0]}\'; whereas the last file found is \'{self.bucket_objects_list[len(self.bucket_objects_list) - 1]}\'.")
+            
+        return self
+
+
+    def set_transfer_config(self, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8):
+
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        # max_workers: number of objects transferred at the same time.
+        # max_concurrency: number of parts of a same object transferred at the same time.
+        # Objects larger than multipart_threshold_mb (in MB) are split into parts with
+        # multipart_chunksize_mb (in MB). When thousands of small objects are transferred, the
+        # latency of each request dominates, so many objects must be transferred in parallel.
+        if ((max_workers is None) | (max_workers < 1)):
+            max_workers = 1
+        
+        if ((max_concurrency is None) | (max_concurrency < 1)):
+            max_concurrency = 1
+
+        self.max_workers = int(max_workers)
+        self.max_concurrency = int(max_concurrency)
+        # Convert the sizes from MB to bytes:
+        self.multipart_threshold = int(multipart_threshold_mb * 1024 * 1024)
+        self.multipart_chunksize = int(multipart_chunksize_mb * 1024 * 1024)
+
+        # TransferConfig controls the multipart uploads performed by boto3:
+        # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/customizations/s3.html#boto3.s3.transfer.TransferConfig
+        self.transfer_config = TransferConfig(multipart_threshold = self.multipart_threshold, multipart_chunksize = self.multipart_chunksize, max_concurrency = self.max_concurrency, use_threads = True)
+
+        # boto3 resources (like s3_client and s3_bucket) are not thread-safe, whereas the low-level
+        # clients are. So, start a low-level client for the transfers, with a connections pool 
+        # large enough for all the parts that may be simultaneously transferred:
+        self.s3_transfer_client = boto3.client('s3', aws_access_key_id = self.ACCESS_KEY, aws_secret_access_key = self.SECRET_KEY, config = Config(max_pool_connections = (self.max_workers * self.max_concurrency)))
+
+        return self
+
+
+    def compute_local_etag(self, file_path, multipart = False):
+
+        import hashlib
+
+        # For objects uploaded in a single part, the S3 ETag is the MD5 of the file.
+        # For multipart uploads, it is the MD5 of the concatenated (binary) MD5s of the parts,
+        # followed by a hyphen and the number of parts. e.g. 'd41d8cd98f00b204e9800998ecf8427e-3'
+        # Read the file in blocks, so that large files are not fully loaded into memory.
+        if not (multipart):
+            
+            md5 = hashlib.md5()
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(1024 * 1024), b''):
+                    md5.update(block)
+            
+            return md5.hexdigest()
+        
+        parts_digests = b''
+        number_of_parts = 0
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(self.multipart_chunksize), b''):
+                parts_digests = parts_digests + hashlib.md5(block).digest()
+                number_of_parts = number_of_parts + 1
+        
+        return hashlib.md5(parts_digests).hexdigest() + '-' + str(number_of_parts)
+
+
+    def local_file_matches_s3_object(self, file_path, s3_size, s3_etag = None):
+
+        import os
+
+        # Check if a local file is identical to the S3 object, so that it does not need to be transferred.
+        if not (os.path.exists(file_path)):
+            return False
+        
+        local_size = os.path.getsize(file_path)
+        # The size is the cheapest check, so it is performed first:
+        if (local_size != s3_size):
+            return False
+        
+        if (s3_etag is None):
+            return True
+        
+        # ETags are returned by S3 within double quotes:
+        s3_etag = str(s3_etag).strip('"')
+
+        if ('-' in s3_etag):
+            # Multipart ETag. It can only be reproduced if the object was uploaded with the same part size.
+            number_of_parts = int(s3_etag.split('-')[-1])
+            # Ceiling division: number of parts that the file would have with the configured chunksize:
+            expected_number_of_parts = -(-local_size // self.multipart_chunksize)
+            
+            if (number_of_parts != expected_number_of_parts):
+                # The part size used in the upload is unknown, so only the size can be compared.
+                return True
+            
+            return (self.compute_local_etag(file_path, multipart = True) == s3_etag)
+        
+        return (self.compute_local_etag(file_path, multipart = False) == s3_etag)
+
+
+    def is_s3_permission_error(self, error):
+
+        # Errors returned by S3 (botocore ClientError) store the error code in the response. 
+        # Only the permission and credentials errors should show the IAM configuration guide:
+        error_response = getattr(error, 'response', None)
+        
+        if not (isinstance(error_response, dict)):
+            return False
+        
+        error_code = str(error_response.get('Error', {}).get('Code', ''))
+        
+        return (error_code in ['AccessDenied', '403', 'InvalidAccessKeyId', 'SignatureDoesNotMatch', 'AllAccessDisabled'])
+
+
+    def download_bucket_object(self, s3_key, file_path, s3_size, s3_etag = None):
+
+        import os
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        # The object is downloaded to a temporary file_path.part file, which is only renamed
+        # to file_path when the download is finished. So, an interrupted copy is never mistaken
+        # by a complete file. The file_path.part.progress file stores the ETag of the object
+        # (first line) and the indices of the parts already downloaded (following lines).
+        # If the transfer is interrupted, the next call resumes it from the missing bytes, 
+        # as long as the object was not modified in the bucket (same ETag).
+        part_path = file_path + '.part'
+        progress_path = file_path + '.part.progress'
+        s3_etag = str(s3_etag).strip('"')
+        # IfMatch makes S3 refuse the ranged requests if the object changed since it was listed, 
+        # so the bytes from different versions of the object are never mixed:
+        if_match = {'IfMatch': s3_etag} if (s3_etag != 'None') else {}
+
+        # Check if there is a previous transfer to resume:
+        completed_parts = set()
+        resume = False
+
+        if (os.path.exists(part_path) & os.path.exists(progress_path)):
+            
+            with open(progress_path, 'r') as progress_file:
+                progress_lines = progress_file.read().split()
+            
+            # The preallocated file of a multipart download must have the size of the object:
+            consistent_file = ((s3_size <= self.multipart_threshold) or (os.path.getsize(part_path) == s3_size))
+            
+            if ((len(progress_lines) > 0) and (progress_lines[0] == s3_etag) and (consistent_file)):
+                resume = True
+                completed_parts = set(int(part_index) for part_index in progress_lines[1:])
+        
+        if not (resume):
+            # Start a new transfer:
+            with open(progress_path, 'w') as progress_file:
+                progress_file.write(s3_etag + '\n')
+            
+            with open(part_path, 'wb') as part_file:
+                if (s3_size > self.multipart_threshold):
+                    # Preallocate the file, so that each part can be written in its own position:
+                    part_file.truncate(s3_size)
+
+        if (s3_size <= self.multipart_threshold):
+            # Single request. Resume from the bytes already stored in the .part file:
+            start = os.path.getsize(part_path)
+            
+            if (start > s3_size):
+                # Inconsistent file: restart the transfer.
+                open(part_path, 'wb').close()
+                start = 0
+
+            if (start < s3_size):
+                response = self.s3_transfer_client.get_object(Bucket = self.s3_bucket_name, Key = s3_key, Range = f"bytes={start}-", **if_match)
+                
+                with open(part_path, 'ab') as part_file:
+                    for block in response['Body'].iter_chunks(chunk_size = 1024 * 1024):
+                        part_file.write(block)
+        
+        else:
+            # Multipart download: each part is retrieved with a ranged request, and up to
+            # max_concurrency parts are downloaded at the same time.
+            parts_ranges = [(start, (min((start + self.multipart_chunksize), s3_size) - 1)) for start in range(0, s3_size, self.multipart_chunksize)]
+            pending_parts = [part_index for part_index in range(len(parts_ranges)) if (part_index not in completed_parts)]
+            # Lock for registering the finished parts on the progress file:
+            progress_lock = threading.Lock()
+
+            def download_part(part_index):
+                
+                start, stop = parts_ranges[part_index]
+                response = self.s3_transfer_client.get_object(Bucket = self.s3_bucket_name, Key = s3_key, Range = f"bytes={start}-{stop}", **if_match)
+                data = response['Body'].read()
+                
+                # Write the part in its position of the preallocated file:
+                with open(part_path, 'r+b') as part_file:
+                    part_file.seek(start)
+                    part_file.write(data)
+                
+                # Only register the part after it was written:
+                with progress_lock:
+                    with open(progress_path, 'a') as progress_file:
+                        progress_file.write(str(part_index) + '\n')
             
+            with ThreadPoolExecutor(max_workers = self.max_concurrency) as executor:
+                # list forces the iteration through the results, so that any exception is raised:
+                list(executor.map(download_part, pending_parts))
+
+        # Finished: make the copy available in the definitive path:
+        os.replace(part_path, file_path)
+        os.remove(progress_path)
+
         return self
 
 
-    def copy_bucket_files(self):
+    def copy_bucket_files(self, skip_unchanged_files = True):
 
         import os
+        from concurrent.futures import ThreadPoolExecutor, as_completed
         # Now, let's try copying the files:
             
         try:
             
-            self.objects_to_copy = [self.s3_bucket.Object(copied_object) for copied_object in self.bucket_objects_list]
+            if not (hasattr(self, 'transfer_config')):
+                # Use the default transfer configuration:
+                self = self.set_transfer_config()
 
             # Now, copy objects to the workspace:
             # Set the new file_path. Notice that by now, copied_object may be a string like:
@@ -440,18 +668,76 @@ class AWSS3Connection:
             # 2. Get the last element from this list. Since it has length len(object_path_list) and indexing starts from
             # zero, the index of the last element is (len(object_path_list) - 1):
             self.fetched_objects = [object_path_list[(len(object_path_list) - 1)] for object_path_list in objects_paths_lists]
+            # Objects with the same file name under different prefixes (e.g. 'a/x.csv' and 'b/x.csv') would be
+            # downloaded at the same time to the same file. For them, keep the relative path of the object instead 
+            # ('a/x.csv' and 'b/x.csv' inside the directory path_to_store_imported_s3_bucket):
+            fetched_objects_counts = {}
+            for fetched_object in self.fetched_objects:
+                fetched_objects_counts[fetched_object] = fetched_objects_counts.get(fetched_object, 0) + 1
+            
+            self.fetched_objects = [(os.path.join(*[directory for directory in object_path_list if (directory != '')]) if (fetched_objects_counts[fetched_object] > 1) else fetched_object) for fetched_object, object_path_list in zip(self.fetched_objects, objects_paths_lists)]
             # 3. Finally, join the string fetched_object with the new path (path on the notebook's workspace) to finish
             # The new object's file_path:
-            self.file_paths = [os.path.join(self.path_to_store_imported_s3_bucket, fetched_object) for fetched_object in fetched_objects]
+            self.file_paths = [os.path.join(self.path_to_store_imported_s3_bucket, fetched_object) for fetched_object in self.fetched_objects]
 
-            # Now, loop through the correspondents objects and paths to download them:
-            for selected_object, fetched_object, file_path in zip(self.objects_to_copy, self.fetched_objects, self.file_paths):
-                # Download the selected object to the workspace in the specified file_path
-                # The parameter Filename must be input with the path of the copied file, including its name and
-                # extension. Example Filename = "/my_table.xlsx" copies a xlsx file named 'my_table' to the notebook's main (root)
-                # directory
-                selected_object.download_file(Filename = file_path)
-                print(f"The file \'{fetched_object}\' was successfully copied to notebook\'s workspace.\n")
+            if (self.path_to_store_imported_s3_bucket != ""):
+                os.makedirs(self.path_to_store_imported_s3_bucket, exist_ok = True)
+
+            def copy_object(s3_key, fetched_object, file_path):
+                
+                s3_size, s3_etag = self.bucket_objects_info[s3_key]
+                
+                if ((skip_unchanged_files) and (self.local_file_matches_s3_object(file_path, s3_size, s3_etag))):
+                    # The file was already copied and did not change in the bucket:
+                    return fetched_object, False
+                
+                # Create the subdirectories of the objects that keep their relative paths:
+                if (os.path.dirname(file_path) != ""):
+                    os.makedirs(os.path.dirname(file_path), exist_ok = True)
+                
+                # Download the selected object to the workspace in the specified file_path,
+                # which includes the file name and its extension:
+                self.download_bucket_object(s3_key, file_path, s3_size, s3_etag)
+                
+                return fetched_object, True
+            
+            self.copied_files = []
+            self.skipped_files = []
+            self.failed_files = []
+
+            # Now, download the objects in parallel. The results are collected in the order the
+            # transfers finish:
+            with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+                
+                futures = {executor.submit(copy_object, s3_key, fetched_object, file_path): fetched_object for s3_key, fetched_object, file_path in zip(self.bucket_objects_list, self.fetched_objects, self.file_paths)}
+                
+                for future in as_completed(futures):
+                    
+                    try:
+                        fetched_object, copied = future.result()
+                    
+                    except Exception as transfer_error:
+                        if (self.is_s3_permission_error(transfer_error)):
+                            raise
+                        
+                        # e.g. the object changed in the bucket (the IfMatch precondition failed), or the disk is full.
+                        # The other files are still copied:
+                        self.failed_files.append(futures[future])
+                        print(f"Warning: the file \'{futures[future]}\' could not be copied. {type(transfer_error).__name__}: {transfer_error}\n")
+                        continue
+                    
+                    if (copied):
+                        self.copied_files.append(fetched_object)
+                        print(f"The file \'{fetched_object}\' was successfully copied to notebook\'s workspace.\n")
+                    else:
+                        self.skipped_files.append(fetched_object)
+
+            if (len(self.skipped_files) > 0):
+                print(f"{len(self.skipped_files)} files were not copied, since they were already in the workspace, with the same size and ETag as in the bucket.\n")
+            
+            if (len(self.failed_files) > 0):
+                print(f"Warning: {len(self.failed_files)} files could not be copied: {self.failed_files}. They are stored in the attribute failed_files of the connector.")
+                print("Run the function again to copy them: the interrupted downloads are resumed, and the objects modified in the bucket are downloaded again.\n")
 
             print("Finished copying the files from the bucket to the notebook\'s workspace. It may take a couple of minutes untill they be shown in SageMaker environment.\n") 
             print("Do not forget to delete these copies after finishing the analysis. They will remain stored in the bucket.\n")
@@ -547,10 +833,35 @@ class AWSS3Connection:
         return self
     
 
-    def fetch_s3_files_pipeline (self):
+    def map_s3_uris(self):
+
+        # Lazy mode: instead of copying the objects to the workspace, store their S3 addresses.
+        # They can be directly read by load_pandas_dataframe (or opened with open_s3_object), 
+        # which only fetch the accessed bytes.
+        self.s3_uris = [f"s3://{self.s3_bucket_name}/{s3_key}" for s3_key in self.bucket_objects_list]
+
+        print("Lazy mode: the objects were not copied to the workspace. Read them directly from S3 by passing their addresses to load_pandas_dataframe.")
+        print(f"e.g. load_pandas_dataframe(file_directory_path = \'s3://{self.s3_bucket_name}\', file_name_with_extension = \'prefix/file_name.ext\')\n")
+        
+        if (len(self.s3_uris) > 0):
+            print(f"The first object address is \'{self.s3_uris[0]}\'. All the addresses are stored in the attribute s3_uris of the connector (Connectors.aws_s3_connector.s3_uris).\n")
+        
+        return self
+    
+
+    def lazy_s3_files_pipeline (self):
+
+        self = self.map_bucket_contents()
+        self = self.map_s3_uris()
+
+        return self
+    
+
+    def fetch_s3_files_pipeline (self, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8, skip_unchanged_files = True):
 
         self = self.map_bucket_contents()
-        self = self.copy_bucket_files()
+        self = self.set_transfer_config(max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb)
+        self = self.copy_bucket_files(skip_unchanged_files)
 
         return self
     
@@ -624,27 +935,77 @@ class AWSS3Connection:
         return self
     
 
-    def export_files(self):
-        
-        # Now, loop through all elements i from the lists.
-        # The first elements of the lists have index 0; the last elements have index
-        # total_of_files - 1, since there are 'total_of_files' elements:
+    def export_files(self, skip_unchanged_files = True):
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from botocore.exceptions import ClientError
         
-        # Then, export the correspondent element to S3:
+        # Now, export each element from the lists to the correspondent S3 path.
+        # The files are uploaded in parallel; files larger than the multipart threshold 
+        # are uploaded in parts, by boto3 transfer manager.
         
         try:
 
-            s3_objects = [self.s3_bucket.Object(S3_FILE_PATH) for S3_FILE_PATH in s3_full_paths]
+            if not (hasattr(self, 'transfer_config')):
+                # Use the default transfer configuration:
+                self = self.set_transfer_config()
 
-            # Now, loop through the correspondents objects and paths to download them:
-            for new_s3_object, uploaded_object, PATH_IN_WORKSPACE in zip(self.s3_objects, self.list_of_file_names_with_extensions, self.workspace_full_paths):
+            def export_file(S3_FILE_PATH, uploaded_object, PATH_IN_WORKSPACE):
+                
+                if (skip_unchanged_files):
+                    try:
+                        # Check if the object is already in the bucket:
+                        s3_object_head = self.s3_transfer_client.head_object(Bucket = self.s3_bucket_name, Key = S3_FILE_PATH)
+                        
+                        if (self.local_file_matches_s3_object(PATH_IN_WORKSPACE, s3_object_head['ContentLength'], s3_object_head['ETag'])):
+                            return uploaded_object, False
+                    
+                    except ClientError:
+                        # The object is not in the bucket yet.
+                        pass
+                
                 # Upload the selected object from the workspace path PATH_IN_WORKSPACE
                 # to the S3 path specified as S3_FILE_PATH.
                 # The parameter Filename must be input with the path of the copied file, including its name and
                 # extension. Example Filename = "/my_table.xlsx" exports a xlsx file named 'my_table' to the notebook's main (root)
                 # directory
-                new_s3_object.upload_file(Filename = PATH_IN_WORKSPACE)
-                print(f"The file \'{uploaded_object}\' was successfully exported from notebook\'s workspace to AWS Simple Storage Service (S3).\n")
+                self.s3_transfer_client.upload_file(Filename = PATH_IN_WORKSPACE, Bucket = self.s3_bucket_name, Key = S3_FILE_PATH, Config = self.transfer_config)
+                
+                return uploaded_object, True
+            
+            self.exported_files = []
+            self.skipped_files = []
+            self.failed_files = []
+
+            with ThreadPoolExecutor(max_workers = self.max_workers) as executor:
+                
+                futures = {executor.submit(export_file, S3_FILE_PATH, uploaded_object, PATH_IN_WORKSPACE): uploaded_object for S3_FILE_PATH, uploaded_object, PATH_IN_WORKSPACE in zip(self.s3_full_paths, self.list_of_file_names_with_extensions, self.workspace_full_paths)}
+
+                for future in as_completed(futures):
+                    
+                    try:
+                        uploaded_object, exported = future.result()
+                    
+                    except Exception as transfer_error:
+                        if (self.is_s3_permission_error(transfer_error)):
+                            raise
+                        
+                        # e.g. the file is missing in the workspace. The other files are still exported:
+                        self.failed_files.append(futures[future])
+                        print(f"Warning: the file \'{futures[future]}\' could not be exported. {type(transfer_error).__name__}: {transfer_error}\n")
+                        continue
+                    
+                    if (exported):
+                        self.exported_files.append(uploaded_object)
+                        print(f"The file \'{uploaded_object}\' was successfully exported from notebook\'s workspace to AWS Simple Storage Service (S3).\n")
+                    else:
+                        self.skipped_files.append(uploaded_object)
+            
+            if (len(self.skipped_files) > 0):
+                print(f"{len(self.skipped_files)} files were not exported, since they were already in the bucket, with the same size and ETag as in the workspace.\n")
+            
+            if (len(self.failed_files) > 0):
+                print(f"Warning: {len(self.failed_files)} files could not be exported: {self.failed_files}. They are stored in the attribute failed_files of the connector.\n")
                 
             print("Finished exporting the files from the the notebook\'s workspace to S3 bucket. It may take a couple of minutes untill they be shown in S3 environment.\n") 
             print("Do not forget to delete these copies after finishing the analysis. They will remain stored in the bucket.\n")
@@ -733,261 +1094,647 @@ class AWSS3Connection:
         return self
 
 
-    def export_to_s3_pipeline(self, list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export = None):
+    def export_to_s3_pipeline(self, list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export = None, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8, skip_unchanged_files = True):
 
         self = self.set_directory_to_export(directory_of_notebook_workspace_storing_files_to_export)
         self = self.set_files_to_export(list_of_file_names_with_extensions)
-        self = self.export_files()
+        self = self.set_transfer_config(max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb)
+        self = self.export_files(skip_unchanged_files)
 
         return self
 
 
-class IP21Extractor:
+class S3BlockCache:
+    """
+    Least recently used (LRU) cache of the blocks of bytes fetched from S3 objects through ranged requests. 
+    It is shared by all the S3RangedFile objects, so repeated reads of the same regions of an object (like
+    the footer of a Parquet file) do not fetch them again.
     """
-    Class for extracting information from Aspentech IP21 database.
-    def __init__ (self, tag_to_extract = None, actual_tag_name = None, ip21_server = None, 
-                data_source = 'localhost', start_timestamp = None, stop_timestamp = None, ip21time_array = [], 
-                previous_df_for_concatenation = None, username = None, password = None):  
-    """    
 
-    # Initialize instance attributes.
-    # define the Class constructor, i.e., how are its objects:
+    def __init__ (self, cache_size_mb = 256, cache_directory = None):
+
+        import threading
+        from collections import OrderedDict
+
+        # cache_size_mb: maximum size (in MB) of the blocks kept in memory.
+        # cache_directory: if a directory is declared, the blocks are also stored on the disk, 
+        # so that they are reused in other sessions.
+        self.max_cache_bytes = int(cache_size_mb * 1024 * 1024)
+        self.cache_directory = cache_directory
+        # The keys are tuples (bucket, key, ETag, block_size, block_index); the values are the bytes.
+        # The ETag in the key guarantees that the blocks of a modified object are never reused.
+        self.blocks = OrderedDict()
+        self.cached_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if (cache_directory is not None):
+            import os
+            os.makedirs(cache_directory, exist_ok = True)
+    
 
-    def __init__ (self, previous_df_for_concatenation):
-        
-        # If the user passes the argument, use them. Otherwise, use the standard values.
-        # Set the class objects' attributes.
-        # Suppose the object is named assistant. We can access the attribute as:
-        # assistant.assistant_startup, for instance.
-        # So, we can save the variables as objects' attributes.
+    def get_block_file_path(self, block_key):
+
+        import os
+        import hashlib
+
+        # Name the file with the hash of the block key, since S3 keys may contain slashes:
+        block_hash = hashlib.sha256(str(block_key).encode('utf-8')).hexdigest()
         
-        # Check if there is a previous dataset for concatenating with new data:
-        self.dataset = previous_df_for_concatenation
-                
-        # Define the class methods.
-        # All methods must take an object from the class (self) as one of the parameters
-        error_msg = """If ModuleNotFoundError is raised, run the following commands to install requests and requests_ntlm packages, which are not required for running IDSW
-                    
-                                                ! pip install requests
-                                                ! pip install requests_ntlm
+        return os.path.join(self.cache_directory, f"{block_hash}.block")
+    
 
-                """
-        print(error_msg)
+    def get_block(self, block_key):
 
+        import os
 
-    def get_credentials (self, server, data_source, username, password):
-     
-        from getpass import getpass
-        
-        if (username is None):
+        with self.lock:
             
-            username = input("Enter your username: ")
+            if (block_key in self.blocks):
+                # Mark the block as the most recently used:
+                self.blocks.move_to_end(block_key)
+                self.hits = self.hits + 1
+                
+                return self.blocks[block_key]
+        
+        if (self.cache_directory is not None):
             
-        if (password is None):
+            block_file_path = self.get_block_file_path(block_key)
             
-            password = getpass("Enter your password: ")
-        
-        # Remove trailing whitespaces:
-        username = str(username).strip()
-        password = str(password).strip()
-        
-        if (data_source is None):
-            data_source = 'localhost'
-        
-        # Attention: do not include http:// in the server, only the server name
-        # (what appears after http://)
-        self.server = ip21_server
+            if (os.path.exists(block_file_path)):
+                
+                with open(block_file_path, 'rb') as block_file:
+                    block = block_file.read()
+                
+                self.store_block(block_key, block, persist = False)
+                with self.lock:
+                    self.hits = self.hits + 1
+                
+                return block
         
-        # If no specific data source is provided, use 'localhost'
-        self.data_source = data_source
+        with self.lock:
+            self.misses = self.misses + 1
         
-        # Create an attribute that checks if another API call is needed:
-        self.need_next_call = True
-       
-
-        return self
+        return None
     
 
-    def set_query_parameters (self, tag_to_extract = None, actual_tag_name = None, start_timestamp = None, stop_timestamp = None, ip21time_array = [], previous_df_for_concatenation = None):
-
-        self.tag = tag_to_extract
-        # If actual_tag_name is None, make it equal to the tag:
-        if (actual_tag_name is None):
-            actual_tag_name = tag_to_extract
-        
-        self.actual_tag_name = actual_tag_name
-        
-        self.start_timestamp = start_timestamp
-        self.start_ip21_scale = np.nan # float, instead of None object
-        self.stop_timestamp = stop_timestamp
-        self.stop_ip21_scale = np.nan # float, instead of None object
-        
-        if (ip21time_array is None):
-            ip21time_array = []
-        
-        self.ip21time_array = np.array(ip21time_array)
+    def store_block(self, block_key, block, persist = True):
 
-        return self
-    
+        import os
 
-    def convert_window_to_ip21_timescale (self):
-        
-        start_timestamp = self.start_timestamp 
-        stop_timestamp = self.stop_timestamp
-        
-        # Pick the closest reference timestamp:
-        if (start_timestamp >= pd.Timestamp('06-21-2022 0:00:00.001', unit = 'ns')):
-            
-            reference = pd.Timestamp('06-21-2022 0:00:00.001', unit = 'ns')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1655780400001
-        
-        elif (start_timestamp >= pd.Timestamp('06-21-2022', unit = 'd')):
-            
-            reference = pd.Timestamp('06-21-2022', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1655780400000
-        
-        elif (start_timestamp >= pd.Timestamp('06-20-2022', unit = 'd')):
+        with self.lock:
             
-            reference = pd.Timestamp('06-20-2022', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1655694000000
-        
-        elif (start_timestamp >= pd.Timestamp('01-01-2018', unit = 'd')):
-            
-            reference = pd.Timestamp('01-01-2018', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1514772000000
+            if (block_key not in self.blocks):
+                
+                self.blocks[block_key] = block
+                self.cached_bytes = self.cached_bytes + len(block)
+                
+                # Remove the least recently used blocks (the first ones) until the cache fits its size:
+                while ((self.cached_bytes > self.max_cache_bytes) & (len(self.blocks) > 1)):
+                    removed_key, removed_block = self.blocks.popitem(last = False)
+                    self.cached_bytes = self.cached_bytes - len(removed_block)
         
-        elif (start_timestamp >= pd.Timestamp('01-01-2000', unit = 'd')):
+        if ((persist) & (self.cache_directory is not None)):
             
-            reference = pd.Timestamp('01-01-2000', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 946692000000
-        
-        elif (start_timestamp >= pd.Timestamp('01-01-1970', unit = 'd')):
+            block_file_path = self.get_block_file_path(block_key)
+            # Write to a temporary file and rename it, so that a partially written block is never read:
+            with open(block_file_path + '.tmp', 'wb') as block_file:
+                block_file.write(block)
             
-            reference = pd.Timestamp('01-01-1970', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 10800000
-        
-        else:
-            # Use the lowest timestamp:
-            reference = pd.Timestamp('01-01-1960', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = -315608400000
-            
-        
-        # Convert the start timestamp:
-        start_timedelta = start_timestamp - reference
-        # apply the delta method to convert to nanoseconds:
-        # The .delta attribute was replaced by .value attribute. 
-        # Both return the number of nanoseconds as an integer.
-        # https://pandas.pydata.org/docs/reference/api/pandas.Timedelta.html
-        start_timedelta = start_timedelta.value
-        # 1ms = 10^-3 s, 1ns = 10^-9 s, so 1 ns = 1ms/(10^6)
-        # Divide by 10^6 to obtain the total of milliseconds:
-        start_timedelta = start_timedelta/(10**6)
-        # Sum with the reference value in IP21 scale to obtain the converted timestamp:
-        start_ip21_scale = reference_ip21 + start_timedelta
-        # Guarantee that the number is an integer:
-        # np.rint rounds to the nearest integer, whereas int to convert to integer:
-        start_ip21_scale = int(np.rint(start_ip21_scale))
-        
-        # Convert the stop timestamp:
-        stop_timedelta = stop_timestamp - reference
-        # apply the delta method to convert to nanoseconds:
-        stop_timedelta = stop_timedelta.value
-        # Divide by 10^6 to obtain the total of milliseconds:
-        stop_timedelta = stop_timedelta/(10**6)
-        # Sum with the reference value in IP21 scale to obtain the converted timestamp:
-        stop_ip21_scale = reference_ip21 + stop_timedelta
-        # Guarantee that the number is an integer:
-        # np.rint rounds to the nearest integer, whereas int to convert to integer:
-        stop_ip21_scale = int(np.rint(stop_ip21_scale))
-        
-        # Update the attributes:
-        self.start_ip21_scale = start_ip21_scale
-        self.stop_ip21_scale = stop_ip21_scale
+            os.replace(block_file_path + '.tmp', block_file_path)
         
         return self
-            
+    
+
+    def clear(self):
+
+        with self.lock:
+            self.blocks.clear()
+            self.cached_bytes = 0
         
-    def convert_ip21_timescale_array_to_timestamp (self):
+        return self
+
+
+class S3RangedFile (io.RawIOBase):
+    """
+    Read-only, seekable file-like object for an S3 object. Instead of copying the whole object to the disk,
+    only the accessed blocks of bytes are fetched, through ranged GET requests, and kept in the S3BlockCache.
+    Since it can be passed to pandas and pyarrow readers as a regular file, a Parquet file read with a column 
+    selection only fetches its footer and the chunks of the selected columns.
+    """
+
+    def __init__ (self, s3_client, bucket_name, s3_key, block_size_mb = 4, block_cache = None):
+
+        # s3_client: boto3 low-level client (boto3.client('s3')), which is thread-safe.
+        # block_size_mb: size (in MB) of the blocks fetched by each request. Small blocks avoid fetching
+        # unneeded bytes; large blocks reduce the number of requests in sequential reads.
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.block_size = int(block_size_mb * 1024 * 1024)
+
+        if (block_cache is None):
+            block_cache = S3BlockCache()
+        
+        self.block_cache = block_cache
+
+        # A single HEAD request retrieves the size and the ETag of the object:
+        s3_object_head = self.s3_client.head_object(Bucket = bucket_name, Key = s3_key)
+        self.size = int(s3_object_head['ContentLength'])
+        self.s3_etag = str(s3_object_head['ETag']).strip('"')
+        self.position = 0
+        # Counters of the requests and bytes actually fetched from S3:
+        self.requests_count = 0
+        self.fetched_bytes = 0
+    
+
+    def __repr__ (self):
+
+        return f"s3://{self.bucket_name}/{self.s3_key}"
+    
+
+    def readable(self):
+        return True
+    
+
+    def seekable(self):
+        return True
+    
+
+    def tell(self):
+        return self.position
+    
+
+    def seek(self, offset, whence = io.SEEK_SET):
+
+        if (whence == io.SEEK_SET):
+            self.position = offset
+        elif (whence == io.SEEK_CUR):
+            self.position = self.position + offset
+        elif (whence == io.SEEK_END):
+            self.position = self.size + offset
+        else:
+            raise InvalidInputsError ("whence must be io.SEEK_SET (0), io.SEEK_CUR (1) or io.SEEK_END (2).")
         
-        # Convert to Pandas series:
-        ip21time_window = pd.Series(self.ip21time_array)
-        # Guarantee that the series is sorted ascendingly:
-        #https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.Series.sort_values.html
-        ip21time_window = ip21time_window.sort_values(ascending = True)
-        # Get the first ip21 time from the series:
-        start_ip21_scale = ip21time_window[0]
+        self.position = max(0, self.position)
         
-        # Pick the closest reference timestamp:
-        if (start_ip21_scale >= 1655780400001):
+        return self.position
+    
+
+    def get_blocks(self, first_block, last_block):
+
+        # Retrieve the blocks from first_block to last_block (including it).
+        # Consecutive blocks missing from the cache are fetched by a single ranged request.
+        blocks = {}
+        missing_blocks = []
+
+        for block_index in range(first_block, (last_block + 1)):
             
-            reference = pd.Timestamp('06-21-2022 0:00:00.001', unit = 'ns')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1655780400001
-        
-        elif (start_ip21_scale >= 1655780400000):
+            block = self.block_cache.get_block((self.bucket_name, self.s3_key, self.s3_etag, self.block_size, block_index))
             
-            reference = pd.Timestamp('06-21-2022', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1655780400000
+            if (block is None):
+                missing_blocks.append(block_index)
+            else:
+                blocks[block_index] = block
         
-        elif (start_ip21_scale >= 1655694000000):
-            
-            reference = pd.Timestamp('06-20-2022', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1655694000000
+        # Group the missing blocks into runs of consecutive indices:
+        runs = []
+        for block_index in missing_blocks:
+            if ((len(runs) > 0) and (runs[-1][-1] == (block_index - 1))):
+                runs[-1].append(block_index)
+            else:
+                runs.append([block_index])
         
-        elif (start_ip21_scale >= 1514772000000):
+        for run in runs:
             
-            reference = pd.Timestamp('01-01-2018', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 1514772000000
+            start = run[0] * self.block_size
+            stop = min(((run[-1] + 1) * self.block_size), self.size) - 1
+            # IfMatch guarantees that all the blocks come from the same version of the object:
+            response = self.s3_client.get_object(Bucket = self.bucket_name, Key = self.s3_key, Range = f"bytes={start}-{stop}", IfMatch = self.s3_etag)
+            data = response['Body'].read()
+            self.requests_count = self.requests_count + 1
+            self.fetched_bytes = self.fetched_bytes + len(data)
+
+            for block_index in run:
+                
+                block_start = (block_index * self.block_size) - start
+                block = data[block_start:(block_start + self.block_size)]
+                self.block_cache.store_block((self.bucket_name, self.s3_key, self.s3_etag, self.block_size, block_index), block)
+                blocks[block_index] = block
         
-        elif (start_ip21_scale >= 946692000000):
-            
-            reference = pd.Timestamp('01-01-2000', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 946692000000
+        return blocks
+    
+
+    def readinto(self, buffer):
+
+        # Read up to len(buffer) bytes from the current position into the (pre-allocated) buffer.
+        # All the other reading methods from io.RawIOBase (read, readall, readline) rely on this one.
+        if (self.position >= self.size):
+            return 0
         
-        elif (start_ip21_scale >= 10800000):
-            
-            reference = pd.Timestamp('01-01-1970', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = 10800000
+        number_of_bytes = min(len(buffer), (self.size - self.position))
         
-        else:
-            # Use the lowest timestamp:
-            reference = pd.Timestamp('01-01-1960', unit = 'd')
-            # reference timestamp in IP21 scale:
-            reference_ip21 = -315608400000
+        if (number_of_bytes <= 0):
+            return 0
         
-        # Get the IP21 timedelta series:
-        ip21time_timedeltas = ip21time_window - reference_ip21
+        first_block = self.position // self.block_size
+        last_block = (self.position + number_of_bytes - 1) // self.block_size
+        blocks = self.get_blocks(first_block, last_block)
+
+        data = b''.join([blocks[block_index] for block_index in range(first_block, (last_block + 1))])
+        offset = self.position - (first_block * self.block_size)
         
-        # Start a list for the new timestamps:
-        new_timestamps = []
+        buffer[:number_of_bytes] = data[offset:(offset + number_of_bytes)]
+        self.position = self.position + number_of_bytes
         
-        # Now, loop through each element from the series ip21time_timedeltas:
-        for ip21time_timedelta in ip21time_timedeltas:
-            
-            # Create a pandas timedelta object, in ms:
-            timedelta_obj = pd.Timedelta(ip21time_timedelta, 'ms')
-            # Sum this timedelta to reference to obtain the new timestamp:
-            new_timestamp = reference + timedelta_obj
-            # Append to the list of new_timestamps:
-            new_timestamps.append(new_timestamp)
+        return number_of_bytes
+
+
+def open_s3_object (s3_uri, block_size_mb = 4, cache_size_mb = 256, cache_directory = None):
+    """
+    open_s3_object (s3_uri, block_size_mb = 4, cache_size_mb = 256, cache_directory = None):
+
+    Open an S3 object as a seekable S3RangedFile, without copying it to the disk.
+
+    : param: s3_uri (string): address of the object, in the format 's3://bucket_name/prefix/file_name.ext'
+    : param: block_size_mb = 4: size (in MB) of the blocks fetched by each ranged request.
+    : param: cache_size_mb = 256: maximum size (in MB) of the blocks kept in memory. The cache is stored
+      in Connectors.s3_block_cache, so it is shared by all the objects opened during the session.
+    : param: cache_directory = None: if a directory is declared, the fetched blocks are also stored on
+      the disk, and reused by the next sessions.
+
+    If a connector was created with mount_storage_system (stored in Connectors.aws_s3_connector), its
+    credentials are used. Otherwise, boto3 searches the credentials in the environment (e.g., the
+    environment variables, the ~/.aws/credentials file, or the role of the SageMaker instance).
+    """
+
+    import boto3
+
+    s3_uri = str(s3_uri)
+    
+    if (s3_uri[:5] != 's3://'):
+        raise InvalidInputsError ("The S3 address must start with \'s3://\', like \'s3://bucket_name/prefix/file_name.ext\'.")
+    
+    # Split 's3://bucket_name/prefix/file_name.ext' into the bucket name and the object key:
+    bucket_name, _, s3_key = s3_uri[5:].partition('/')
+
+    if ((bucket_name == '') | (s3_key == '')):
+        raise InvalidInputsError ("Declare the bucket and the object key in the S3 address, like \'s3://bucket_name/prefix/file_name.ext\'.")
+    
+    try: # try accessing the client of the connector, if it exists
+        aws_s3_connector = Connectors.aws_s3_connector
+        
+        if (hasattr(aws_s3_connector, 's3_transfer_client')):
+            s3_client = aws_s3_connector.s3_transfer_client
+        else:
+            s3_client = boto3.client('s3', aws_access_key_id = aws_s3_connector.ACCESS_KEY, aws_secret_access_key = aws_s3_connector.SECRET_KEY)
+    
+    except: # Use the credentials from the environment
+        s3_client = boto3.client('s3')
+    
+    try: # try accessing the cache, if it exists
+        if Connectors.s3_block_cache:
+            if (Connectors.persistent & (Connectors.s3_block_cache.cache_directory == cache_directory)):
+                block_cache = Connectors.s3_block_cache
+            else:
+                block_cache = S3BlockCache(cache_size_mb, cache_directory)
+                Connectors.s3_block_cache = block_cache
+    
+    except: # Create the cache
+        block_cache = S3BlockCache(cache_size_mb, cache_directory)
+        Connectors.s3_block_cache = block_cache
+    
+    return S3RangedFile(s3_client, bucket_name, s3_key, block_size_mb, block_cache)
+
+
+# Reference timestamps for the conversion between pandas timestamps and IP21 timescale (milliseconds).
+# Each tuple is (reference timestamp, same reference in IP21 timescale), from the most recent to the oldest one.
+# The oldest reference is used for any timestamp before the other ones.
+IP21_TIMESCALE_REFERENCES = [
+    (pd.Timestamp('06-21-2022 0:00:00.001'), 1655780400001),
+    (pd.Timestamp('06-21-2022'), 1655780400000),
+    (pd.Timestamp('06-20-2022'), 1655694000000),
+    (pd.Timestamp('01-01-2018'), 1514772000000),
+    (pd.Timestamp('01-01-2000'), 946692000000),
+    (pd.Timestamp('01-01-1970'), 10800000),
+    (pd.Timestamp('01-01-1960'), -315608400000)
+]
+
+
+# Retrieval types (parameter RT of the IP21 REST history query) for each retrieval mode.
+# 'raw' and 'shape_preserving' return registered samples; 'interpolated' returns the values interpolated at each
+# period; the other modes return the aggregate of the samples registered in each period.
+IP21_RETRIEVAL_TYPES = {
+    'raw': 0,
+    'interpolated': 1,
+    'shape_preserving': 2,
+    'average': 12,
+    'maximum': 13,
+    'minimum': 14,
+    'standard_deviation': 15,
+    'range': 16,
+    'variance': 18
+}
+
+
+def convert_timestamps_to_ip21_timescale (timestamps, reference_selection_timestamp = None):
+    """
+    convert_timestamps_to_ip21_timescale (timestamps, reference_selection_timestamp = None):
+    
+    Vectorized conversion of timestamps into IP21 timescale (milliseconds). Returns a NumPy array of int64.
+    
+    : param: timestamps: single timestamp or array-like (list, NumPy array, pandas series) of timestamps.
+    : param: reference_selection_timestamp = None: timestamp used for picking the closest reference from
+      IP21_TIMESCALE_REFERENCES. If None, the first element of timestamps is used. The same reference is
+      applied to all the elements, as in IP21Extractor.convert_window_to_ip21_timescale.
+    
+    Missing timestamps (NaT) have no representation in the IP21 timescale, so they raise InvalidInputsError.
+    """
+    
+    timestamps = pd.to_datetime(pd.Series(np.atleast_1d(timestamps)))
+    
+    if (timestamps.isna().any()):
+        raise InvalidInputsError(f"{timestamps.isna().sum()} missing timestamps (NaT) cannot be converted to the IP21 timescale.")
+    
+    # Nanoseconds resolution, as in the pandas timestamps:
+    timestamps = timestamps.to_numpy(dtype = 'datetime64[ns]')
+    
+    if (reference_selection_timestamp is None):
+        reference_selection_timestamp = timestamps[0]
+    
+    reference_selection_timestamp = pd.Timestamp(reference_selection_timestamp)
+    
+    # Pick the closest reference timestamp (the last one of the list is used if no other is lower):
+    reference, reference_ip21 = IP21_TIMESCALE_REFERENCES[-1]
+    
+    for ref_timestamp, ref_ip21 in IP21_TIMESCALE_REFERENCES:
+        if (reference_selection_timestamp >= ref_timestamp):
+            reference, reference_ip21 = ref_timestamp, ref_ip21
+            break
+    
+    # Get the timedeltas in nanoseconds, as integers:
+    timedeltas = (timestamps - np.datetime64(reference.as_unit('ns'))).astype(np.int64)
+    # 1ms = 10^-3 s, 1ns = 10^-9 s, so 1 ns = 1ms/(10^6)
+    # Divide by 10^6 to obtain the total of milliseconds, and sum with the reference value in IP21 scale.
+    # np.rint rounds to the nearest integer:
+    ip21time_array = np.rint(reference_ip21 + timedeltas / (10**6)).astype(np.int64)
+    
+    return ip21time_array
+
+
+def convert_ip21_timescale_to_timestamps (ip21time_array, reference_selection_value = None):
+    """
+    convert_ip21_timescale_to_timestamps (ip21time_array, reference_selection_value = None):
+    
+    Vectorized conversion of values in IP21 timescale (milliseconds) into timestamps. 
+    Returns a NumPy array of datetime64[ns], with the same order of the input.
+    
+    : param: ip21time_array: single value or array-like (list, NumPy array, pandas series) in IP21 timescale.
+    : param: reference_selection_value = None: IP21 value used for picking the closest reference from
+      IP21_TIMESCALE_REFERENCES. If None, the first element of ip21time_array is used. The same reference is
+      applied to all the elements.
+    
+    Missing values (NaN or None) are converted to NaT. If the reference selection value is missing, the first 
+    valid value of ip21time_array is used instead.
+    """
+    
+    ip21time_array = np.atleast_1d(np.asarray(ip21time_array))
+    
+    if (ip21time_array.dtype == object):
+        # e.g. lists with None: convert them to NaN.
+        ip21time_array = ip21time_array.astype(np.float64)
+    
+    missing_values = pd.isna(ip21time_array)
+    
+    if ((reference_selection_value is None) or pd.isna(reference_selection_value)):
+        valid_values = ip21time_array[~missing_values]
+        # If there is no valid value, all the timestamps are NaT, regardless of the reference:
+        reference_selection_value = valid_values[0] if (len(valid_values) > 0) else IP21_TIMESCALE_REFERENCES[0][1]
+    
+    # Pick the closest reference timestamp (the last one of the list is used if no other is lower):
+    reference, reference_ip21 = IP21_TIMESCALE_REFERENCES[-1]
+    
+    for ref_timestamp, ref_ip21 in IP21_TIMESCALE_REFERENCES:
+        if (reference_selection_value >= ref_ip21):
+            reference, reference_ip21 = ref_timestamp, ref_ip21
+            break
+    
+    # Get the IP21 timedeltas (milliseconds) and convert all of them at once to nanoseconds resolution.
+    # The IP21 values are integer milliseconds, so floats (used for representing the missing values) are 
+    # converted back to integers, avoiding rounding errors in the conversion to nanoseconds:
+    ip21_timedeltas = np.where(missing_values, 0, (ip21time_array - reference_ip21))
+    timedeltas = pd.to_timedelta(np.rint(ip21_timedeltas).astype(np.int64), unit = 'ms').to_numpy(dtype = 'timedelta64[ns]')
+    timedeltas[missing_values] = np.timedelta64('NaT')
+    # Sum the timedeltas to the reference to obtain the new timestamps:
+    timestamps = np.datetime64(reference.as_unit('ns')) + timedeltas
+    
+    return timestamps
+
+
+def parse_ip21_samples (json_response):
+    """
+    parse_ip21_samples (json_response):
+    
+    Decode the samples of an IP21 history response directly into NumPy arrays, with no intermediate
+    dictionaries or dataframes. Returns a tuple (ip21time_array, values_array), where ip21time_array is an
+    int64 array in IP21 timescale and values_array is a float64 array. 
+    Returns None when the response cannot be decoded this way (error messages, no samples, non-numeric
+    values or unexpected formats), so the complete JSON parsing should be used instead.
+    
+    : param: json_response: string with the JSON returned by the IP21 REST API, in the format
+      {"data":[{...,"samples":[{"t":TIMESTAMP in IP21 scale,"v": VALUE FOR THAT TIMESTAMP,...},...]}]}
+    """
+    
+    import re
+    
+    if (type(json_response) != str):
+        return None
+    
+    # Only the part after the "samples" key is scanned:
+    samples_start = json_response.find('"samples"')
+    
+    if (samples_start < 0):
+        return None
+    
+    # Error messages are registered on the samples as "er", "ec" or "es" keys:
+    if (re.search(r'"e[rcs]"\s*:', json_response[samples_start:(samples_start + 1000)]) is not None):
+        return None
+    
+    # Each sample is registered as {"t":1655780400001,"v":"12.5",...}. Numbers may be quoted (allQuotes="1").
+    # Quoted values are captured as whole strings (first group), so that values like "1,234.5" are not
+    # cut at the comma; unquoted values are captured by the second group.
+    timestamp_pattern = re.compile(r'"t"\s*:\s*"?(-?\d+)"?\s*[,}]')
+    value_pattern = re.compile(r'"v"\s*:\s*(?:"((?:[^"\\]|\\.)*)"|([^",}\s]*))\s*[,}]')
+
+    timestamps = timestamp_pattern.findall(json_response, samples_start)
+    values = [(quoted if (quoted != '') else unquoted) for quoted, unquoted in value_pattern.findall(json_response, samples_start)]
+
+    number_of_samples = len(timestamps)
+
+    # Every sample must have a timestamp and a value:
+    if ((number_of_samples == 0) | (number_of_samples != len(values))):
+        return None
+
+    # Values with commas (thousands or decimal separators, e.g., "1,234.5" or "12,5") or escape sequences
+    # are ambiguous: use the complete JSON parsing.
+    if any((',' in value) | ('\\' in value) for value in values):
+        return None
+
+    try:
+        # Fill arrays preallocated with the number of samples:
+        ip21time_array = np.fromiter(map(int, timestamps), dtype = np.int64, count = number_of_samples)
+        values_array = np.fromiter(map(float, values), dtype = np.float64, count = number_of_samples)
+    
+    except ValueError:
+        # Non-numeric values (e.g., text tags): use the complete JSON parsing.
+        return None
+    
+    return ip21time_array, values_array
+
+
+class IP21Extractor:
+    """
+    Class for extracting information from Aspentech IP21 database.
+    def __init__ (self, tag_to_extract = None, actual_tag_name = None, ip21_server = None, 
+                data_source = 'localhost', start_timestamp = None, stop_timestamp = None, ip21time_array = [], 
+                previous_df_for_concatenation = None, username = None, password = None):  
+    """    
+
+    # Semaphores limiting the simultaneous requests to each server, shared by all the extractors.
+    # Dictionary in the format {server: (maximum number of requests, semaphore)}
+    server_semaphores = {}
+
+    # Initialize instance attributes.
+    # define the Class constructor, i.e., how are its objects:
+
+    def __init__ (self, previous_df_for_concatenation):
+        
+        # If the user passes the argument, use them. Otherwise, use the standard values.
+        # Set the class objects' attributes.
+        # Suppose the object is named assistant. We can access the attribute as:
+        # assistant.assistant_startup, for instance.
+        # So, we can save the variables as objects' attributes.
+        
+        # Check if there is a previous dataset for concatenating with new data:
+        self.dataset = previous_df_for_concatenation
+        # Semaphore limiting the simultaneous requests to the server (only set for concurrent extractions):
+        self.server_semaphore = None
+        # Maximum number of rows the server returns in each API call (parameter X of the query):
+        self.max_rows_per_call = 100000
+        # Start the accumulator of the pages retrieved from the API:
+        self.restart_accumulator()
+        # Retrieve the raw history, unless another mode is set by the set_retrieval_mode method:
+        self.retrieval_mode = 'raw'
+        self.aggregation_period_seconds = None
+        # Persistent HTTP sessions, reused by all the calls (one per thread; check create_session and get_session):
+        self.session_params = None
+        self.thread_sessions = None
+        self.opened_sessions = []
+                
+        # Define the class methods.
+        # All methods must take an object from the class (self) as one of the parameters
+        error_msg = """If ModuleNotFoundError is raised, run the following commands to install requests and requests_ntlm packages, which are not required for running IDSW
+                    
+                                                ! pip install requests
+                                                ! pip install requests_ntlm
+
+                """
+        print(error_msg)
+
+
+    def get_credentials (self, server, data_source, username, password):
+     
+        from getpass import getpass
+        
+        if (username is None):
+            
+            username = input("Enter your username: ")
+            
+        if (password is None):
+            
+            password = getpass("Enter your password: ")
+        
+        # Remove trailing whitespaces:
+        username = str(username).strip()
+        password = str(password).strip()
+        
+        if (data_source is None):
+            data_source = 'localhost'
+        
+        # Attention: do not include http:// in the server, only the server name
+        # (what appears after http://)
+        self.server = server
+        
+        # If no specific data source is provided, use 'localhost'
+        self.data_source = data_source
+
+        # Store the credentials for the NTLM authentication:
+        self.username = username
+        self.password = password
+
+        # The sessions were authenticated with previous credentials: new ones will be created.
+        self = self.close_sessions()
+        
+        # Create an attribute that checks if another API call is needed:
+        self.need_next_call = True
+       
+
+        return self
+    
+
+    def set_query_parameters (self, tag_to_extract = None, actual_tag_name = None, start_timestamp = None, stop_timestamp = None, ip21time_array = [], previous_df_for_concatenation = None):
+
+        self.tag = tag_to_extract
+        # If actual_tag_name is None, make it equal to the tag:
+        if (actual_tag_name is None):
+            actual_tag_name = tag_to_extract
+        
+        self.actual_tag_name = actual_tag_name
+        
+        self.start_timestamp = start_timestamp
+        self.start_ip21_scale = np.nan # float, instead of None object
+        self.stop_timestamp = stop_timestamp
+        self.stop_ip21_scale = np.nan # float, instead of None object
         
-        # Now, convert the list to Pandas series:
-        timestamp_series = pd.Series(new_timestamps)
-        # Rename this series:
-        # https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.Series.rename.html
-        timestamp_series = timestamp_series.rename("timestamps")
+        if (ip21time_array is None):
+            ip21time_array = []
+        
+        self.ip21time_array = np.array(ip21time_array)
+
+        # Restart the dataset and the pagination control for the new tag:
+        self.dataset = previous_df_for_concatenation
+        self.need_next_call = True
+        # Restart the accumulator of the pages retrieved for the tag:
+        self = self.restart_accumulator()
+
+        return self
+    
+
+    def convert_window_to_ip21_timescale (self):
+        
+        start_timestamp = self.start_timestamp 
+        stop_timestamp = self.stop_timestamp
+        
+        # Convert both timestamps at once. The closest reference timestamp is picked from the start timestamp:
+        start_ip21_scale, stop_ip21_scale = convert_timestamps_to_ip21_timescale([start_timestamp, stop_timestamp], reference_selection_timestamp = start_timestamp)
+        
+        # Update the attributes, guaranteeing that the numbers are integers:
+        self.start_ip21_scale = int(start_ip21_scale)
+        self.stop_ip21_scale = int(stop_ip21_scale)
+        
+        return self
+            
+        
+    def convert_ip21_timescale_array_to_timestamp (self):
+        
+        ip21time_array = np.asarray(self.ip21time_array)
+        # The closest reference timestamp is picked from the first IP21 time of the array.
+        # Guarantee that the array is sorted ascendingly before the conversion:
+        timestamps = convert_ip21_timescale_to_timestamps(np.sort(ip21time_array), reference_selection_value = ip21time_array[0])
+        
+        # Now, convert the array to Pandas series, named "timestamps":
+        timestamp_series = pd.Series(timestamps, name = "timestamps")
         
         # Save it as an attribute and return the object:
         self.timestamp_series = timestamp_series
@@ -1143,6 +1890,20 @@ class IP21Extractor:
         return self
     
     
+    def set_retrieval_mode (self, retrieval_mode = 'raw', aggregation_period_seconds = None):
+        
+        if (retrieval_mode not in IP21_RETRIEVAL_TYPES.keys()):
+            raise InvalidInputsError(f"retrieval_mode must be one of the following: {list(IP21_RETRIEVAL_TYPES.keys())}.")
+        
+        if ((retrieval_mode not in ['raw', 'shape_preserving']) & (aggregation_period_seconds is None)):
+            raise InvalidInputsError(f"Declare aggregation_period_seconds for retrieving the {retrieval_mode} samples. Example: aggregation_period_seconds = 60 for samples calculated each minute.")
+        
+        self.retrieval_mode = retrieval_mode
+        self.aggregation_period_seconds = aggregation_period_seconds
+        
+        return self
+    
+
     def get_rest_api_url (self):
         
         server = self.server
@@ -1150,6 +1911,9 @@ class IP21Extractor:
         data_source = self.data_source
         start_ip21_scale = self.start_ip21_scale
         stop_ip21_scale = self.stop_ip21_scale
+        max_rows_per_call = int(self.max_rows_per_call)
+        retrieval_mode = self.retrieval_mode
+        retrieval_type = IP21_RETRIEVAL_TYPES[retrieval_mode]
         
         # URL Encodings:
         # https://docs.osisoft.com/bundle/pi-web-api-reference/page/help/topics/url-encoding.html
@@ -1169,10 +1933,25 @@ class IP21Extractor:
         url = url + query_prefix
         
         # URL-encoded URL:
-        query = f"""%3CQ%20f=%22d%22%20allQuotes=%221%22%3E%3CTag%3E%3CN%3E%3C![CDATA[{tag}]]%3E%3C/N%3E%3CD%3E%3C![CDATA[{data_source}]]%3E%3C/D%3E%3CF%3E%3C![CDATA[VAL]]%3E%3C/F%3E%3CHF%3E0%3C/HF%3E%3CSt%3E{start_ip21_scale}%3C/St%3E%3CEt%3E{stop_ip21_scale}%3C/Et%3E%3CRT%3E0%3C/RT%3E%3CX%3E100000%3C/X%3E%3CO%3E1%3C/O%3E%3C/Tag%3E%3C/Q%3E"""
+        if (retrieval_mode in ['raw', 'shape_preserving']):
+            # Registered samples, limited by the maximum number of rows of each call:
+            retrieval_parameters = f"""%3CRT%3E{retrieval_type}%3C/RT%3E%3CX%3E{max_rows_per_call}%3C/X%3E"""
+        
+        else:
+            # Samples calculated by the server for each period (P), in seconds (period units PU = 3):
+            period = int(np.rint(self.aggregation_period_seconds))
+            retrieval_parameters = f"""%3CRT%3E{retrieval_type}%3C/RT%3E%3CP%3E{period}%3C/P%3E%3CPU%3E3%3C/PU%3E"""
+            
+            if (retrieval_mode != 'interpolated'):
+                # Options of the aggregates: time-weighted aggregation, periods aligned with the start time:
+                retrieval_parameters = retrieval_parameters + f"""%3CAM%3E0%3C/AM%3E%3CAS%3E0%3C/AS%3E%3CAA%3E0%3C/AA%3E%3CDSA%3E0%3C/DSA%3E"""
+        
+        query = f"""%3CQ%20f=%22d%22%20allQuotes=%221%22%3E%3CTag%3E%3CN%3E%3C![CDATA[{tag}]]%3E%3C/N%3E%3CD%3E%3C![CDATA[{data_source}]]%3E%3C/D%3E%3CF%3E%3C![CDATA[VAL]]%3E%3C/F%3E%3CHF%3E0%3C/HF%3E%3CSt%3E{start_ip21_scale}%3C/St%3E%3CEt%3E{stop_ip21_scale}%3C/Et%3E{retrieval_parameters}%3CO%3E1%3C/O%3E%3C/Tag%3E%3C/Q%3E"""
         
-        # Not-encoded URL:
-        #query = f"""<Q%20f="d"%20allQuotes="1"><Tag><N><![CDATA[{tag}]]></N><D><![CDATA[{data_source}]]></D><F><![CDATA[VAL]]></F><HF>0</HF><St>{start_ip21_scale}</St><Et>{stop_ip21_scale}</Et><RT>0</RT><X>100000</X><O>1</O></Tag></Q>"""
+        # Not-encoded URL (raw retrieval):
+        #query = f"""<Q%20f="d"%20allQuotes="1"><Tag><N><![CDATA[{tag}]]></N><D><![CDATA[{data_source}]]></D><F><![CDATA[VAL]]></F><HF>0</HF><St>{start_ip21_scale}</St><Et>{stop_ip21_scale}</Et><RT>0</RT><X>{max_rows_per_call}</X><O>1</O></Tag></Q>"""
+        # For the aggregated retrieval, <X>...</X> is substituted by the period parameters:
+        # <RT>12</RT><P>60</P><PU>3</PU><AM>0</AM><AS>0</AS><AA>0</AA><DSA>0</DSA>
         
         
         # Save the url as an attribute and return it:
@@ -1182,6 +1961,47 @@ class IP21Extractor:
         return self
     
     
+    def restart_accumulator (self):
+        
+        # List of tuples (IP21 timescale array, timestamps array, values array), one for each page retrieved from the API:
+        self.accumulated_pages = []
+        # Last timestamp retrieved (in IP21 scale), stored as a scalar:
+        self.last_ip21_timestamp = None
+        
+        return self
+    
+
+    def materialize_dataset (self):
+        
+        # Build the dataframe with all the pages retrieved, concatenating them only once.
+        accumulated_pages = self.accumulated_pages
+        
+        if (len(accumulated_pages) == 0):
+            # No page was retrieved: keep the current dataset.
+            return self
+        
+        tag_name = self.actual_tag_name
+        
+        # Keep the IP21 times of the rows retrieved from the API:
+        self.dataset_ip21time_array = np.concatenate([page[0] for page in accumulated_pages])
+        timestamps = np.concatenate([page[1] for page in accumulated_pages])
+        values = np.concatenate([page[2] for page in accumulated_pages])
+        dataset = pd.DataFrame({'timestamp': timestamps, tag_name: values})
+        
+        # If there is a previous dataset, concatenate the dataframes:
+        if (self.dataset is not None):
+            # Concatenate all dataframes (append rows):
+            dataset = pd.concat([self.dataset, dataset], axis = 0, join = "inner")
+            # Reset previous indices so that numeration is continuous:
+            dataset = dataset.reset_index(drop = True)
+        
+        # Save the concatenated dataset as dataset attribute, and empty the accumulator:
+        self.dataset = dataset
+        self = self.restart_accumulator()
+        
+        return self
+
+
     def retrieve_pd_dataframe (self, json_file_path = None):
         
         import os
@@ -1195,115 +2015,143 @@ class IP21Extractor:
         
         # Retrieve previous dataset in memory:
         previous_df = self.dataset
+        # Check if there are pages from previous calls in the accumulator:
+        has_previous_pages = (len(self.accumulated_pages) > 0)
+        # It is only set as True when the response brings valid samples (not error or no-data messages):
+        self.valid_response = False
         
-        if (json_file_path is not None):
-            try:
-                # Extract the file extension
-                file_extension = os.path.splitext(json_file_path)[1][1:]
-                # os.path.splitext(file_path) is a tuple of strings: the first is the complete file
-                # root with no extension; the second is the extension starting with a point: '.txt'
-                # When we set os.path.splitext(file_path)[1], we are selecting the second element of
-                # the tuple. By selecting os.path.splitext(file_path)[1][1:], we are taking this string
-                # from the second character (index 1), eliminating the dot: 'txt'
-
-                if (file_extension == 'json'):
-
-                    json_file = json.load(json_response)
-
-                else:
-                    # Open context manager:
-                    with open (json_response, 'r') as file:
-                        # Read all lines:
-                        response = file.readlines()
-
-                    # Use the json.loads method to convert the string to json
-                    json_file = json.loads(response)
+        # Try to decode the samples directly into NumPy arrays (fast path for the responses in memory):
+        parsed_samples = None
+        
+        if (json_file_path is None):
+            parsed_samples = parse_ip21_samples(json_response)
+        
+        if (parsed_samples is not None):
             
-            except:
-                pass
+            ip21time_array, values_array = parsed_samples
+            # Create the dataframe from the arrays, with no intermediate copies of the samples:
+            dataset = pd.DataFrame({'timestamp_ip21_scale': ip21time_array, tag_name: values_array})
         
         else:
-            try:
-                # It is a string:
-                json_file = json.loads(json_response)
+            # Complete JSON parsing:
+            if (json_file_path is not None):
+                try:
+                    # Extract the file extension
+                    file_extension = os.path.splitext(json_file_path)[1][1:]
+                    # os.path.splitext(file_path) is a tuple of strings: the first is the complete file
+                    # root with no extension; the second is the extension starting with a point: '.txt'
+                    # When we set os.path.splitext(file_path)[1], we are selecting the second element of
+                    # the tuple. By selecting os.path.splitext(file_path)[1][1:], we are taking this string
+                    # from the second character (index 1), eliminating the dot: 'txt'
+
+                    if (file_extension == 'json'):
+
+                        json_file = json.load(json_response)
+
+                    else:
+                        # Open context manager:
+                        with open (json_response, 'r') as file:
+                            # Read all lines:
+                            response = file.readlines()
+
+                        # Use the json.loads method to convert the string to json
+                        json_file = json.loads(response)
             
-            except:
-                pass
+                except:
+                    pass
         
-        """
-        JSON structure obtained from IP21:
-        {"data":[{...,"samples":[{"t":TIMESTAMP in IP21 scale,"v": VALUE FOR THAT TIMESTAMP,...},...]}]}
+            else:
+                try:
+                    # It is a string:
+                    json_file = json.loads(json_response)
+            
+                except:
+                    pass
         
-        """
-        # https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.json_normalize.html#pandas.json_normalize
-        # json_record_path (string): manipulate parameter 'record_path' from json_normalize method.
-        # Path in each object to list of records. If not passed, data will be assumed to 
-        # be an array of records. If a given field from the JSON stores a nested JSON (or a nested
-        # dictionary) declare it here to decompose the content of the nested data. e.g. if the field
-        # 'books' stores a nested JSON, declare, json_record_path = 'books'
-
-        # json_field_separator = "_" (string). Manipulates the parameter 'sep' from json_normalize method.
-        # Nested records will generate names separated by sep. 
-        # e.g., for json_field_separator = ".", {‘foo’: {‘bar’: 0}} -> foo.bar.
-        # Then, if a given field 'main_field' stores a nested JSON with fields 'field1', 'field2', ...
-        # the name of the columns of the dataframe will be formed by concatenating 'main_field', the
-        # separator, and the names of the nested fields: 'main_field_field1', 'main_field_field2',...
-
-        # e.g. Suppose a JSON with the following structure: {'name': 'Mary', 'last': 'Shelley',
-        # 'books': [{'title': 'Frankestein', 'year': 1818}, {'title': 'Mathilda ', 'year': 1819},{'title': 'The Last Man', 'year': 1826}]},
-        # Here, there are nested JSONs in the field 'books'. The fields that are not nested
-        # are 'name' and 'last'.
-        # Then, json_record_path = 'books'
-        # json_metadata_prefix_list = ['name', 'last']
-        json_record_path = ['data', 'samples']
-        json_field_separator = "_"
-        dataset = json_normalize(json_file, record_path = json_record_path, sep = json_field_separator)
+            """
+            JSON structure obtained from IP21:
+            {"data":[{...,"samples":[{"t":TIMESTAMP in IP21 scale,"v": VALUE FOR THAT TIMESTAMP,...},...]}]}
         
-        if ((dataset is None) | ("er" in dataset.columns) | ("ec" in dataset.columns) | ("es" in dataset.columns) | (len(dataset) == 0)):
+            """
+            # https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.json_normalize.html#pandas.json_normalize
+            # json_record_path (string): manipulate parameter 'record_path' from json_normalize method.
+            # Path in each object to list of records. If not passed, data will be assumed to 
+            # be an array of records. If a given field from the JSON stores a nested JSON (or a nested
+            # dictionary) declare it here to decompose the content of the nested data. e.g. if the field
+            # 'books' stores a nested JSON, declare, json_record_path = 'books'
+
+            # json_field_separator = "_" (string). Manipulates the parameter 'sep' from json_normalize method.
+            # Nested records will generate names separated by sep. 
+            # e.g., for json_field_separator = ".", {‘foo’: {‘bar’: 0}} -> foo.bar.
+            # Then, if a given field 'main_field' stores a nested JSON with fields 'field1', 'field2', ...
+            # the name of the columns of the dataframe will be formed by concatenating 'main_field', the
+            # separator, and the names of the nested fields: 'main_field_field1', 'main_field_field2',...
+
+            # e.g. Suppose a JSON with the following structure: {'name': 'Mary', 'last': 'Shelley',
+            # 'books': [{'title': 'Frankestein', 'year': 1818}, {'title': 'Mathilda ', 'year': 1819},{'title': 'The Last Man', 'year': 1826}]},
+            # Here, there are nested JSONs in the field 'books'. The fields that are not nested
+            # are 'name' and 'last'.
+            # Then, json_record_path = 'books'
+            # json_metadata_prefix_list = ['name', 'last']
+            json_record_path = ['data', 'samples']
+            json_field_separator = "_"
+            dataset = json_normalize(json_file, record_path = json_record_path, sep = json_field_separator)
+        
+            if ((dataset is None) | ("er" in dataset.columns) | ("ec" in dataset.columns) | ("es" in dataset.columns) | (len(dataset) == 0)):
             
-            print("There is no data available for the defined time window.\n")
+                print("There is no data available for the defined time window.\n")
+                # Error or no-data response (self.valid_response remains False):
             
-            # If the attribute is not None, concatenate the dataframes:
-            if (previous_df is not None):
-                # Concatenate all dataframes (append rows):
-                dataset = previous_df
-                print("Returning the previous dataset itself.\n")
-        
-            self.dataset = dataset
-            self.need_next_call = False
-            # Interrupt the algorithm:
-            return self
+                if ((previous_df is not None) | (has_previous_pages)):
+                    # Keep the data from the previous dataset and pages:
+                    print("Returning the previous dataset itself.\n")
+                
+                else:
+                    self.dataset = dataset
+                
+                self.need_next_call = False
+                # Interrupt the algorithm:
+                return self
             
         
-        if (('t' not in dataset.columns) & ('v' not in dataset.columns)):
+            if (('t' not in dataset.columns) & ('v' not in dataset.columns)):
             
-            # Lower case column names:
-            columns = [c.lower() for c in dataset.columns]
-            # Pick only first character (until character of index 1, excluding index 1):
-            columns = [c[:1] for c in columns]
-            # Make this list the columns names:
-            dataset.columns = columns
-        
-        if (('t' in dataset.columns) & ('v' in dataset.columns)):
+                # Lower case column names:
+                columns = [c.lower() for c in dataset.columns]
+                # Pick only first character (until character of index 1, excluding index 1):
+                columns = [c[:1] for c in columns]
+                # Make this list the columns names:
+                dataset.columns = columns
+        
+            if (('t' in dataset.columns) & ('v' in dataset.columns)):
             
-            # Keep only columns 't' and 'v':
-            dataset = dataset[['t', 'v']]
-            # Rename these columns:
-            dataset.columns = ['timestamp_ip21_scale', tag_name]
+                # Keep only columns 't' and 'v':
+                dataset = dataset[['t', 'v']]
+                # Rename these columns:
+                dataset.columns = ['timestamp_ip21_scale', tag_name]
         
-        else:
-            # Substitute only the 1st column name and pick the other columns starting from
-            # the second one (index 1)
-            columns = ['timestamp_ip21_scale'] + list(dataset.columns)[1:]
+            else:
+                # Substitute only the 1st column name and pick the other columns starting from
+                # the second one (index 1)
+                columns = ['timestamp_ip21_scale'] + list(dataset.columns)[1:]
         
-        # Isolate the time series:
-        time_series = dataset['timestamp_ip21_scale']
-        # Get the last element (convert to list to access index -1).
-        # In Pandas series, we can do [:-1] to get a single-element series:
-        last_element = list(time_series)[-1]
+        # Save the timestamps as numpy array in the attribute ip21time_array:
+        self.ip21time_array = np.array(dataset['timestamp_ip21_scale'])
+        self.valid_response = True
+        # Get the last element as a scalar:
+        last_element = self.ip21time_array[-1]
         
-        if (last_element < stop_ip21_scale):
+        if ((self.last_ip21_timestamp is not None) and (last_element == self.last_ip21_timestamp)):
             
+            # We already reached the end of the database. It actually never reaches the stop timestamp.
+            print(f"The last timestamp registered in the database (IP21 scale) is: {last_element}\n")
+            # Keep the pages from the previous calls and finish the process:
+            self.need_next_call = False
+            
+            return self
+        
+        if ((last_element < stop_ip21_scale) & (len(dataset) >= self.max_rows_per_call)):
+            # The page is full, so there may be more samples in the window:
             self.need_next_call = True
             # Update the start timestamp to be the last_element plus 1 unit (1 millisecond):
             self.start_ip21_scale = last_element + 1
@@ -1311,75 +2159,649 @@ class IP21Extractor:
         else:
             self.need_next_call = False
         
-        # Save the timestamps as numpy array in the attribute ip21time_array:
-        self.ip21time_array = np.array(dataset['timestamp_ip21_scale'])
         # Convert to timestamp using the conversion method:
         self = self.convert_ip21_timescale_array_to_timestamp()
-        # Retrieve the timestamps:
-        dataset['timestamp'] = self.timestamp_series
-        
-        # Select only these columns:
-        dataset = dataset[['timestamp', tag_name]]
         
+        # Append the arrays of the page to the accumulator. The dataframe is built only once, by the 
+        # materialize_dataset method, instead of being concatenated after each call:
+        self.accumulated_pages.append((np.sort(self.ip21time_array), self.timestamp_series.to_numpy(), dataset[tag_name].to_numpy()))
+        self.last_ip21_timestamp = last_element
         
-        # If the attribute is not None, concatenate the dataframes:
-        if (previous_df is not None):
-            
-            # Compare the last timestamp from dataset and previous_df
-            last_timestamp = list(dataset['timestamp'])[-1]
-            previous_last_timestamp = list(previous_df['timestamp'])[-1]
-            
-            if (last_timestamp == previous_last_timestamp):
-                
-                # We already reached the end of the database. It actually never reaches the stop timestamp.
-                print(f"The last timestamp registered in the database is: {last_timestamp}\n")
-                # Pick the previous dataframe, which is already concatenated with dfs from previous calls
-                dataset = previous_df
-                # Now, finish the process:
-                self.need_next_call = False
-            
-            else:
-                # Concatenate all dataframes (append rows):
-                dataset = pd.concat([previous_df, dataset], axis = 0, join = "inner")
-                # Reset previous indices so that numeration is continuous:
-                dataset = dataset.reset_index(drop = True)
+        return self
+    
 
-        # Finally, save the concatenated dataset as dataset attribute and return the object:
-        self.dataset = dataset
+    def create_session (self, pool_size = 10, max_retries = 3, retry_backoff_factor = 0.5, timeout_seconds = 120):
+        
+        import threading
+        
+        session_params = (pool_size, max_retries, retry_backoff_factor, timeout_seconds)
+        
+        if (self.session_params == session_params):
+            # Reuse the sessions that were already created with the same parameters:
+            return self
+        
+        # Close the connections of the previous sessions before substituting them:
+        self = self.close_sessions()
+        
+        # requests.Session is not documented as thread-safe, so each thread gets its own session, created
+        # by get_session the first time the thread sends a request. Only the session parameters (and the
+        # thread-local storage) are shared by the copies of the extractor used by the concurrent extraction.
+        self.session_params = session_params
+        self.thread_sessions = threading.local()
+        self.opened_sessions = []
+        self.sessions_lock = threading.Lock()
+        # Timeout (seconds) for establishing the connection and for waiting each response:
+        self.timeout = (min(10, timeout_seconds), timeout_seconds)
         
         return self
     
 
-    def fetch_database (self, request_type = 'get'):
+    def get_session (self):
         
         import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
         # IP21 uses the NTLM authentication protocol
         from requests_ntlm import HttpNtlmAuth
+        
+        if (self.session_params is None):
+            # Use the default parameters:
+            self = self.create_session()
+        
+        # Session of the current thread:
+        session = getattr(self.thread_sessions, 'session', None)
+        
+        if (session is None):
+            
+            pool_size, max_retries, retry_backoff_factor, timeout_seconds = self.session_params
+            
+            # The session keeps the TCP connections alive (keep-alive), so the connection and the NTLM
+            # handshake are not repeated for each page or tag. NTLM authenticates the connection itself,
+            # so the following requests sent through a pooled connection are already authenticated.
+            session = requests.Session()
+            session.auth = HttpNtlmAuth(self.username, self.password)
+            
+            # Retry the failed calls, waiting retry_backoff_factor * (2 ** (retry number - 1)) seconds between them.
+            # The queries only read data, so post requests may be safely repeated too.
+            retry = Retry(total = max_retries, backoff_factor = retry_backoff_factor, status_forcelist = [429, 500, 502, 503, 504], allowed_methods = ['GET', 'POST'])
+            # pool_maxsize is the number of connections kept alive for the server.
+            adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size, max_retries = retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            
+            self.thread_sessions.session = session
+            
+            with self.sessions_lock:
+                self.opened_sessions.append(session)
+        
+        return session
+    
+
+    def close_sessions (self):
+        
+        if (self.session_params is not None):
+            
+            with self.sessions_lock:
+                for session in self.opened_sessions:
+                    session.close()
+            
+            self.session_params = None
+            self.thread_sessions = None
+            self.opened_sessions = []
+        
+        return self
+
+
+    def fetch_database (self, request_type = 'get'):
        
         url = self.url
         query = self.query
-        username = self.username
-        password = self.password
         
-        # Create the NTLM Authorization object:
-        AUTH = HttpNtlmAuth(username, password)
+        # Persistent session of the current thread:
+        session = self.get_session()
         
         # IP21 requires the 'post' protocol
         
-        if (request_type == 'post'):
-            
-            json_response = requests.post(url, auth = AUTH, data = query)
+        if (self.server_semaphore is not None):
+            # Wait until the server accepts another simultaneous request:
+            self.server_semaphore.acquire()
         
-        else: #get
+        try:
+            if (request_type == 'post'):
+                
+                json_response = session.post(url, data = query, timeout = self.timeout)
             
-            url = url + "?" + query
-            json_response = requests.get(url, auth = AUTH)
+            else: #get
+                
+                url = url + "?" + query
+                json_response = session.get(url, timeout = self.timeout)
+            
+            json_response = json_response.text
         
-        json_response = json_response.text
+        finally:
+            if (self.server_semaphore is not None):
+                # Release the request slot, even if the request failed:
+                self.server_semaphore.release()
         
         self.json_response = json_response
         
         return self
+    
+
+    def set_server_semaphore (self, max_concurrent_requests = 4):
+        
+        import threading
+        
+        # The semaphores are stored in the class attribute server_semaphores, so all the extractors
+        # connected to a same server share the same limit of simultaneous (in-flight) requests.
+        # If a different limit is requested, a new semaphore substitutes the previous one.
+        limit, semaphore = IP21Extractor.server_semaphores.get(self.server, (None, None))
+        
+        if (limit != max_concurrent_requests):
+            
+            semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+            IP21Extractor.server_semaphores[self.server] = (max_concurrent_requests, semaphore)
+        
+        self.server_semaphore = semaphore
+        
+        return self
+    
+
+    def split_time_window (self, number_of_windows = 1):
+        
+        start_ip21_scale = self.start_ip21_scale
+        stop_ip21_scale = self.stop_ip21_scale
+        
+        # Guarantee that at least one window is created:
+        number_of_windows = max(int(number_of_windows), 1)
+        
+        # The IP21 scale is in milliseconds, and both St and Et are inclusive. So, the windows
+        # are disjoint closed intervals [start, stop], where each start is the previous stop + 1 ms.
+        # np.linspace returns the number_of_windows + 1 edges of the windows:
+        edges = np.rint(np.linspace(start_ip21_scale, (stop_ip21_scale + 1), (number_of_windows + 1))).astype(np.int64)
+        
+        time_windows = []
+        
+        for i in range(number_of_windows):
+            
+            window_start = int(edges[i])
+            window_stop = int(edges[(i + 1)]) - 1
+            
+            # Ignore the empty windows (when there are more windows than milliseconds):
+            if (window_stop >= window_start):
+                time_windows.append((window_start, window_stop))
+        
+        self.time_windows = time_windows
+        
+        return self
+    
+
+    def fetch_time_window (self, start_ip21_scale, stop_ip21_scale, request_type = 'get'):
+        
+        import copy
+        
+        # Work on a shallow copy of the extractor, so that several windows (and tags) can be 
+        # fetched at the same time without one thread overwriting the attributes of the other.
+        # The tag, the credentials and the semaphore are shared with the copy.
+        extractor = copy.copy(self)
+        extractor.start_ip21_scale = start_ip21_scale
+        extractor.stop_ip21_scale = stop_ip21_scale
+        extractor.dataset = None
+        extractor.dataset_ip21time_array = np.array([], dtype = np.int64)
+        extractor.need_next_call = True
+        # The copy must have its own accumulator:
+        extractor = extractor.restart_accumulator()
+        # Check if all the calls of the window succeeded:
+        extractor.window_completed = True
+        
+        while (extractor.need_next_call == True):
+            
+            try:
+                # Get Rest API URL:
+                extractor = extractor.get_rest_api_url()
+                # Fetch the Database:
+                extractor = extractor.fetch_database(request_type = request_type)
+                # Retrieve Pandas dataframe:
+                extractor = extractor.retrieve_pd_dataframe()
+                
+                if (not extractor.valid_response):
+                    # Error or no-data messages: the window is not registered as retrieved (check the cache),
+                    # so it is requested again in the next extraction.
+                    extractor.window_completed = False
+            
+            except:
+                print(f"Failed API call for tag {extractor.tag} with IP21 timestamps from {extractor.start_ip21_scale} to {stop_ip21_scale}.")
+                print("Returning the last valid dataframe extracted for this time window.\n")
+                extractor.need_next_call = False
+                extractor.window_completed = False
+        
+        # Last IP21 time retrieved before the accumulator is emptied:
+        extractor.window_last_ip21_timestamp = extractor.last_ip21_timestamp
+        # Concatenate the pages retrieved:
+        extractor = extractor.materialize_dataset()
+        
+        # Only valid dataframes are kept (the API returns error messages when there is no data):
+        if ((extractor.dataset is None) or ('timestamp' not in extractor.dataset.columns)):
+            extractor.dataset = None
+        
+        # Return the copy, storing the dataset of the window:
+        return extractor
+    
+
+    def probe_sampling_period (self, probe_rows = 1000, request_type = 'get'):
+        
+        import copy
+        
+        # Cheap probe query: fetch only the first probe_rows samples of the window, and
+        # use their time span to estimate the sampling period of the tag (in ms).
+        extractor = copy.copy(self)
+        extractor.max_rows_per_call = probe_rows
+        extractor.dataset = None
+        extractor.need_next_call = True
+        extractor = extractor.restart_accumulator()
+        
+        try:
+            extractor = extractor.get_rest_api_url()
+            extractor = extractor.fetch_database(request_type = request_type)
+            extractor = extractor.retrieve_pd_dataframe()
+            extractor = extractor.materialize_dataset()
+            
+            ip21time_array = np.array(extractor.ip21time_array, dtype = np.float64)
+        
+        except:
+            # No valid data was returned (the API returns an error message when there is no data).
+            ip21time_array = np.array([])
+        
+        if ((extractor.dataset is None) or ('timestamp' not in extractor.dataset.columns) or (len(ip21time_array) < probe_rows)):
+            # The whole window has less than probe_rows samples, so it fits in a single call.
+            # Set a period long enough for obtaining a single window:
+            estimated_sampling_period = (self.stop_ip21_scale - self.start_ip21_scale + 1)
+        
+        else:
+            # Average period between the probed samples:
+            estimated_sampling_period = (ip21time_array[-1] - ip21time_array[0]) / (len(ip21time_array) - 1)
+        
+        self.estimated_sampling_period = max(estimated_sampling_period, 1)
+        
+        return self
+    
+
+    def plan_time_window_shards (self, estimated_sampling_period_seconds = None, probe_rows = 1000, rows_per_shard_fraction = 0.8, max_shards = 1000, request_type = 'get'):
+        
+        # The planner defines all the shards before the extraction, so they do not depend on
+        # sequential API calls (each call only reveals where the next one should start).
+        if (self.retrieval_mode not in ['raw', 'shape_preserving']):
+            # The server returns one sample for each aggregation period, so the number of samples is known:
+            self.estimated_sampling_period = max((self.aggregation_period_seconds * 1000), 1)
+        
+        elif (estimated_sampling_period_seconds is None):
+            # Run a cheap probe to estimate the sampling period, in ms:
+            self = self.probe_sampling_period(probe_rows = probe_rows, request_type = request_type)
+        
+        else:
+            # IP21 scale is in milliseconds:
+            self.estimated_sampling_period = max((estimated_sampling_period_seconds * 1000), 1)
+        
+        # Expected number of samples in the window:
+        window_span = (self.stop_ip21_scale - self.start_ip21_scale + 1)
+        expected_rows = window_span / self.estimated_sampling_period
+        
+        # Each shard should be fetched in a single call. Keep a safety margin, since the sampling rate
+        # may vary along the window (a shard with more rows is still paginated, but not in parallel):
+        rows_per_shard = max(int(self.max_rows_per_call * rows_per_shard_fraction), 1)
+        number_of_shards = int(np.ceil(expected_rows / rows_per_shard))
+        number_of_shards = min(max(number_of_shards, 1), max_shards)
+        
+        print(f"Estimated sampling period of tag {self.tag}: {self.estimated_sampling_period / 1000} s. Splitting the window into {number_of_shards} shards.\n")
+        
+        self = self.split_time_window(number_of_windows = number_of_shards)
+        
+        return self
+    
+
+    def concurrent_extraction (self, list_of_tags_to_extract, start_time, stop_time, start_timedelta_unit = 'day', stop_timedelta_unit = 'day', ip21time_array = [], previous_df_for_concatenation = None, max_concurrent_requests = 4, time_windows_per_tag = 1, estimated_sampling_period_seconds = None, request_type = 'get', cache = None):
+        
+        import copy
+        from concurrent.futures import ThreadPoolExecutor
+        
+        if (len(list_of_tags_to_extract) == 0):
+            print("There are no valid tags to extract.\n")
+            return []
+        
+        # Limit the number of simultaneous requests sent to this server:
+        self = self.set_server_semaphore(max_concurrent_requests = max_concurrent_requests)
+        
+        if ((self.session_params is None) or (self.session_params[0] < max_concurrent_requests)):
+            # The pool must keep one connection alive for each simultaneous request:
+            if (self.session_params is None):
+                self = self.create_session(pool_size = max_concurrent_requests)
+            else:
+                self = self.create_session(max_concurrent_requests, *self.session_params[1:])
+        
+        # Start a list of jobs. Each job is a tuple (tag index, window index, extractor, window start, window stop):
+        jobs = []
+        # List for storing the extractor prepared for each tag:
+        tag_extractors = []
+        # List for storing the planned intervals of each tag (extractors, or futures of the planners):
+        tags_interval_plans = []
+        
+        # The threads only wait for the server responses, so a thread pool is enough (the GIL is released during I/O):
+        with ThreadPoolExecutor(max_workers = max_concurrent_requests) as executor:
+            
+            for tag_index, tag_dict in enumerate(list_of_tags_to_extract):
+                
+                # Each tag has its own copy of the extractor, storing its query parameters:
+                tag_extractor = copy.copy(self)
+                tag_extractor = tag_extractor.set_query_parameters(tag_dict['tag'], tag_dict['actual_name'], start_time, stop_time, ip21time_array)
+                # Define the extracted time window:
+                tag_extractor = tag_extractor.set_extracted_time_window(start_timedelta_unit = start_timedelta_unit, stop_timedelta_unit = stop_timedelta_unit)
+                
+                if (cache is not None):
+                    # Fetch only the intervals that are not stored in the cache yet:
+                    tag_extractor.cache_key = cache.get_tag_key(self.server, self.data_source, tag_dict['tag'], self.retrieval_mode, self.aggregation_period_seconds)
+                    intervals_to_fetch = cache.find_missing_intervals(tag_extractor.cache_key, tag_extractor.start_ip21_scale, tag_extractor.stop_ip21_scale)
+                    print(f"{len(intervals_to_fetch)} intervals of tag {tag_dict['tag']} are missing in the cache.\n")
+                
+                else:
+                    intervals_to_fetch = [(tag_extractor.start_ip21_scale, tag_extractor.stop_ip21_scale)]
+                
+                interval_plans = []
+                
+                for interval_start, interval_stop in intervals_to_fetch:
+                    
+                    interval_extractor = copy.copy(tag_extractor)
+                    interval_extractor.start_ip21_scale = interval_start
+                    interval_extractor.stop_ip21_scale = interval_stop
+                    
+                    # Split the interval into disjoint sub-windows that may be fetched in parallel:
+                    if (time_windows_per_tag == 'auto'):
+                        # Plan the shards from the sampling period of the tag. The probe queries run in the pool,
+                        # in parallel, instead of one round trip after the other (each request still waits for
+                        # the server semaphore in fetch_database):
+                        interval_plans.append(executor.submit(interval_extractor.plan_time_window_shards, estimated_sampling_period_seconds = estimated_sampling_period_seconds, request_type = request_type))
+                    
+                    else:
+                        interval_plans.append(interval_extractor.split_time_window(number_of_windows = time_windows_per_tag))
+                
+                tag_extractors.append(tag_extractor)
+                tags_interval_plans.append(interval_plans)
+            
+            for tag_index, tag_extractor in enumerate(tag_extractors):
+                
+                time_windows = []
+                
+                for interval_plan in tags_interval_plans[tag_index]:
+                    
+                    if (time_windows_per_tag == 'auto'):
+                        # Wait for the probe of the interval:
+                        interval_plan = interval_plan.result()
+                    
+                    time_windows = time_windows + interval_plan.time_windows
+                
+                tag_extractor.time_windows = time_windows
+                
+                for window_index, (window_start, window_stop) in enumerate(tag_extractor.time_windows):
+                    jobs.append((tag_index, window_index, tag_extractor, window_start, window_stop))
+            
+            print(f"Fetching {len(list_of_tags_to_extract)} tags in {len(jobs)} time windows, with up to {max_concurrent_requests} simultaneous requests to the server.\n")
+            
+            futures = {(tag_index, window_index): executor.submit(tag_extractor.fetch_time_window, window_start, window_stop, request_type) for (tag_index, window_index, tag_extractor, window_start, window_stop) in jobs}
+        
+        # At this level, all the threads finished. Stitch the windows of each tag in chronological order:
+        returned_dfs_list = []
+        
+        if (cache is not None):
+            # Data registered after the current time may still be written on the server, so the 
+            # intervals are only considered complete up to now:
+            now_ip21_scale = int(convert_timestamps_to_ip21_timescale(pd.Timestamp.now())[0])
+        
+        for tag_index, tag_dict in enumerate(list_of_tags_to_extract):
+            
+            tag_extractor = tag_extractors[tag_index]
+            
+            window_extractors = [futures[(tag_index, window_index)].result() for window_index in range(len(tag_extractor.time_windows))]
+            
+            if (cache is not None):
+                
+                for window_extractor, (window_start, window_stop) in zip(window_extractors, tag_extractor.time_windows):
+                    
+                    if (window_extractor.window_completed):
+                        # The whole window was retrieved:
+                        materialized_stop = min(window_stop, now_ip21_scale)
+                    
+                    elif (window_extractor.window_last_ip21_timestamp is not None):
+                        # Only the pages until the failed call were retrieved:
+                        materialized_stop = int(window_extractor.window_last_ip21_timestamp)
+                    
+                    else:
+                        continue
+                    
+                    if (materialized_stop <= window_start):
+                        # e.g. the whole window is in the future: nothing was materialized.
+                        continue
+                    
+                    cache.store_samples(tag_extractor.cache_key, window_start, materialized_stop, window_extractor.dataset_ip21time_array, window_extractor.dataset)
+                
+                # Now, read the complete window from the cache:
+                window_dfs = [cache.load_samples(tag_extractor.cache_key, tag_extractor.start_ip21_scale, tag_extractor.stop_ip21_scale, tag_extractor.actual_tag_name)]
+            
+            else:
+                window_dfs = [window_extractor.dataset for window_extractor in window_extractors]
+            
+            window_dfs = [df for df in window_dfs if ((df is not None) and (len(df) > 0))]
+            
+            if (previous_df_for_concatenation is not None):
+                window_dfs = [previous_df_for_concatenation] + window_dfs
+            
+            if (len(window_dfs) > 0):
+                # Concatenate all dataframes (append rows):
+                extracted_df = pd.concat(window_dfs, axis = 0, join = "inner")
+                # The windows are disjoint, but guarantee that no timestamp is duplicated at the edges:
+                extracted_df = extracted_df.drop_duplicates(subset = ['timestamp'], keep = 'first')
+                # Reset previous indices so that numeration is continuous:
+                extracted_df = extracted_df.reset_index(drop = True)
+            
+            else:
+                print(f"There is no data available for tag {tag_dict['tag']} in the defined time window.\n")
+                extracted_df = None
+            
+            # Get a dictionary with the returned information:
+            returned_data = tag_dict
+            returned_data['dataset'] = extracted_df
+            returned_dfs_list.append(returned_data)
+        
+        # Keep the last tag parameters in the extractor, as in the serial extraction:
+        self.tag = tag_extractor.tag
+        self.actual_tag_name = tag_extractor.actual_tag_name
+        self.start_timestamp = tag_extractor.start_timestamp
+        self.stop_timestamp = tag_extractor.stop_timestamp
+        self.dataset = extracted_df
+        self.need_next_call = False
+        
+        return returned_dfs_list
+
+
+class IP21HistoryCache:
+    """
+    Class for storing the history of IP21 tags in a local SQLite file, so that only the time intervals
+    that were not extracted before are fetched from the server.
+    def __init__ (self, cache_path = 'ip21_cache.db', ttl_days = None, max_samples = None):
+
+    : param: cache_path: path of the SQLite file storing the cache. It is created if it does not exist.
+    : param: ttl_days = None: tags not accessed for more than ttl_days days are removed from the cache.
+      Keep it None to never remove tags by their age.
+    : param: max_samples = None: maximum total number of samples stored. When it is exceeded, the least
+      recently accessed tags are removed. Keep it None for no size limit.
+
+    The cache is keyed by server, data source and tag. For each tag, it registers the samples (in IP21 
+    timescale and as timestamps) and the intervals of IP21 timescale that were already materialized
+    (including the intervals with no samples), so they are not fetched again.
+    """
+
+    def __init__ (self, cache_path = 'ip21_cache.db', ttl_days = None, max_samples = None):
+        
+        import sqlite3
+        
+        self.cache_path = cache_path
+        self.ttl_days = ttl_days
+        self.max_samples = max_samples
+        
+        self.connection = sqlite3.connect(cache_path)
+        # Write-ahead log allows reading while the cache is updated:
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        
+        # Tags registered in the cache, with the last access (Unix time) and number of samples stored:
+        self.connection.execute("CREATE TABLE IF NOT EXISTS tags (tag_key TEXT PRIMARY KEY, server TEXT, data_source TEXT, tag TEXT, last_access REAL, number_of_samples INTEGER)")
+        # Materialized intervals of each tag, in IP21 timescale (both limits are inclusive):
+        self.connection.execute("CREATE TABLE IF NOT EXISTS intervals (tag_key TEXT, start INTEGER, stop INTEGER)")
+        # Samples: t is the IP21 time; ts is the timestamp in nanoseconds; v is the value (no type affinity,
+        # so numeric and text values are stored as they are):
+        self.connection.execute("CREATE TABLE IF NOT EXISTS samples (tag_key TEXT, t INTEGER, ts INTEGER, v, PRIMARY KEY (tag_key, t)) WITHOUT ROWID")
+        self.connection.commit()
+    
+
+    def get_tag_key (self, server, data_source, tag, retrieval_mode = 'raw', aggregation_period_seconds = None):
+        
+        import time
+        
+        tag_key = f"{server}|{data_source}|{tag}"
+        
+        if (retrieval_mode != 'raw'):
+            # Samples calculated by the server are stored separately from the raw history:
+            tag_key = f"{tag_key}|{retrieval_mode}|{aggregation_period_seconds}"
+        
+        # Register the tag, or update its last access:
+        self.connection.execute("INSERT INTO tags VALUES (?, ?, ?, ?, ?, 0) ON CONFLICT(tag_key) DO UPDATE SET last_access = excluded.last_access", (tag_key, str(server), str(data_source), str(tag), time.time()))
+        self.connection.commit()
+        
+        return tag_key
+    
+
+    def find_missing_intervals (self, tag_key, start_ip21_scale, stop_ip21_scale):
+        
+        # Get the materialized intervals overlapping the window, ordered by start:
+        intervals = self.connection.execute("SELECT start, stop FROM intervals WHERE tag_key = ? AND stop >= ? AND start <= ? ORDER BY start", (tag_key, start_ip21_scale, stop_ip21_scale)).fetchall()
+        
+        missing_intervals = []
+        # First IP21 time not covered yet:
+        current = start_ip21_scale
+        
+        for interval_start, interval_stop in intervals:
+            
+            if (interval_start > current):
+                # There is a gap before this interval:
+                missing_intervals.append((current, min((interval_start - 1), stop_ip21_scale)))
+            
+            current = max(current, (interval_stop + 1))
+            
+            if (current > stop_ip21_scale):
+                break
+        
+        if (current <= stop_ip21_scale):
+            missing_intervals.append((current, stop_ip21_scale))
+        
+        return missing_intervals
+    
+
+    def store_samples (self, tag_key, start_ip21_scale, stop_ip21_scale, ip21time_array, dataset):
+        
+        # Store the samples retrieved for the interval [start_ip21_scale, stop_ip21_scale], and register
+        # the interval as materialized.
+        
+        if (stop_ip21_scale <= start_ip21_scale):
+            # Inverted or empty interval: there is nothing to register.
+            return self
+        
+        if ((dataset is not None) and (len(dataset) > 0)):
+            
+            # The dataset columns are 'timestamp' and the tag name:
+            timestamps = dataset['timestamp'].to_numpy(dtype = 'datetime64[ns]').astype(np.int64)
+            values = dataset.iloc[:, 1].to_numpy()
+            
+            # Keep only the samples inside the interval (the last page may go beyond the current time):
+            inside_interval = ((ip21time_array >= start_ip21_scale) & (ip21time_array <= stop_ip21_scale))
+            
+            rows = zip([tag_key] * int(inside_interval.sum()), ip21time_array[inside_interval].tolist(), timestamps[inside_interval].tolist(), values[inside_interval].tolist())
+            self.connection.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?)", rows)
+        
+        # Merge the new interval with the overlapping or adjacent ones:
+        intervals = self.connection.execute("SELECT start, stop FROM intervals WHERE tag_key = ? AND stop >= ? AND start <= ?", (tag_key, (start_ip21_scale - 1), (stop_ip21_scale + 1))).fetchall()
+        
+        merged_start = min([start_ip21_scale] + [interval[0] for interval in intervals])
+        merged_stop = max([stop_ip21_scale] + [interval[1] for interval in intervals])
+        
+        self.connection.execute("DELETE FROM intervals WHERE tag_key = ? AND stop >= ? AND start <= ?", (tag_key, (start_ip21_scale - 1), (stop_ip21_scale + 1)))
+        self.connection.execute("INSERT INTO intervals VALUES (?, ?, ?)", (tag_key, merged_start, merged_stop))
+        
+        # Update the number of samples of the tag:
+        self.connection.execute("UPDATE tags SET number_of_samples = (SELECT COUNT(*) FROM samples WHERE tag_key = ?) WHERE tag_key = ?", (tag_key, tag_key))
+        self.connection.commit()
+        
+        return self
+    
+
+    def load_samples (self, tag_key, start_ip21_scale, stop_ip21_scale, tag_name):
+        
+        import time
+        
+        rows = self.connection.execute("SELECT ts, v FROM samples WHERE tag_key = ? AND t BETWEEN ? AND ? ORDER BY t", (tag_key, start_ip21_scale, stop_ip21_scale)).fetchall()
+        
+        # Update the last access:
+        self.connection.execute("UPDATE tags SET last_access = ? WHERE tag_key = ?", (time.time(), tag_key))
+        self.connection.commit()
+        
+        if (len(rows) == 0):
+            return None
+        
+        timestamps, values = zip(*rows)
+        dataset = pd.DataFrame({'timestamp': np.array(timestamps, dtype = np.int64).astype('datetime64[ns]'), tag_name: pd.Series(values)})
+        
+        return dataset
+    
+
+    def remove_tag (self, tag_key):
+        
+        for table in ['samples', 'intervals', 'tags']:
+            self.connection.execute(f"DELETE FROM {table} WHERE tag_key = ?", (tag_key,))
+        
+        self.connection.commit()
+        
+        return self
+    
+
+    def evict (self):
+        
+        import time
+        
+        if (self.ttl_days is not None):
+            # Remove the tags that were not accessed during the time to live:
+            oldest_access = time.time() - (self.ttl_days * 24 * 60 * 60)
+            expired_tags = self.connection.execute("SELECT tag_key FROM tags WHERE last_access < ?", (oldest_access,)).fetchall()
+            
+            for (tag_key,) in expired_tags:
+                print(f"Removing tag {tag_key} from the cache: it was not accessed in the last {self.ttl_days} days.")
+                self = self.remove_tag(tag_key)
+        
+        if (self.max_samples is not None):
+            # Remove the least recently accessed tags until the total number of samples fits the limit:
+            tags = self.connection.execute("SELECT tag_key, number_of_samples FROM tags ORDER BY last_access").fetchall()
+            total_samples = sum([tag[1] for tag in tags])
+            
+            for tag_key, number_of_samples in tags:
+                
+                if (total_samples <= self.max_samples):
+                    break
+                
+                print(f"Removing tag {tag_key} from the cache: the limit of {self.max_samples} samples was exceeded.")
+                self = self.remove_tag(tag_key)
+                total_samples = total_samples - number_of_samples
+        
+        return self
+    
+
+    def close (self):
+        
+        self.connection.close()
 
 
 class SQLServerConnection:
@@ -1389,9 +2811,17 @@ class SQLServerConnection:
                   database,
                   username = '', 
                   password = '',
-                  system = 'windows'):
+                  system = 'windows',
+                  pool_size = 4,
+                  pool_timeout = 300):
     
     : param: system = 'windows', 'macos' or 'linux'
+    : param: pool_size = 4: maximum number of pooled connections kept open with the server, besides the
+      main connection. They are reused by the parallel queries and by the streams instead of opening a new 
+      connection each time, and they never share the main connection (self.cnxn) used by the other methods.
+    : param: pool_timeout = 300: maximum time (in seconds) waiting for a pooled connection when all of them
+      are in use. A RuntimeError is raised when it expires, instead of waiting forever (e.g. when an open
+      stream holds the only pooled connection).
 
         If the user passes the argument, use them. Otherwise, use the standard values.
         Set the class objects' attributes.
@@ -1411,7 +2841,9 @@ class SQLServerConnection:
                   database,
                   username = '', 
                   password = '',
-                  system = 'windows'):
+                  system = 'windows',
+                  pool_size = 4,
+                  pool_timeout = 300):
 
         
         error_msg = """If ModuleNotFoundError is raised, run the following command to install pyodbc package, which is not required for running IDSW
@@ -1437,18 +2869,101 @@ class SQLServerConnection:
         
         
         if (system == 'windows'):
-            cnxn = pyodbc.connect('DRIVER={SQL Server};SERVER=' + server + ';DATABASE=' + database + ';UID=' + username + ';PWD=' + password)
+            connection_string = 'DRIVER={SQL Server};SERVER=' + server + ';DATABASE=' + database + ';UID=' + username + ';PWD=' + password
         
         else:
-            cnxn = pyodbc.connect('DRIVER={SQL Server};SERVER=' + server + ';DATABASE=' + database + ';UID=' + username + ';PWD=' + password + 'Encrypt=no;TrustServerCertificate=yes')
+            connection_string = 'DRIVER={SQL Server};SERVER=' + server + ';DATABASE=' + database + ';UID=' + username + ';PWD=' + password + ';Encrypt=no;TrustServerCertificate=yes'
             # https://stackoverflow.com/questions/71587239/operationalerror-when-trying-to-connect-to-sql-server-database-using-pyodbc/71588236#71588236
         
+        self.connection_string = connection_string
+        
+        cnxn = pyodbc.connect(connection_string)
         cursor = cnxn.cursor()
         
         self.cnxn = cnxn
         self.cursor = cursor
         self.query_counter = 0
         
+        # Pool of connections. The main connection is kept out of the pool, since it is used directly by
+        # the other methods (a pyodbc connection cannot run two queries at once). Pooled connections are only 
+        # opened when all the others are in use, up to pool_size connections:
+        self = self.create_connection_pool(pool_size = pool_size, pool_timeout = pool_timeout)
+        
+
+    def create_connection_pool (self, pool_size = 4, pool_timeout = 300):
+        
+        import queue
+        import threading
+        
+        self.pool_size = max(int(pool_size), 1)
+        self.pool_timeout = pool_timeout
+        # Idle connections, ready to be reused (the last one released is the first one reused):
+        self.connection_pool = queue.LifoQueue()
+        # Number of connections opened by the pool (self.cnxn is not one of them):
+        self.pool_connections_count = 0
+        self.pool_lock = threading.Lock()
+        
+        return self
+    
+
+    def acquire_connection (self):
+        
+        import queue
+        
+        try:
+            # Reuse an idle connection:
+            return self.connection_pool.get_nowait()
+        
+        except queue.Empty:
+            pass
+        
+        with self.pool_lock:
+            # Open a new connection if the limit was not reached:
+            open_new_connection = (self.pool_connections_count < self.pool_size)
+            if (open_new_connection):
+                self.pool_connections_count = self.pool_connections_count + 1
+        
+        if (open_new_connection):
+            import pyodbc
+            
+            try:
+                return pyodbc.connect(self.connection_string)
+            
+            except:
+                # Free the slot reserved for the connection that could not be opened:
+                with self.pool_lock:
+                    self.pool_connections_count = self.pool_connections_count - 1
+                raise
+        
+        # Wait until another query releases its connection:
+        try:
+            return self.connection_pool.get(timeout = self.pool_timeout)
+        
+        except queue.Empty:
+            raise RuntimeError(f"No pooled connection was released after {self.pool_timeout} seconds: all the {self.pool_size} pooled connections are in use. Close or finish the open streams (stream_sql_query), or increase pool_size.")
+    
+
+    def release_connection (self, cnxn):
+        
+        # Return the connection to the pool, so it can be reused:
+        self.connection_pool.put(cnxn)
+        
+        return self
+    
+
+    def read_sql_with_pooled_connection (self, query, params = None):
+        
+        # Run the query on a connection from the pool (it may be called from several threads at once):
+        cnxn = self.acquire_connection()
+        
+        try:
+            df = pd.read_sql(query, cnxn, params = params)
+        
+        finally:
+            self = self.release_connection(cnxn)
+        
+        return df
+        
 
     def get_db_schema (self, show_schema = True, export_csv = False, saving_directory_path = "db_schema.csv"):
         """
@@ -1608,6 +3123,166 @@ class SQLServerConnection:
             
         return df_table
     
+
+    def stream_sql_query (self, query, chunksize = 100000, dtypes = None, params = None):
+        """
+        Generator: run the query and yield the returned table as a sequence of pandas dataframes with 
+        up to chunksize rows each, so the full table never has to fit in memory at once. 
+        e.g.: for df_chunk in sqlserver_connector.stream_sql_query(query, chunksize = 100000): ...
+        
+        : param: query (str): SQL query to run.
+        : param: chunksize (int): maximum number of rows fetched (with cursor.fetchmany) for each dataframe.
+        : param: dtypes (dict): optional dictionary mapping column names to the dtypes that will be applied to 
+            every chunk, e.g. dtypes = {'value': 'float64', 'tag': 'category'}. The columns not declared
+            keep the dtypes inferred for the first chunk, so all the chunks have the same dtypes.
+        : param: params (list): optional parameters for a parameterized query (with '?' placeholders).
+        
+        The stream holds one pooled connection until it is exhausted or closed (df_chunks.close()), so
+        at most pool_size streams (plus parallel queries) may be open at once. Check pool_timeout.
+        """
+        
+        chunksize = max(int(chunksize), 1)
+        
+        # Use a connection from the pool (never the main connection self.cnxn), so the other queries 
+        # are not blocked while the stream is consumed:
+        cnxn = self.acquire_connection()
+        cursor = cnxn.cursor()
+        
+        try:
+            if (params is None):
+                cursor.execute(query)
+            else:
+                cursor.execute(query, params)
+            
+            columns = [description[0] for description in cursor.description]
+            reference_dtypes = None
+            
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                
+                if (len(rows) == 0):
+                    break
+                
+                # coerce_float converts the Decimal objects returned by the driver into floats,
+                # and infer_objects converts the remaining object columns (e.g. datetimes) into typed columns:
+                df_chunk = pd.DataFrame.from_records([tuple(row) for row in rows], columns = columns, coerce_float = True)
+                df_chunk = df_chunk.infer_objects()
+                
+                if (reference_dtypes is None):
+                    # The first chunk defines the dtypes of the whole stream:
+                    reference_dtypes = df_chunk.dtypes.to_dict()
+                    if (dtypes is not None):
+                        reference_dtypes.update(dtypes)
+                
+                for column, dtype in reference_dtypes.items():
+                    if (df_chunk[column].dtype != dtype):
+                        try:
+                            df_chunk[column] = df_chunk[column].astype(dtype)
+                        except:
+                            # e.g. integer column with missing values in this chunk: keep the inferred dtype.
+                            pass
+                
+                yield df_chunk
+        
+        finally:
+            cursor.close()
+            self = self.release_connection(cnxn)
+    
+
+    def stream_full_table (self, table, chunksize = 100000, dtypes = None):
+        """
+        Generator: return the full content from a table as a sequence of pandas dataframes with up to 
+        chunksize rows each. Check stream_sql_query.
+        
+        : param: table (str): string containing the name of the table that will be queried.
+        """
+        
+        query = "SELECT * FROM " + str(table)
+        
+        return self.stream_sql_query(query, chunksize = chunksize, dtypes = dtypes)
+    
+
+    def spill_sql_query (self, query, saving_directory_path = "", file_format = 'parquet', chunksize = 100000, dtypes = None):
+        """
+        Run the query and write the returned table straight to a file on disk, chunk by chunk, 
+        instead of loading it to the memory. Only one chunk is kept in the memory at a time.
+        
+        : param: query (str): SQL query to run.
+        : param: saving_directory_path (str): full path containing directories and file name, 
+            with .parquet or .csv extension.
+        : param: file_format (str): 'parquet' or 'csv'. Parquet requires pyarrow.
+        : param: chunksize (int): maximum number of rows fetched and written at each step.
+        : param: dtypes (dict): optional dictionary mapping column names to dtypes. Check stream_sql_query.
+        """
+        
+        if (file_format not in ['parquet', 'csv']):
+            raise InvalidInputsError("file_format must be 'parquet' or 'csv'.")
+        
+        query_counter = self.query_counter
+        
+        if ((saving_directory_path is None)|(saving_directory_path == '')):
+            saving_directory_path = f"table{query_counter}.{file_format}"
+        
+        total_rows = 0
+        
+        if (file_format == 'parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            writer = None
+            
+            try:
+                for df_chunk in self.stream_sql_query(query, chunksize = chunksize, dtypes = dtypes):
+                    arrow_table = pa.Table.from_pandas(df_chunk, preserve_index = False)
+                    
+                    if (writer is None):
+                        # The schema of the file is defined by the first chunk:
+                        writer = pq.ParquetWriter(saving_directory_path, arrow_table.schema)
+                    
+                    elif (arrow_table.schema != writer.schema):
+                        # e.g. columns that were promoted to float due to missing values, or that are fully null in a chunk:
+                        arrow_table = arrow_table.cast(writer.schema)
+                    
+                    writer.write_table(arrow_table)
+                    total_rows = total_rows + len(df_chunk)
+            
+            finally:
+                if (writer is not None):
+                    writer.close()
+        
+        else:
+            write_header = True
+            
+            for df_chunk in self.stream_sql_query(query, chunksize = chunksize, dtypes = dtypes):
+                # The first chunk creates the file with the header; the next ones are appended:
+                df_chunk.to_csv(saving_directory_path, mode = ('w' if write_header else 'a'), header = write_header, index = False)
+                write_header = False
+                total_rows = total_rows + len(df_chunk)
+        
+        if ControlVars.show_results: # dominant context
+            print(f"{total_rows} rows written to {saving_directory_path}.\n")
+        
+        vars(self)[f"spilled_file{query_counter}"] = saving_directory_path
+        self.spilled_rows = total_rows
+        
+        # Update counter:
+        self.query_counter = query_counter + 1
+        
+        return self
+    
+
+    def spill_full_table (self, table, saving_directory_path = "", file_format = 'parquet', chunksize = 100000, dtypes = None):
+        """
+        Write the full content from a table straight to a Parquet or CSV file on disk, chunk by chunk. 
+        Check spill_sql_query.
+        
+        : param: table (str): string containing the name of the table that will be queried.
+        """
+        
+        query = "SELECT * FROM " + str(table)
+        
+        return self.spill_sql_query(query, saving_directory_path = saving_directory_path, file_format = file_format, chunksize = chunksize, dtypes = dtypes)
+    
     
     def query_specific_tag_ip21sqlserver (self, tag, variable_name = None, show_table = True, export_csv = False, saving_directory_path = ""):
         """ : param: tag (str): string with tag as registered in IP21. e.g. tag = 'ABC00AA101-01'.
@@ -1652,6 +3327,91 @@ class SQLServerConnection:
         
             
         return tag_df
+    
+
+    def query_multiple_tags_ip21sqlserver (self, list_of_tags = [{'tag': None, 'actual_name': None}], batch_size = 500, max_parallel_queries = 1, show_table = True, export_csv = False, saving_directory_path = ""):
+        """ : param: list_of_tags: list of dictionaries with the keys 'tag', containing the tag as registered
+            in IP21, and 'actual_name', with a more readable name for the tag (it may be None).
+            e.g. list_of_tags = [{'tag': 'ABC00AA101-01', 'actual_name': 'Temperature in C'}, {'tag': 'ABC00AA101-02', 'actual_name': None}]
+        
+            : param: batch_size (int): maximum number of tags fetched by each query. The tags are passed as parameters
+            of a single WHERE TagName IN (...) clause, so each batch costs a single round trip.
+            SQL Server accepts up to 2100 parameters per query, and each tag is used twice, so batch_size <= 1000.
+
+            : param: max_parallel_queries (int): number of batches queried at the same time, each one on a
+            connection from the pool. Keep 1 to run the batches one after the other.
+        """
+        
+        from concurrent.futures import ThreadPoolExecutor
+        
+        query_counter = self.query_counter
+        
+        # Keep only the valid tags, and map each tag to its readable name:
+        list_of_tags = [tag_dict for tag_dict in list_of_tags if (tag_dict.get('tag') is not None)]
+        tags = [str(tag_dict['tag']) for tag_dict in list_of_tags]
+        variable_names = {str(tag_dict['tag']): (tag_dict['actual_name'] if (tag_dict.get('actual_name') is not None) else str(tag_dict['tag'])) for tag_dict in list_of_tags}
+        
+        batch_size = min(max(int(batch_size), 1), 1000)
+        batches = [tags[i:(i + batch_size)] for i in range(0, len(tags), batch_size)]
+        
+        def query_batch (batch):
+            # Parameterized query: the tags are never concatenated to the SQL string.
+            placeholders = ", ".join(["?"] * len(batch))
+            query = f"""SELECT d.ValueTime AS timestamp, t.TagName AS tag, d.Value AS value
+                        FROM IP21DataNumeric d
+                        INNER JOIN IP21PublishConfig t
+                        ON d.TagConfigID = t.ID
+                        WHERE t.TagName IN ({placeholders})
+                        UNION
+                        SELECT ValueTime AS timestamp, TagName AS tag, Value AS value
+                        FROM LatestIP21TagDataNumeric
+                        WHERE TagName IN ({placeholders});
+                    """
+            return self.read_sql_with_pooled_connection(query, params = (batch + batch))
+        
+        if ((max_parallel_queries > 1) & (len(batches) > 1)):
+            # Bounded fan-out: at most max_parallel_queries batches (and connections) at once:
+            if (self.pool_size < max_parallel_queries):
+                self.pool_size = max_parallel_queries
+            
+            with ThreadPoolExecutor(max_workers = max_parallel_queries) as executor:
+                batch_dfs = list(executor.map(query_batch, batches))
+        
+        else:
+            batch_dfs = [query_batch(batch) for batch in batches]
+        
+        if (len(batch_dfs) > 0):
+            tags_df = pd.concat(batch_dfs, axis = 0, ignore_index = True)
+        
+        else:
+            tags_df = pd.DataFrame(columns = ['timestamp', 'tag', 'value'])
+        
+        # Add the readable names, in the same column order of query_specific_tag_ip21sqlserver:
+        tags_df.insert(2, 'variable', tags_df['tag'].map(variable_names))
+        tags_df = tags_df.sort_values(by = ['timestamp', 'tag'], ascending = True, ignore_index = True)
+        
+        if ControlVars.show_results: # dominant context
+            if (show_table):   
+                print("Returned table:\n")
+                try:
+                    from IPython.display import display
+                    display(tags_df)
+                    
+                except:
+                    print(tags_df)
+        
+        vars(self)[f"df_query{query_counter}"] = tags_df
+
+        if (export_csv):
+            if ((saving_directory_path is None)|(saving_directory_path == '')):
+                saving_directory_path = f"table{query_counter}.csv"
+            
+            tags_df.to_csv(saving_directory_path)
+        
+        # Update counter:
+        self.query_counter = query_counter + 1
+        
+        return tags_df
 
 
 class SQLiteConnection:
@@ -1661,6 +3421,10 @@ class SQLiteConnection:
 
         self.file_path = file_path
         self.engine = pre_created_engine
+        # create_engine converts file_path into a SQLAlchemy URL, so keep the path of the file
+        # for the connections made directly with the sqlite3 module:
+        self.database_file_path = file_path
+        self.fast_connection = None
     
     
         error_msg = """If ModuleNotFoundError is raised, run the following command to install sqlalchemy package, which is not required for running IDSW
@@ -1751,7 +3515,7 @@ class SQLiteConnection:
             raise InvalidInputsError ("Error trying to fetch SQLite Database. If an pre-created engine was provided, check if it is correct and working.\n")
         
 
-    def update_or_create_table(self, table_name):
+    def update_or_create_table(self, table_name, df):
     
         # If there is no engine, create one:
         if (self.engine is None):
@@ -1759,7 +3523,7 @@ class SQLiteConnection:
             
         try:
             # Set index = False not to add extra indices in the database:
-            df.to_sql(table_name, con = engine, if_exists = 'replace', index = False)
+            df.to_sql(table_name, con = self.engine, if_exists = 'replace', index = False)
                 
             if ControlVars.show_results: 
                 print(f"Successfully updated table {table_name} on the SQLite database.")
@@ -1777,6 +3541,230 @@ class SQLiteConnection:
         
         except:
             raise InvalidInputsError ("Error trying to update SQLite Database. If an pre-created engine was provided, check if it is correct and working.\n")
+    
+
+    def create_fast_connection(self, journal_mode = 'WAL', synchronous = 'OFF', cache_size_mb = 256):
+        """
+        Open a connection with the built-in sqlite3 module (no SQLAlchemy), tuned for bulk reads and writes.
+        
+        : param: journal_mode (str): 'WAL' (write-ahead log) allows reading the database while it is written,
+            and makes the commits cheaper. Use 'DELETE' for the SQLite default.
+        : param: synchronous (str): 'OFF' does not wait for the data to be flushed to the disk after each commit.
+            It is much faster, but the last transactions may be lost (without corrupting the file) if the 
+            operating system crashes. Use 'NORMAL' or 'FULL' for safer writes.
+        : param: cache_size_mb (int): size of the page cache of the connection, in MB.
+        """
+        
+        import sqlite3
+        
+        if (self.fast_connection is not None):
+            return self
+        
+        # isolation_level = None: the transactions are explicitly controlled by fast_write_table.
+        connection = sqlite3.connect(self.database_file_path, isolation_level = None, check_same_thread = False)
+        connection.execute(f"PRAGMA journal_mode = {journal_mode}")
+        connection.execute(f"PRAGMA synchronous = {synchronous}")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        # Negative values are in KiB, instead of number of pages:
+        connection.execute(f"PRAGMA cache_size = {-1024 * int(cache_size_mb)}")
+        
+        self.fast_connection = connection
+        
+        return self
+    
+
+    def fast_write_table(self, table_name, df, if_exists = 'replace', chunksize = 100000):
+        """
+        Bulk write of a dataframe to a table, through prepared INSERT statements run with executemany,
+        in large transactions (one per chunk), instead of the row-by-row insertion of SQLAlchemy.
+        The timestamps are stored as text, in the same format written by pandas to_sql, and the
+        timezone-aware timestamps are converted to UTC before being stored (the offset is not kept). The
+        timedeltas are stored as the total number of seconds (REAL). Missing values, including the pd.NA
+        of the nullable dtypes (Int64, Float64, boolean, string), are stored as NULL.
+        
+        : param: table_name (str): name of the table that will be created or updated.
+        : param: df (pd.DataFrame): dataframe that will be written. The index is not written.
+        : param: if_exists (str): 'replace' to drop the table (if it exists) and create it again; 'append'
+            to add the rows to the existing table (it is created if it does not exist).
+        : param: chunksize (int): number of rows inserted in each transaction.
+        """
+        
+        if (if_exists not in ['replace', 'append']):
+            raise InvalidInputsError("if_exists must be 'replace' or 'append'.")
+        
+        self = self.create_fast_connection()
+        connection = self.fast_connection
+        
+        # SQLite types for each dtype kind:
+        sqlite_types = {'i': 'INTEGER', 'u': 'INTEGER', 'b': 'INTEGER', 'f': 'REAL', 'm': 'REAL', 'M': 'TIMESTAMP'}
+        columns = list(df.columns)
+        column_definitions = ", ".join(['"' + str(column) + '" ' + sqlite_types.get(df[column].dtype.kind, 'TEXT') for column in columns])
+        
+        if (if_exists == 'replace'):
+            connection.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+        
+        connection.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({column_definitions})')
+        
+        # Prepared statement, compiled once and reused for all the rows:
+        quoted_columns = ", ".join(['"' + str(column) + '"' for column in columns])
+        placeholders = ", ".join(["?"] * len(columns))
+        insert_statement = f'INSERT INTO "{table_name}" ({quoted_columns}) VALUES ({placeholders})'
+        
+        chunksize = max(int(chunksize), 1)
+        
+        for i in range(0, len(df), chunksize):
+            df_chunk = df.iloc[i:(i + chunksize)]
+            columns_values = []
+            
+            for column in columns:
+                series = df_chunk[column]
+                
+                if (series.dtype.kind == 'M'):
+                    if (series.dt.tz is not None):
+                        # The text format has no offset: store the timezone-aware timestamps in UTC.
+                        series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+                    # Same text format of pandas to_sql; missing timestamps are stored as NULL:
+                    values = series.dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+                    values = values.astype(object).where(series.notna(), None).tolist()
+                
+                elif (series.dtype.kind == 'm'):
+                    # sqlite3 does not accept timedelta objects: store the total number of seconds.
+                    values = series.dt.total_seconds()
+                    values = values.astype(object).where(series.notna(), None).tolist()
+                
+                elif ((series.dtype.kind in ['i', 'u', 'b', 'f']) & (not pd.api.types.is_extension_array_dtype(series.dtype))):
+                    # tolist returns Python numbers, accepted by sqlite3. NaN is stored as NULL.
+                    values = series.tolist()
+                
+                else:
+                    # Also the nullable dtypes (e.g. Int64, boolean), whose missing values (pd.NA) are
+                    # not accepted by sqlite3:
+                    values = series.astype(object).where(series.notna(), None).tolist()
+                
+                columns_values.append(values)
+            
+            connection.execute("BEGIN")
+            
+            try:
+                connection.executemany(insert_statement, zip(*columns_values))
+                connection.execute("COMMIT")
+            
+            except:
+                connection.execute("ROLLBACK")
+                raise
+        
+        if ControlVars.show_results: 
+            print(f"Successfully wrote {len(df)} rows on table {table_name} from the SQLite database.\n")
+        
+        return self
+    
+
+    def create_index_on_table(self, table_name, columns):
+        """
+        Create an index on the columns (if it does not exist), so the filters on these columns 
+        (e.g. the time range of fast_read_table) do not need to scan the whole table.
+        
+        : param: table_name (str): name of the table.
+        : param: columns (str or list): column or list of columns of the index.
+        """
+        
+        if (type(columns) == str):
+            columns = [columns]
+        
+        self = self.create_fast_connection()
+        
+        index_name = f"idx_{table_name}_" + "_".join([str(column) for column in columns])
+        quoted_columns = ", ".join(['"' + str(column) + '"' for column in columns])
+        self.fast_connection.execute(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({quoted_columns})')
+        
+        return self
+    
+
+    def fast_read_table(self, table_name, columns = None, time_column = None, start_timestamp = None, stop_timestamp = None, where_clause = None, params = None, chunksize = None):
+        """
+        Read a table through the sqlite3 module, with the selection of columns and rows done by SQLite 
+        (predicate pushdown), so only the requested data is loaded to the memory.
+        
+        : param: table_name (str): name of the table.
+        : param: columns (list): list of columns to read. If None, all the columns are read.
+        : param: time_column (str): column with the timestamps used for filtering the rows between
+            start_timestamp (inclusive) and stop_timestamp (exclusive). It is returned as datetime.
+            Create an index on it with create_index_on_table to avoid full table scans.
+        : param: start_timestamp, stop_timestamp: limits of the time range (strings, datetimes, or numbers if
+            time_column stores numbers). None for no limit. Timezone-aware limits are converted to UTC, as
+            the timestamps stored by fast_write_table.
+        : param: where_clause (str): additional SQL condition, e.g. where_clause = "tag = ?"
+        : param: params (list): parameters of the '?' placeholders of where_clause.
+        : param: chunksize (int): if not None, a generator of dataframes with up to chunksize rows is returned,
+            instead of a single dataframe.
+        """
+        
+        self = self.create_fast_connection()
+        
+        if (columns is None):
+            selected_columns = "*"
+        else:
+            selected_columns = ", ".join(['"' + str(column) + '"' for column in columns])
+        
+        conditions = []
+        query_params = []
+        
+        for limit, operator in [(start_timestamp, '>='), (stop_timestamp, '<')]:
+            if ((time_column is not None) & (limit is not None)):
+                if isinstance(limit, numbers.Number):
+                    # Also the NumPy numbers, converted to Python numbers accepted by sqlite3:
+                    limit = limit.item() if isinstance(limit, np.generic) else limit
+                
+                else:
+                    limit = pd.Timestamp(limit)
+                    if (limit.tz is not None):
+                        limit = limit.tz_convert('UTC').tz_localize(None)
+                    # Same text format used for storing the timestamps:
+                    limit = limit.strftime('%Y-%m-%d %H:%M:%S.%f')
+                
+                conditions.append(f'"{time_column}" {operator} ?')
+                query_params.append(limit)
+        
+        if (where_clause is not None):
+            conditions.append(f"({where_clause})")
+            if (params is not None):
+                query_params = query_params + list(params)
+        
+        query = f'SELECT {selected_columns} FROM "{table_name}"'
+        
+        if (len(conditions) > 0):
+            query = query + " WHERE " + " AND ".join(conditions)
+        
+        parse_dates = [time_column] if (time_column is not None) else None
+        
+        if (chunksize is not None):
+            # pandas fetches the rows in chunks (cursor.fetchmany), yielding one dataframe at a time:
+            return pd.read_sql(query, self.fast_connection, params = query_params, parse_dates = parse_dates, chunksize = int(chunksize))
+        
+        df = pd.read_sql(query, self.fast_connection, params = query_params, parse_dates = parse_dates)
+        
+        if ControlVars.show_results: 
+            print(f"Successfully retrieved {len(df)} rows from table {table_name} from the database.")
+            print("Check the 10 first rows of the dataframe:\n")
+            
+            try:
+                # only works in Jupyter Notebook:
+                from IPython.display import display
+                display(df.head(10))
+                    
+            except: # regular mode
+                print(df.head(10))
+        
+        return df
+    
+
+    def close_fast_connection(self):
+        
+        if (self.fast_connection is not None):
+            self.fast_connection.close()
+            self.fast_connection = None
+        
+        return self
             
 
 class GCPBigQueryConnection:
@@ -1849,6 +3837,9 @@ class GCPBigQueryConnection:
         from google.oauth2 import service_account
         import google.auth
         
+        self.project = project
+        self.dataset = dataset
+        
         if ((project is None)|(project == '')):
             # Ask the user to provide the credentials:
             # This is the name that appears on the right-hand menu from GCP console Big Query page, 
@@ -1882,6 +3873,9 @@ class GCPBigQueryConnection:
             
         """
         
+        from google.cloud import bigquery
+        from google.cloud import bigquery_storage
+        
         if self.already_authenticated:
             self.bqclient = bigquery.Client(project = self.project)
             try:
@@ -2135,19 +4129,86 @@ class GCPBigQueryConnection:
             return False
 
 
-    def run_sql_query (self, query, show_table = True, export_csv = False, saving_directory_path = ""):
+    def download_rows_as_arrow (self, rows, arrow_backed_dtypes = False):
+        """
+        Columnar download of the rows returned by a query job or by the listing of a table.
+        The data is transferred as Arrow record batches through the BigQuery Storage Read API 
+        (when the bigquery_storage client is available, otherwise BigQuery falls back to the REST API), 
+        and converted to pandas only once, column by column.
+        
+        : param: rows: google.cloud.bigquery RowIterator, e.g. client.query(query).result() or client.list_rows(table_id).
+        : param: arrow_backed_dtypes (bool): if True, the returned dataframe keeps the Arrow memory, with
+            pd.ArrowDtype columns (no copy to NumPy). If False, standard NumPy-backed columns are returned.
+        """
+        
+        bqstorage_client = getattr(self, 'bqstorageclient', None)
+        # If there is no storage client, let BigQuery try to create one from the default credentials:
+        arrow_table = rows.to_arrow(bqstorage_client = bqstorage_client, create_bqstorage_client = (bqstorage_client is None))
+        
+        if (arrow_backed_dtypes):
+            df = arrow_table.to_pandas(types_mapper = pd.ArrowDtype)
+        
+        else:
+            # split_blocks and self_destruct release the Arrow memory while the columns are converted,
+            # so the peak memory does not hold two full copies of the table:
+            df = arrow_table.to_pandas(split_blocks = True, self_destruct = True)
+        
+        del arrow_table
+        
+        return df
+    
+
+    def stream_record_batches (self, query = None, table = None):
+        """
+        Generator: run the query (or list the full table, when query is None) and yield the results as 
+        pyarrow RecordBatches, so results larger than the memory can be processed batch by batch.
+        e.g.: for record_batch in gcp_connector.stream_record_batches(table = 'my_table'): df_batch = record_batch.to_pandas()
+        
+        : param: query (str): SQL query to run.
+        : param: table (str): name of the table to be listed when no query is declared. 
+            Full table name is `{self.project}.{self.dataset}.{str(table)}`
+        """
+        
+        client = self.bqclient
+        
+        if ((query is not None) and (query != '')):
+            rows = client.query(query).result()
+        
+        elif ((table is not None) and (table != '')):
+            # Listing the table reads it directly, without running (and paying for) a query job:
+            rows = client.list_rows(f"{self.project}.{self.dataset}.{str(table)}")
+        
+        else:
+            raise InvalidInputsError("Declare a query or a table to stream the record batches.")
+        
+        bqstorage_client = getattr(self, 'bqstorageclient', None)
+        
+        for record_batch in rows.to_arrow_iterable(bqstorage_client = bqstorage_client):
+            yield record_batch
+    
+
+    def run_sql_query (self, query, show_table = True, export_csv = False, saving_directory_path = "", use_arrow_transfer = False, arrow_backed_dtypes = False):
         """
         : param: show_table (bool): keep as True to print the queried table, set False to hide it.
         : param: export_csv (bool): set True to export the queried table as CSV file, or set False not to export it.
         : param: saving_directory_path (str): full path containing directories and table name, 
             with .csv extension, used when export_csv = True
+        : param: use_arrow_transfer (bool): if True, the results are downloaded in columnar (Arrow) format 
+            through the BigQuery Storage Read API. Recommended for large results. Check download_rows_as_arrow.
+        : param: arrow_backed_dtypes (bool): if True (and use_arrow_transfer = True), return a dataframe with
+            Arrow-backed (pd.ArrowDtype) columns, avoiding the conversion to NumPy.
         """
 
         query_counter = self.query_counter
 
         client = self.bqclient
         job = client.query(query)
-        df = job.to_dataframe()
+        
+        if (use_arrow_transfer):
+            df = self.download_rows_as_arrow(job.result(), arrow_backed_dtypes = arrow_backed_dtypes)
+        
+        else:
+            df = job.to_dataframe()
 
         if ControlVars.show_results: # dominant context
             if (show_table):   
@@ -2177,24 +4238,34 @@ class GCPBigQueryConnection:
         return df
         
         
-    def get_full_table (self, table, show_table = True, export_csv = False, saving_directory_path = ""):
+    def get_full_table (self, table, show_table = True, export_csv = False, saving_directory_path = "", use_arrow_transfer = False, arrow_backed_dtypes = False):
         """
         : param: table (str): name of the table to be retrieved. Full table name is `{self.project}.{self.dataset}.{str(table)}`
         : param: show_table (bool): keep as True to print the queried table, set False to hide it.
         : param: export_csv (bool): set True to export the queried table as CSV file, or set False not to export it.
         : param: saving_directory_path (str): full path containing directories and table name, 
             with .csv extension, used when export_csv = True
+        : param: use_arrow_transfer (bool): if True, the table is read directly (without a SELECT * query job)
+            and downloaded in columnar (Arrow) format through the BigQuery Storage Read API.
+        : param: arrow_backed_dtypes (bool): if True (and use_arrow_transfer = True), return a dataframe with
+            Arrow-backed (pd.ArrowDtype) columns, avoiding the conversion to NumPy.
         """
 
         table_name = f"""`{self.project}.{self.dataset}.{str(table)}`"""
         
         query_counter = self.query_counter
-
-        query = "SELECT * FROM " + table_name
-            
+        
         client = self.bqclient
-        job = client.query(query)
-        df_table = job.to_dataframe()
+        
+        if (use_arrow_transfer):
+            # Listing the rows reads the table storage directly, with no query to be run:
+            rows = client.list_rows(f"{self.project}.{self.dataset}.{str(table)}")
+            df_table = self.download_rows_as_arrow(rows, arrow_backed_dtypes = arrow_backed_dtypes)
+        
+        else:
+            query = "SELECT * FROM " + table_name
+            job = client.query(query)
+            df_table = job.to_dataframe()
         
         if ControlVars.show_results: # dominant context
             if (show_table): 
@@ -2224,11 +4295,17 @@ class GCPBigQueryConnection:
         return df_table
     
 
-    def write_data_on_bigquery_table (self, table, df):
+    def write_data_on_bigquery_table (self, table, df, use_load_job = False, chunksize = None):
         """
         : param: table (str): string with table name
         : param: df (pd.DataFrame): Pandas dataframe to be written on BigQuery table
+        : param: use_load_job (bool): if True, the dataframe is appended through Parquet load jobs, 
+            which are much faster for large dataframes. Check load_dataframe_to_table.
+        : param: chunksize (int): maximum number of rows of each load job, when use_load_job = True.
         """
+        
+        if (use_load_job):
+            return self.load_dataframe_to_table(table, df, write_disposition = 'WRITE_APPEND', chunksize = chunksize)
 
         client = self.bqclient
         table_ref = client.dataset(self.dataset).table(str(table))
@@ -2246,6 +4323,208 @@ class GCPBigQueryConnection:
             return self
 
 
+    def report_write_throughput (self, operation, rows, start_time):
+        """
+        Store and print the throughput of a write operation, in rows per second.
+        
+        : param: operation (str): description of the operation, e.g. 'load' or 'merge'.
+        : param: rows (int): number of rows written.
+        : param: start_time (float): time.perf_counter() value obtained before the operation started.
+        """
+        
+        import time
+        
+        elapsed_seconds = time.perf_counter() - start_time
+        rows_per_second = (rows / elapsed_seconds) if (elapsed_seconds > 0) else np.nan
+        
+        self.write_throughput = {'operation': operation, 'rows': rows, 'seconds': elapsed_seconds, 'rows_per_second': rows_per_second}
+        
+        if ControlVars.show_results: # dominant context
+            print(f"{operation}: {rows} rows written in {elapsed_seconds:.2f} s ({rows_per_second:.1f} rows/s).\n")
+        
+        return self
+    
+
+    def load_dataframe_to_table (self, table, df, write_disposition = 'WRITE_APPEND', chunksize = None):
+        """
+        Bulk write of a dataframe through BigQuery load jobs: the data is serialized to Parquet and loaded
+        in a single job per chunk, instead of being inserted row by row with the streaming API.
+        Loaded rows do not go to the streaming buffer, so they can be updated or deleted immediately.
+        
+        : param: table (str): string with table name. Full table name is `{self.project}.{self.dataset}.{str(table)}`
+        : param: df (pd.DataFrame): Pandas dataframe to be written on BigQuery table.
+        : param: write_disposition (str): 'WRITE_APPEND' to append the rows to the table; 'WRITE_TRUNCATE' to replace 
+            the table content; 'WRITE_EMPTY' to write only if the table is empty. The table is created if it does not exist.
+        : param: chunksize (int): if not None, maximum number of rows of each load job. Keep None to load the
+            whole dataframe in a single job.
+        """
+        
+        import time
+        from google.cloud import bigquery
+        
+        client = self.bqclient
+        table_id = f"{self.project}.{self.dataset}.{str(table)}"
+        
+        if ((chunksize is None) or (chunksize <= 0)):
+            chunksize = max(len(df), 1)
+        
+        start_time = time.perf_counter()
+        
+        for i in range(0, max(len(df), 1), chunksize):
+            # Only the first chunk may truncate the table; the next ones are appended to it:
+            job_config = bigquery.LoadJobConfig(
+                source_format = bigquery.SourceFormat.PARQUET,
+                write_disposition = (write_disposition if (i == 0) else 'WRITE_APPEND'))
+            
+            job = client.load_table_from_dataframe(df.iloc[i:(i + chunksize)], table_id, job_config = job_config)
+            # Wait for the job to finish (and raise its errors, if any):
+            job.result()
+        
+        self = self.report_write_throughput(f"Load on {table_id}", len(df), start_time)
+        
+        return self
+    
+
+    def merge_dataframe_on_table (self, table, df, key_columns, update_columns = None, insert_new_rows = True, delete_staging_table = True):
+        """
+        Batched upsert: the dataframe is loaded to a staging table (single Parquet load job), and all the rows
+        are applied to the target table with a single MERGE statement, instead of one DML statement per row.
+        
+        : param: table (str): string with the target table name.
+        : param: df (pd.DataFrame): Pandas dataframe with the new rows and values.
+        : param: key_columns (str or list): column(s) used for matching the rows of df with the rows of the table.
+        : param: update_columns (list): columns updated in the matched rows. If None, all the columns of df that
+            are not keys are updated.
+        : param: insert_new_rows (bool): if True, the rows of df with no match in the table are inserted.
+        : param: delete_staging_table (bool): if True, the staging table is deleted after the MERGE.
+        """
+        
+        import time
+        import uuid
+        
+        client = self.bqclient
+        
+        if (type(key_columns) == str):
+            key_columns = [key_columns]
+        
+        if (update_columns is None):
+            update_columns = [column for column in df.columns if (column not in key_columns)]
+        
+        if ((len(update_columns) == 0) & (insert_new_rows == False)):
+            # The MERGE statement would have no WHEN clause, which BigQuery rejects:
+            raise InvalidInputsError("There is nothing to merge: declare the update_columns, or set insert_new_rows = True.")
+        
+        table_id = f"{self.project}.{self.dataset}.{str(table)}"
+        table_ref = client.get_table(table_id)
+        
+        if table_ref.streaming_buffer is not None:
+            raise RuntimeError("Table contains data in a streaming buffer, which cannot be updated or deleted. Please perform this action when the streaming buffer is empty (may take up to 90 minutes from last data insertion).")
+        
+        start_time = time.perf_counter()
+        
+        staging_table = f"{str(table)}_staging_{uuid.uuid4().hex[:12]}"
+        staging_table_id = f"{self.project}.{self.dataset}.{staging_table}"
+        
+        # Silence the report of the staging load; the report is done for the full operation:
+        show_results = ControlVars.show_results
+        ControlVars.show_results = False
+        
+        try:
+            self = self.load_dataframe_to_table(staging_table, df, write_disposition = 'WRITE_TRUNCATE')
+        
+        finally:
+            ControlVars.show_results = show_results
+        
+        on_clause = " AND ".join([f"T.`{column}` = S.`{column}`" for column in key_columns])
+        merge_query = f"""
+                    MERGE `{table_id}` T
+                    USING `{staging_table_id}` S
+                    ON {on_clause}
+                    """
+        
+        if (len(update_columns) > 0):
+            set_clause = ", ".join([f"`{column}` = S.`{column}`" for column in update_columns])
+            merge_query = merge_query + f"""WHEN MATCHED THEN UPDATE SET {set_clause}
+                    """
+        
+        if (insert_new_rows):
+            columns = ", ".join([f"`{column}`" for column in df.columns])
+            values = ", ".join([f"S.`{column}`" for column in df.columns])
+            merge_query = merge_query + f"""WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})
+                    """
+        
+        try:
+            job = client.query(merge_query)
+            job.result()
+            self.merged_rows = job.num_dml_affected_rows
+        
+        finally:
+            if (delete_staging_table):
+                client.delete_table(staging_table_id, not_found_ok = True)
+        
+        self = self.report_write_throughput(f"Merge on {table_id}", len(df), start_time)
+        
+        return self
+    
+
+    def batch_update_values_from_column_on_table (self, table, column, old_to_updated_values):
+        """
+        Batched version of update_specific_value_from_column_on_table: replace many values of a column
+        with a single MERGE statement, instead of one UPDATE statement for each value.
+        
+        : param: column (str): is the column name on a given BigQuery table (a string).
+        : param: old_to_updated_values (dict): dictionary mapping each value that must be replaced to its new value.
+            e.g. old_to_updated_values = {'old_name1': 'new_name1', 'old_name2': 'new_name2'}
+        """
+        
+        import time
+        import uuid
+        
+        client = self.bqclient
+        table_id = f"{self.project}.{self.dataset}.{str(table)}"
+        
+        # Mapping table, loaded to a staging table: 
+        mapping_df = pd.DataFrame({'old_value': list(old_to_updated_values.keys()), 'updated_value': list(old_to_updated_values.values())})
+        
+        table_ref = client.get_table(table_id)
+        
+        if table_ref.streaming_buffer is not None:
+            raise RuntimeError("Table contains data in a streaming buffer, which cannot be updated or deleted. Please perform this action when the streaming buffer is empty (may take up to 90 minutes from last data insertion).")
+        
+        start_time = time.perf_counter()
+        
+        staging_table = f"{str(table)}_staging_{uuid.uuid4().hex[:12]}"
+        staging_table_id = f"{self.project}.{self.dataset}.{staging_table}"
+        
+        show_results = ControlVars.show_results
+        ControlVars.show_results = False
+        
+        try:
+            self = self.load_dataframe_to_table(staging_table, mapping_df, write_disposition = 'WRITE_TRUNCATE')
+        
+        finally:
+            ControlVars.show_results = show_results
+        
+        merge_query = f"""
+                    MERGE `{table_id}` T
+                    USING `{staging_table_id}` S
+                    ON T.`{column}` = S.old_value
+                    WHEN MATCHED THEN UPDATE SET `{column}` = S.updated_value
+                    """
+        
+        try:
+            job = client.query(merge_query)
+            job.result()
+            self.merged_rows = job.num_dml_affected_rows
+        
+        finally:
+            client.delete_table(staging_table_id, not_found_ok = True)
+        
+        self = self.report_write_throughput(f"Update of {len(mapping_df)} values of {column} on {table_id}", (self.merged_rows or 0), start_time)
+        
+        return self
+    
+
     def delete_specific_values_from_column_on_table (self, table, column, values_to_delete, show_table = True, export_csv = False, saving_directory_path = ""):
         """
         : param: column (str): is the column name on a given BigQuery table (a string).
@@ -2711,6 +4990,17 @@ class IngestExcelTables:
         self.wb = openpyxl.load_workbook(file_path)
         self.worksheets = self.wb.worksheets # list of worksheets
         self.loaded_dfs = [] # list of loaded dataframes
+        # Open the file for pandas only once, instead of once for each sheet or table read:
+        self.excel_file = pd.ExcelFile(file_path)
+    
+
+    def close(self):
+        
+        # Release the opened file:
+        self.excel_file.close()
+        self.wb.close()
+        
+        return self
     
     
     def pre_cleansing(self, df):
@@ -2784,10 +5074,10 @@ class IngestExcelTables:
         # Read table as pandas dataframe:
         
         if (has_header == True):         
-            table = pd.read_excel(self.file_path, sheet_name = sheet_name, skiprows = skiprows, usecols = usecols, na_values = None, verbose = False, parse_dates = True)
+            table = pd.read_excel(self.excel_file, sheet_name = sheet_name, skiprows = skiprows, usecols = usecols, na_values = None, verbose = False, parse_dates = True)
         
         else:
-            table = pd.read_excel(self.file_path, sheet_name = sheet_name, header = None, skiprows = skiprows, usecols = usecols, na_values = None, verbose = False, parse_dates = True)
+            table = pd.read_excel(self.excel_file, sheet_name = sheet_name, header = None, skiprows = skiprows, usecols = usecols, na_values = None, verbose = False, parse_dates = True)
         
         # Do the pre-cleansing:
         table = self.pre_cleansing(table)
@@ -2799,10 +5089,10 @@ class IngestExcelTables:
         """Read the entire sheet, instead of an individual table"""
         
         if (has_header == True):         
-            table = pd.read_excel(self.file_path, sheet_name = sheet_name, na_values = None, verbose = False, parse_dates = True)
+            table = pd.read_excel(self.excel_file, sheet_name = sheet_name, na_values = None, verbose = False, parse_dates = True)
 
         else:
-            table = pd.read_excel(self.file_path, sheet_name = sheet_name, header = None, na_values = None, verbose = False, parse_dates = True)
+            table = pd.read_excel(self.excel_file, sheet_name = sheet_name, header = None, na_values = None, verbose = False, parse_dates = True)
                     
         # Pre-cleansing:
         table = self.pre_cleansing(table)
@@ -2899,6 +5189,140 @@ class IngestExcelTables:
         return self
 
 
+def ingest_excel_file (file_path, has_header = True):
+    """
+    Parse all the sheets (and the tables formatted inside them) of a single Excel file, with IngestExcelTables.
+    It is defined at module level so it can be run by the worker processes of ingest_excel_files.
+    
+    : param: file_path (str): full path of the Excel file.
+    : param: has_header (bool): True if the tables have a row with the columns names.
+    
+    Returns a list of dictionaries with the keys 'file', 'sheet', 'table' and 'df'.
+    """
+    
+    ingestion = IngestExcelTables(file_path)
+    ingestion = ingestion.load_dfs(has_header)
+    ingestion = ingestion.close()
+    
+    return [{'file': file_path, 'sheet': loaded_df['sheet'], 'table': loaded_df['table'], 'df': loaded_df['df']} for loaded_df in ingestion.loaded_dfs]
+
+
+class ExcelIngestionCache:
+    """
+    Local cache of the dataframes parsed from Excel files, so unchanged workbooks are never parsed again.
+    
+    The parsed results of each file are stored as a pickle named by the SHA-256 hash of the file content and by
+    the parsing options (has_header), so results parsed with different options are never mixed up. 
+    A manifest (JSON) maps the path of each file to its modification time (mtime), size and hash:
+    - if mtime and size did not change, the cached result is used without reading the file;
+    - if they changed, the file is hashed: if the content is the same (e.g. the file was only copied or touched),
+      the cached result is still used; otherwise, the file must be parsed again.
+
+    : param: cache_directory (str): directory where the manifest and the parsed results are stored.
+    """
+    
+    def __init__ (self, cache_directory = "excel_ingestion_cache"):
+        
+        import os
+        import json
+        
+        self.cache_directory = cache_directory
+        os.makedirs(cache_directory, exist_ok = True)
+        
+        self.manifest_path = os.path.join(cache_directory, "manifest.json")
+        
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as opened_file:
+                self.manifest = json.load(opened_file)
+        else:
+            self.manifest = {}
+    
+
+    def hash_file (self, file_path, block_size = 1048576):
+        
+        import hashlib
+        
+        file_hash = hashlib.sha256()
+        
+        with open(file_path, 'rb') as opened_file:
+            # Read in blocks, so large files are not loaded to the memory at once:
+            for block in iter(lambda: opened_file.read(block_size), b''):
+                file_hash.update(block)
+        
+        return file_hash.hexdigest()
+    
+
+    def get_results_path (self, file_hash, has_header = True):
+        
+        import os
+        
+        # The parsing options are part of the key of the results:
+        return os.path.join(self.cache_directory, f"{file_hash}_header{int(bool(has_header))}.pkl")
+    
+
+    def load_results (self, file_path, has_header = True):
+        """
+        Return the cached list of parsed dataframes of the file, or None if the file must be parsed.
+        The results are only returned if they were parsed with the same has_header option.
+        """
+        
+        import os
+        
+        file_key = os.path.abspath(file_path)
+        entry = self.manifest.get(file_key)
+        
+        if (entry is None):
+            return None
+        
+        file_stat = os.stat(file_path)
+        
+        if ((entry['mtime'] != file_stat.st_mtime) | (entry['size'] != file_stat.st_size)):
+            # The file may have been modified: compare the content hash.
+            file_hash = self.hash_file(file_path)
+            
+            if (file_hash != entry['hash']):
+                return None
+            
+            # Same content: update the manifest, so the file is not hashed again.
+            entry['mtime'], entry['size'] = file_stat.st_mtime, file_stat.st_size
+        
+        results_path = self.get_results_path(entry['hash'], has_header)
+        
+        if (not os.path.exists(results_path)):
+            return None
+        
+        results = pd.read_pickle(results_path)
+        
+        # The same content may have been cached from another path:
+        for result in results:
+            result['file'] = file_path
+        
+        return results
+    
+
+    def store_results (self, file_path, results, has_header = True):
+        
+        import os
+        
+        file_stat = os.stat(file_path)
+        file_hash = self.hash_file(file_path)
+        
+        pd.to_pickle(results, self.get_results_path(file_hash, has_header))
+        self.manifest[os.path.abspath(file_path)] = {'mtime': file_stat.st_mtime, 'size': file_stat.st_size, 'hash': file_hash}
+        
+        return self
+    
+
+    def save_manifest (self):
+        
+        import json
+        
+        with open(self.manifest_path, 'w') as opened_file:
+            json.dump(self.manifest, opened_file)
+        
+        return self
+
+
 class SharePointDownloader:
     """Pipeline for accessing SharePoint files
     This class provides a reusable tool for connecting to SharePoint and manipulating dataframes sourced from it.
@@ -3155,3 +5579,250 @@ class SharePointDownloader:
         # sharepoint_downloader = SharePointDownloader()
         # sharepoint_downloader.download_file(target_file_name = "data.xlsx")
 
+
+class ArrayExternalizingPickler (pickle.Pickler):
+    """
+    Pickler that stores the large NumPy arrays of an object (e.g., the coefficients of a linear model, the weights of
+    a neural network, or the mu and var arrays of the AnomalyDetector) as separate .npy files, instead of embedding their 
+    bytes in the pickle. The pickle keeps only a reference (persistent id) to each file, so it becomes a small skeleton
+    of the object. Check ArrayExternalizingUnpickler for loading it back with memory-mapped arrays.
+    https://docs.python.org/3/library/pickle.html#persistence-of-external-objects
+    """
+
+    def __init__ (self, file, arrays_directory, min_array_size_kb = 64):
+
+        super().__init__(file, protocol = pickle.HIGHEST_PROTOCOL)
+        # arrays_directory: directory where the .npy files are saved.
+        # min_array_size_kb: arrays smaller than this size (in kB) remain embedded in the pickle.
+        self.arrays_directory = arrays_directory
+        self.min_array_bytes = int(min_array_size_kb * 1024)
+        # Map the id of each saved array to its file, so an array referenced several times is saved once:
+        self.saved_arrays = {}
+        # Keep a reference to the saved arrays, so that their ids are not reused by other objects while pickling:
+        self.kept_arrays = []
+        # Description of each .npy file, for the artifact manifest:
+        self.arrays_manifest = []
+    
+
+    def persistent_id(self, obj):
+
+        import os
+        
+        # Only plain arrays (or memory-maps) with no Python objects in their elements can be saved as .npy files:
+        if ((type(obj) not in (np.ndarray, np.memmap)) or (obj.dtype.hasobject) or (obj.nbytes < self.min_array_bytes)):
+            # Returning None makes pickle serialize the object as usual:
+            return None
+        
+        if (id(obj) not in self.saved_arrays):
+            
+            file_name = f"array_{len(self.saved_arrays):05d}.npy"
+            np.save(os.path.join(self.arrays_directory, file_name), obj, allow_pickle = False)
+            
+            self.saved_arrays[id(obj)] = file_name
+            self.kept_arrays.append(obj)
+            self.arrays_manifest.append({'file': file_name, 'shape': list(obj.shape), 'dtype': str(obj.dtype), 'nbytes': int(obj.nbytes)})
+        
+        return ('npy', self.saved_arrays[id(obj)])
+
+
+class ArrayExternalizingUnpickler (pickle.Unpickler):
+    """
+    Unpickler for the skeletons created by ArrayExternalizingPickler. The .npy files are memory-mapped (copy-on-write)
+    instead of read into memory: loading takes milliseconds, only the accessed pages are read from the disk, and 
+    the processes that load the same artifact share the same pages of memory. Writing into an array modifies only 
+    the copy of the process, never the file.
+    """
+
+    def __init__ (self, file, arrays_directory, memory_map = True):
+
+        super().__init__(file)
+        self.arrays_directory = arrays_directory
+        self.memory_map = memory_map
+        # An array referenced several times is loaded once, so the references remain shared:
+        self.loaded_arrays = {}
+    
+
+    def persistent_load(self, pid):
+
+        import os
+
+        type_tag, file_name = pid
+
+        if (type_tag != 'npy'):
+            raise pickle.UnpicklingError(f"Unsupported persistent object: {type_tag}")
+        
+        if (file_name not in self.loaded_arrays):
+            # mmap_mode = 'c': copy-on-write memory-map.
+            self.loaded_arrays[file_name] = np.load(os.path.join(self.arrays_directory, file_name), mmap_mode = ('c' if self.memory_map else None), allow_pickle = False)
+        
+        return self.loaded_arrays[file_name]
+
+
+class ModelRegistry:
+    """
+    In-process registry of loaded models, for services that score several batches with the same models. 
+    The first request of a model loads it from the disk; the next ones return the object already in memory, as long as 
+    the files did not change (the files are identified by their paths, and their versions by the modification times and sizes). 
+    
+    The memory is bounded: when the registry exceeds max_models models, or max_memory_mb MB, the least recently 
+    used (LRU) models are removed. The size of each model is estimated as the size of its files on the disk.
+    It is thread-safe: different models are loaded in parallel, and concurrent requests of the same model load it only once.
+    
+    WARNING: the same object is returned to all the callers, so it must not be modified (e.g., re-fitted) after loaded.
+    """
+
+    def __init__ (self, max_models = 8, max_memory_mb = None):
+
+        import threading
+        from collections import OrderedDict
+
+        self.max_models = max_models
+        self.max_memory_bytes = None if (max_memory_mb is None) else int(max_memory_mb * 1024 * 1024)
+        # Keys: model keys; values: dictionaries {'model', 'signature', 'size_bytes'}. The last entries are the most recently used:
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        # Lock for the entries and counters:
+        self.lock = threading.Lock()
+        # One lock per model key, so that a model is not loaded twice by concurrent requests:
+        self.loading_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+
+    def get_files_signature(self, watched_paths):
+
+        import os
+
+        # Version of the files: tuple of (path, modification time in ns, size) for each existing file.
+        # Directories (e.g., memory-mappable artifacts or TensorFlow models) are walked, so any modified file changes the signature.
+        signature = []
+        
+        for path in watched_paths:
+            
+            if os.path.isdir(path):
+                for root, directories, files in os.walk(path):
+                    for file_name in sorted(files):
+                        file_stat = os.stat(os.path.join(root, file_name))
+                        signature.append((os.path.join(root, file_name), file_stat.st_mtime_ns, file_stat.st_size))
+            
+            elif os.path.exists(path):
+                file_stat = os.stat(path)
+                signature.append((path, file_stat.st_mtime_ns, file_stat.st_size))
+        
+        return tuple(signature)
+    
+
+    def get_cached_model(self, model_key, signature):
+        
+        # Return the model if it is in the registry with the same signature (must be called with the lock acquired):
+        entry = self.entries.get(model_key)
+
+        if ((entry is not None) and (entry['signature'] == signature)):
+            # Mark the model as the most recently used:
+            self.entries.move_to_end(model_key)
+            self.hits = self.hits + 1
+            
+            return True, entry['model']
+        
+        return False, None
+    
+
+    def evict_models(self):
+
+        # Remove the least recently used models until the limits are respected (must be called with the lock acquired).
+        # The most recently used model is never removed.
+        while (len(self.entries) > 1):
+            
+            exceeds_models = ((self.max_models is not None) and (len(self.entries) > self.max_models))
+            exceeds_memory = ((self.max_memory_bytes is not None) and (self.total_bytes > self.max_memory_bytes))
+            
+            if not (exceeds_models or exceeds_memory):
+                break
+            
+            removed_key, removed_entry = self.entries.popitem(last = False)
+            self.total_bytes = self.total_bytes - removed_entry['size_bytes']
+            self.evictions = self.evictions + 1
+        
+        return self
+    
+
+    def get_model(self, model_key, loader_function, watched_paths = None):
+
+        import threading
+
+        # model_key: hashable identifier of the model (e.g., a tuple with its path and loading parameters).
+        # loader_function: function with no arguments that loads and returns the model. It is only called on misses.
+        # watched_paths: list of the paths of the files (or directories) of the model. If they are modified,
+        # the model is loaded again.
+        if (watched_paths is None):
+            watched_paths = []
+        
+        signature = self.get_files_signature(watched_paths)
+
+        with self.lock:
+            
+            found, model = self.get_cached_model(model_key, signature)
+            
+            if found:
+                return model
+            
+            key_lock = self.loading_locks.setdefault(model_key, threading.Lock())
+        
+        with key_lock:
+            
+            with self.lock:
+                # Another thread may have loaded the model while this one was waiting:
+                found, model = self.get_cached_model(model_key, signature)
+                
+                if found:
+                    return model
+                
+                self.misses = self.misses + 1
+            
+            model = loader_function()
+            size_bytes = sum([file_size for path, mtime, file_size in signature])
+
+            with self.lock:
+                
+                if (model_key in self.entries):
+                    # Replace the outdated version:
+                    self.total_bytes = self.total_bytes - self.entries.pop(model_key)['size_bytes']
+                
+                self.entries[model_key] = {'model': model, 'signature': signature, 'size_bytes': size_bytes}
+                self.total_bytes = self.total_bytes + size_bytes
+                self = self.evict_models()
+        
+        return model
+    
+
+    def invalidate(self, model_key = None):
+
+        # Remove a model from the registry, or all the models if model_key is None:
+        with self.lock:
+            
+            if (model_key is None):
+                self.entries.clear()
+                self.total_bytes = 0
+            
+            elif (model_key in self.entries):
+                self.total_bytes = self.total_bytes - self.entries.pop(model_key)['size_bytes']
+        
+        return self
+    
+
+    def get_stats(self):
+
+        with self.lock:
+            
+            total_requests = self.hits + self.misses
+            stats = {
+                'models': len(self.entries),
+                'memory_mb': self.total_bytes / (1024**2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / total_requests) if (total_requests > 0) else None
+            }
+        
+        return stats
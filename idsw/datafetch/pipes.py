@@ -4,15 +4,15 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 
 from idsw import (InvalidInputsError, ControlVars)
-from .core import (Connectors, MountGoogleDrive, AWSS3Connection, IP21Extractor, SQLServerConnection, 
-                    SQLiteConnection, GCPBigQueryConnection)
+from .core import (Connectors, MountGoogleDrive, AWSS3Connection, IP21Extractor, IP21HistoryCache, SQLServerConnection, 
+                    SQLiteConnection, GCPBigQueryConnection, ModelRegistry)
 
 from idsw.modelling.core import AnomalyDetector
 
 
-def mount_storage_system (source = 'aws', path_to_store_imported_s3_bucket = '', s3_bucket_name = None, s3_obj_prefix = None):
+def mount_storage_system (source = 'aws', path_to_store_imported_s3_bucket = '', s3_bucket_name = None, s3_obj_prefix = None, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8, skip_unchanged_files = True, lazy_mode = False):
     """
-    mount_storage_system (source = 'aws', path_to_store_imported_s3_bucket = '', s3_bucket_name = None, s3_obj_prefix = None):
+    mount_storage_system (source = 'aws', path_to_store_imported_s3_bucket = '', s3_bucket_name = None, s3_obj_prefix = None, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8, skip_unchanged_files = True, lazy_mode = False):
 
     : param: source = 'google' for mounting the google drive;
     : param: source = 'aws' for mounting an AWS S3 bucket.
@@ -55,6 +55,18 @@ def mount_storage_system (source = 'aws', path_to_store_imported_s3_bucket = '',
       S3_OBJECT_FOLDER_PREFIX = "bucket_directory1/.../bucket_directoryN/my_file.ext"
       where my_file is the file's name, and ext is its extension.
 
+    : param: max_workers = 16: number of files transferred at the same time. Transferring many files
+      in parallel avoids the latency of each request from limiting the speed when there are thousands 
+      of (small) files.
+    : param: max_concurrency = 10: number of parts of a same (large) file transferred at the same time.
+    : param: multipart_threshold_mb = 8: files larger than this size (in MB) are transferred in parts.
+    : param: multipart_chunksize_mb = 8: size (in MB) of each part of the multipart transfers.
+    : param: skip_unchanged_files = True: if True, files that are already in the destination with the
+      same size and ETag (MD5 hash) are not transferred again. Interrupted downloads are stored in
+      temporary '.part' files and resumed from the missing bytes when the function is called again.
+    : param: lazy_mode = False: if True, the objects are only listed, not copied to the workspace. Their
+      addresses ('s3://bucket_name/prefix/file_name.ext') are stored in Connectors.aws_s3_connector.s3_uris,
+      and can be directly read by load_pandas_dataframe, which fetches only the accessed bytes.
 
       Attention: after running this function for fetching AWS Simple Storage System (S3), 
       your 'AWS Access key ID' and your 'Secret access key' will be requested.
@@ -98,13 +110,23 @@ def mount_storage_system (source = 'aws', path_to_store_imported_s3_bucket = '',
                 else: # Create the connector
                     aws_s3_connector = AWSS3Connection(path_to_store_imported_s3_bucket, s3_bucket_name, s3_obj_prefix)
                     aws_s3_connector = aws_s3_connector.run_s3_connection_pipeline()
-                    aws_s3_connector = aws_s3_connector.fetch_s3_files_pipeline()
+                    
+                    if (lazy_mode):
+                        aws_s3_connector = aws_s3_connector.lazy_s3_files_pipeline()
+                    else:
+                        aws_s3_connector = aws_s3_connector.fetch_s3_files_pipeline(max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb, skip_unchanged_files)
+                    
                     Connectors.aws_s3_connector = aws_s3_connector
         
         except: # Create the connector
             aws_s3_connector = AWSS3Connection(path_to_store_imported_s3_bucket, s3_bucket_name, s3_obj_prefix)
             aws_s3_connector = aws_s3_connector.run_s3_connection_pipeline()
-            aws_s3_connector = aws_s3_connector.fetch_s3_files_pipeline()
+            
+            if (lazy_mode):
+                aws_s3_connector = aws_s3_connector.lazy_s3_files_pipeline()
+            else:
+                aws_s3_connector = aws_s3_connector.fetch_s3_files_pipeline(max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb, skip_unchanged_files)
+            
             Connectors.aws_s3_connector = aws_s3_connector
 
     else:
@@ -157,9 +179,9 @@ def upload_to_or_download_file_from_colab (action = 'download', file_to_download
         raise InvalidInputsError("Please, select a valid action, \'download\' or \'upload\'.")
 
 
-def export_files_to_s3 (list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export = None, s3_bucket_name = None, s3_obj_prefix = None):
+def export_files_to_s3 (list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export = None, s3_bucket_name = None, s3_obj_prefix = None, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8, skip_unchanged_files = True):
     """
-    export_files_to_s3 (list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export = None, s3_bucket_name = None, s3_obj_prefix = None):
+    export_files_to_s3 (list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export = None, s3_bucket_name = None, s3_obj_prefix = None, max_workers = 16, max_concurrency = 10, multipart_threshold_mb = 8, multipart_chunksize_mb = 8, skip_unchanged_files = True):
     
     : param: list_of_file_names_with_extensions: list containing all the files to export to S3.
       Declare it as a list even if only a single file will be exported.
@@ -215,6 +237,16 @@ def export_files_to_s3 (list_of_file_names_with_extensions, directory_of_noteboo
       S3_OBJECT_FOLDER_PREFIX = "bucket_directory1/.../bucket_directoryN/my_file.ext"
       where my_file is the file's name, and ext is its extension.
 
+    : param: max_workers = 16: number of files transferred at the same time. Transferring many files
+      in parallel avoids the latency of each request from limiting the speed when there are thousands 
+      of (small) files.
+    : param: max_concurrency = 10: number of parts of a same (large) file transferred at the same time.
+    : param: multipart_threshold_mb = 8: files larger than this size (in MB) are transferred in parts.
+    : param: multipart_chunksize_mb = 8: size (in MB) of each part of the multipart transfers.
+    : param: skip_unchanged_files = True: if True, files that are already in the destination with the
+      same size and ETag (MD5 hash) are not transferred again. Interrupted downloads are stored in
+      temporary '.part' files and resumed from the missing bytes when the function is called again.
+
       Attention: after running this function for connecting with AWS Simple Storage System (S3), 
       your 'AWS Access key ID' and your 'Secret access key' will be requested.
       The 'Secret access key' will be hidden through dots, so it cannot be visualized or copied by
@@ -237,22 +269,81 @@ def export_files_to_s3 (list_of_file_names_with_extensions, directory_of_noteboo
             if Connectors.persistent:
                 # Run if there is a persistent connector  (if it is not None):
                 aws_s3_connector = Connectors.aws_s3_connector
+                # The persistent connector is already connected to the bucket. Export the files through it:
+                aws_s3_connector = aws_s3_connector.export_to_s3_pipeline(list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export, max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb, skip_unchanged_files)
             else:
-                aws_s3_connector = AWSS3Connection(path_to_store_imported_s3_bucket, s3_bucket_name, s3_obj_prefix)
+                # The files are exported from the workspace directory, so the path to store the imported bucket is not used:
+                aws_s3_connector = AWSS3Connection('', s3_bucket_name, s3_obj_prefix)
                 aws_s3_connector = aws_s3_connector.run_s3_connection_pipeline()
-                aws_s3_connector = aws_s3_connector.export_to_s3_pipeline(list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export)
+                aws_s3_connector = aws_s3_connector.export_to_s3_pipeline(list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export, max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb, skip_unchanged_files)
                 Connectors.aws_s3_connector = aws_s3_connector
             
     except: # Create the connector
-        aws_s3_connector = AWSS3Connection(path_to_store_imported_s3_bucket, s3_bucket_name, s3_obj_prefix)
+        aws_s3_connector = AWSS3Connection('', s3_bucket_name, s3_obj_prefix)
         aws_s3_connector = aws_s3_connector.run_s3_connection_pipeline()
-        aws_s3_connector = aws_s3_connector.export_to_s3_pipeline(list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export)
+        aws_s3_connector = aws_s3_connector.export_to_s3_pipeline(list_of_file_names_with_extensions, directory_of_notebook_workspace_storing_files_to_export, max_workers, max_concurrency, multipart_threshold_mb, multipart_chunksize_mb, skip_unchanged_files)
         Connectors.aws_s3_connector = aws_s3_connector
     
 
-def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_txt_file_with_json_format = False, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", load_all_sheets_at_once = False, sheet_to_load = None, json_record_path = None, json_field_separator = "_", json_metadata_prefix_list = None):
+def get_parsing_plan_from_schema (schema_list = None):
+    """
+    get_parsing_plan_from_schema (schema_list = None):
+    
+    Convert a schema_list (same format of set_schema_pd_df) into the arguments of the pandas readers 
+    (dtype, parse_dates and date_format), so the columns are created with their final types while the file is parsed,
+    instead of being inferred and then converted again.
+    
+    : param: schema_list: list of dictionaries with the keys 'column_name' and 'column_type', and the optional key 
+      'datetime_format', with the format of the timestamps of a datetime column (parsing with a fixed format 
+      is much faster than inferring it). e.g.
+      schema_list = [{'column_name': 'timestamp', 'column_type': 'datetime64[ns]', 'datetime_format': '%Y-%m-%d %H:%M:%S'},
+                     {'column_name': 'tag', 'column_type': 'category'},
+                     {'column_name': 'value', 'column_type': np.float32}]
+      Integer and boolean types are parsed as the nullable pandas types ('Int64' and 'boolean'), so missing values 
+      do not make the parsing fail. If schema_list is None, the default arguments (parse_dates = True) are returned.
+    
+    Returns a dictionary with the arguments, that may be passed to pd.read_csv or pd.read_excel as **parsing_plan.
+    """
+    
+    if (schema_list is None):
+        return {'parse_dates': True}
+    
+    dtypes = {}
+    parse_dates = []
+    date_formats = {}
+    
+    for schema in schema_list:
+        column_name, column_type = schema.get('column_name'), schema.get('column_type')
+        
+        if ((column_name is None) | (column_type is None)):
+            continue
+        
+        if ((column_type in [np.datetime64, 'datetime', 'timestamp']) or (str(column_type).startswith('datetime64'))):
+            parse_dates.append(column_name)
+            
+            if (schema.get('datetime_format') is not None):
+                date_formats[column_name] = schema['datetime_format']
+        
+        elif (column_type in [int, 'int', 'int64', 'int32', np.int64, np.int32]):
+            dtypes[column_name] = 'Int64'
+        
+        elif (column_type in [bool, 'bool', np.bool_]):
+            dtypes[column_name] = 'boolean'
+        
+        else:
+            dtypes[column_name] = column_type
+    
+    parsing_plan = {'dtype': dtypes, 'parse_dates': parse_dates}
+    
+    if (len(date_formats) > 0):
+        parsing_plan['date_format'] = date_formats
+    
+    return parsing_plan
+
+
+def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_txt_file_with_json_format = False, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", load_all_sheets_at_once = False, sheet_to_load = None, json_record_path = None, json_field_separator = "_", json_metadata_prefix_list = None, columns = None, row_filters = None, chunksize = None, schema_list = None, s3_block_size_mb = 4, s3_cache_directory = None):
     """
-    load_pandas_dataframe (file_directory_path, file_name_with_extension, load_txt_file_with_json_format = False, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", load_all_sheets_at_once = False, sheet_to_load = None, json_record_path = None, json_field_separator = "_", json_metadata_prefix_list = None):
+    load_pandas_dataframe (file_directory_path, file_name_with_extension, load_txt_file_with_json_format = False, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", load_all_sheets_at_once = False, sheet_to_load = None, json_record_path = None, json_field_separator = "_", json_metadata_prefix_list = None, columns = None, row_filters = None, chunksize = None, schema_list = None, s3_block_size_mb = 4, s3_cache_directory = None):
     
     Pandas documentation:
      pd.read_csv: https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.read_csv.html
@@ -263,6 +354,8 @@ def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_t
     
     ## WARNING: Use this function to load dataframes stored on Excel (xls, xlsx, xlsm, xlsb, odf, ods and odt), 
        JSON, txt, or CSV (comma separated values) files. Tables in webpages or html files can also be read.
+       Columnar Parquet (parquet) and Feather/Arrow IPC (feather, arrow, ipc) files can also be read. They store the
+       column types, so they are loaded with no text parsing or type inference (requires pyarrow).
     
     : param: file_directory_path - (string, in quotes): input the path of the directory (e.g. folder path) 
      where the file is stored. e.g. file_directory_path = "/" or file_directory_path = "/folder"
@@ -361,6 +454,48 @@ def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_t
       are 'name' and 'last'.
       Then, json_record_path = 'books'
       json_metadata_prefix_list = ['name', 'last']
+    
+    ## Parameters for loading Parquet and Feather files (columns also applies to txt and csv files):
+    
+    : param: columns: list of strings (in quotes) with the names of the columns to load. Keep None to load all the columns.
+      For Parquet and Feather files, only the bytes of the selected columns are read from the disk.
+      e.g. columns = ['timestamp', 'tag', 'value']
+    
+    : param: row_filters: list of tuples (column, operator, value) with the conditions the loaded rows must satisfy
+      (all the conditions are combined with AND). The operators may be '==', '!=', '<', '<=', '>', '>=', 'in' or 'not in'.
+      For Parquet files, the row groups whose statistics (minimum and maximum of each column) cannot satisfy the 
+      conditions are skipped without being read. Keep None to load all the rows.
+      e.g. row_filters = [('timestamp', '>=', pd.Timestamp('2024-01-01')), ('tag', 'in', ['TAG1', 'TAG2'])]
+    
+    ## Streaming mode for txt and csv files:
+    
+    : param: chunksize (int): keep None to load the whole file as a single dataframe. If an integer is declared
+      for a txt or csv file, a generator of dataframes with up to chunksize rows each (and the same dtypes) is
+      returned instead. Check stream_csv_chunks for transforming each chunk while the file is read.
+    
+    ## Schema applied while parsing (txt, csv, Excel, Parquet and Feather files):
+    
+    : param: schema_list: list of dictionaries with the same format of set_schema_pd_df, plus the optional key
+      'datetime_format'. The declared types are used by the parser, so the file is read in a single typed pass, with
+      no type inference for these columns, and no need of calling set_schema_pd_df afterwards. Declare tag or label 
+      columns as 'category' to store each distinct string only once. e.g.
+      schema_list = [{'column_name': 'timestamp', 'column_type': 'datetime64[ns]', 'datetime_format': '%Y-%m-%d %H:%M:%S'},
+                     {'column_name': 'tag', 'column_type': 'category'},
+                     {'column_name': 'value', 'column_type': np.float32}]
+      Keep None to infer the types (and try to parse the dates) as usual. Check get_parsing_plan_from_schema.
+    
+    ## Reading objects directly from AWS S3 (lazy mode):
+    
+      If file_directory_path starts with 's3://', the file is read directly from the S3 bucket, with no local copy
+      (e.g. file_directory_path = 's3://bucket_name/prefix', file_name_with_extension = 'file.parquet'). Only the
+      accessed bytes are fetched, through ranged requests: for Parquet files, the footer and the chunks of the selected
+      columns and row groups. Use mount_storage_system (source = 'aws', lazy_mode = True) to list the objects of a 
+      bucket without copying them. Check open_s3_object for the credentials.
+    
+    : param: s3_block_size_mb = 4: size (in MB) of the blocks fetched by each ranged request.
+    : param: s3_cache_directory = None: the fetched blocks are kept in an in-memory cache, shared by the whole session.
+      If a directory is declared, they are also stored on the disk, so repeated reads of the same objects do not
+      fetch them again, even in other sessions.
     """
     
     import os
@@ -384,7 +519,8 @@ def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_t
     # from the second character (index 1), eliminating the dot: 'txt'
     
     if(file_extension not in ['xls', 'xlsx', 'xlsm', 'xlsb', 'odf',
-                              'ods', 'odt', 'json', 'txt', 'csv', 'html']):
+                              'ods', 'odt', 'json', 'txt', 'csv', 'html',
+                              'parquet', 'feather', 'arrow', 'ipc']):
         
         # Check if it is a webpage by evaluating the 3 to 5 initial characters:
         # Notice that 'https' contains 'http'
@@ -401,206 +537,269 @@ def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_t
     if (decimal_separator is None):
         decimal_separator = '.'
     
-    if ((file_extension == 'txt') | (file_extension == 'csv')): 
-        # The operator & is equivalent to 'And' (intersection).
-        # The operator | is equivalent to 'Or' (union).
-        # pandas.read_csv method must be used.
-        if (load_txt_file_with_json_format == True):
-            
-            print("Reading a txt file containing JSON parsed data. A reading error will be raised if you did not set the JSON parameters.\n")
-            
-            with open(file_path, 'r') as opened_file:
-                # 'r' stands for read mode; 'w' stands for write mode
-                # read the whole file as a string named 'file_full_text'
-                file_full_text = opened_file.read()
-                # if we used the readlines() method, we would be reading the
-                # file by line, not the whole text at once.
-                # https://stackoverflow.com/questions/8369219/how-to-read-a-text-file-into-a-string-variable-and-strip-newlines?msclkid=a772c37bbfe811ec9a314e3629df4e1e
-                # https://www.tutorialkart.com/python/python-read-file-as-string/#:~:text=example.py%20%E2%80%93%20Python%20Program.%20%23open%20text%20file%20in,and%20prints%20it%20to%20the%20standard%20output.%20Output.?msclkid=a7723a1abfe811ecb68bba01a2b85bd8
+    # Arguments of the parsers defining the types of the columns:
+    parsing_plan = get_parsing_plan_from_schema(schema_list)
+    
+    # Source passed to the readers: the path itself, or a file-like object for S3 addresses.
+    file_source = file_path
+    s3_file = None
+    
+    if ((str(file_path)[:5] == 's3://') & ((chunksize is None) | (file_extension not in ['txt', 'csv']))):
+        # Lazy mode: read the object directly from S3, through ranged requests, instead of a local copy.
+        from .core import open_s3_object
+        s3_file = open_s3_object(file_path, block_size_mb = s3_block_size_mb, cache_directory = s3_cache_directory)
+        file_source = s3_file
+    
+    try:
+        if (file_extension in ['parquet', 'feather', 'arrow', 'ipc']):
+            # Columnar files: read through a pyarrow dataset, so the selection of columns and the row filters
+            # are applied while reading (projection and predicate pushdown), instead of after loading the whole file.
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+        
+            if (s3_file is not None):
+                # The S3 object is read as a seekable file: pyarrow fetches only the footer and the byte ranges 
+                # of the selected columns (and, for Parquet files, of the row groups that may satisfy the filters).
+                if (file_extension == 'parquet'):
+                    arrow_table = pq.read_table(s3_file, columns = columns, filters = row_filters)
+            
+                else:
+                    import pyarrow.feather as feather
+                    arrow_table = feather.read_table(s3_file, columns = columns, memory_map = False)
                 
-            #Now, file_full_text is a string containing the full content of the txt file.
-            json_file = json.loads(file_full_text)
-            # json.load() : This method is used to parse JSON from URL or file.
-            # json.loads(): This method is used to parse string with JSON content.
-            # e.g. .json.loads() must be used to read a string with JSON and convert it to a flat file
-            # like a dataframe.
-            # check: https://www.pythonpip.com/python-tutorials/how-to-load-json-file-using-python/#:~:text=The%20json.load%20%28%29%20is%20used%20to%20read%20the,and%20alter%20data%20in%20our%20application%20or%20system.
-            dataset = json_normalize(json_file, record_path = json_record_path, sep = json_field_separator, meta = json_metadata_prefix_list)
+                    if (row_filters is not None):
+                        arrow_table = arrow_table.filter(pq.filters_to_expression(row_filters))
+            
+                dataset = arrow_table.to_pandas()
         
-        else:
-            # Not a JSON txt
+            else:
+                file_format = 'parquet' if (file_extension == 'parquet') else 'ipc'
+                arrow_dataset = ds.dataset(file_path, format = file_format)
+            
+                if (row_filters is not None):
+                    filter_expression = pq.filters_to_expression(row_filters)
+                else:
+                    filter_expression = None
+            
+                dataset = arrow_dataset.to_table(columns = columns, filter = filter_expression).to_pandas()
         
-            if (has_header == True):
+            if (schema_list is not None):
+                # The columnar files already store the types; only the declared conversions (e.g. to category) are applied:
+                dataset = dataset.astype({column: dtype for column, dtype in parsing_plan['dtype'].items() if (column in dataset.columns)})
+            
+                for column in parsing_plan['parse_dates']:
+                    if ((column in dataset.columns) and (not pd.api.types.is_datetime64_any_dtype(dataset[column]))):
+                        dataset[column] = pd.to_datetime(dataset[column], format = parsing_plan.get('date_format', {}).get(column))
+    
+        elif ((file_extension == 'txt') | (file_extension == 'csv')): 
+            # The operator & is equivalent to 'And' (intersection).
+            # The operator | is equivalent to 'Or' (union).
+            # pandas.read_csv method must be used.
+            if (load_txt_file_with_json_format == True):
+            
+                print("Reading a txt file containing JSON parsed data. A reading error will be raised if you did not set the JSON parameters.\n")
+            
+                with (open(file_path, 'r') if (s3_file is None) else s3_file) as opened_file:
+                    # 'r' stands for read mode; 'w' stands for write mode
+                    # read the whole file as a string named 'file_full_text'
+                    file_full_text = opened_file.read()
+                    # if we used the readlines() method, we would be reading the
+                    # file by line, not the whole text at once.
+                    # https://stackoverflow.com/questions/8369219/how-to-read-a-text-file-into-a-string-variable-and-strip-newlines?msclkid=a772c37bbfe811ec9a314e3629df4e1e
+                    # https://www.tutorialkart.com/python/python-read-file-as-string/#:~:text=example.py%20%E2%80%93%20Python%20Program.%20%23open%20text%20file%20in,and%20prints%20it%20to%20the%20standard%20output.%20Output.?msclkid=a7723a1abfe811ecb68bba01a2b85bd8
+                
+                #Now, file_full_text is a string containing the full content of the txt file.
+                json_file = json.loads(file_full_text)
+                # json.load() : This method is used to parse JSON from URL or file.
+                # json.loads(): This method is used to parse string with JSON content.
+                # e.g. .json.loads() must be used to read a string with JSON and convert it to a flat file
+                # like a dataframe.
+                # check: https://www.pythonpip.com/python-tutorials/how-to-load-json-file-using-python/#:~:text=The%20json.load%20%28%29%20is%20used%20to%20read%20the,and%20alter%20data%20in%20our%20application%20or%20system.
+                dataset = json_normalize(json_file, record_path = json_record_path, sep = json_field_separator, meta = json_metadata_prefix_list)
+        
+            elif (chunksize is not None):
+                # Streaming mode: return the generator of chunks.
+                return stream_csv_chunks(file_directory_path, file_name_with_extension, chunksize = chunksize, how_missing_values_are_registered = how_missing_values_are_registered, has_header = has_header, decimal_separator = decimal_separator, txt_csv_col_sep = txt_csv_col_sep, columns = columns, schema_list = schema_list, s3_block_size_mb = s3_block_size_mb, s3_cache_directory = s3_cache_directory)
+        
+            else:
+                # Not a JSON txt
+        
+                if (has_header == True):
 
-                if ((txt_csv_col_sep == "comma") | (txt_csv_col_sep == ",")):
+                    if ((txt_csv_col_sep == "comma") | (txt_csv_col_sep == ",")):
 
-                    dataset = pd.read_csv(file_path, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
-                    # verbose = True for showing number of NA values placed in non-numeric columns.
-                    #  parse_dates = True: try parsing the index; infer_datetime_format = True : If True and parse_dates is enabled, pandas will attempt to infer the format of the datetime strings in 
-                    # the columns, and if it can be inferred, switch to a faster method of parsing them. In some cases this can increase the 
-                    # parsing speed by 5-10x.
+                        dataset = pd.read_csv(file_source, na_values = how_missing_values_are_registered, decimal = decimal_separator, usecols = columns, **parsing_plan)
+                        # verbose = True for showing number of NA values placed in non-numeric columns.
+                        #  parse_dates = True: try parsing the index; infer_datetime_format = True : If True and parse_dates is enabled, pandas will attempt to infer the format of the datetime strings in 
+                        # the columns, and if it can be inferred, switch to a faster method of parsing them. In some cases this can increase the 
+                        # parsing speed by 5-10x.
 
-                elif ((txt_csv_col_sep == "whitespace") | (txt_csv_col_sep == " ")):
+                    elif ((txt_csv_col_sep == "whitespace") | (txt_csv_col_sep == " ")):
 
-                    dataset = pd.read_csv(file_path, delim_whitespace = True, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                        dataset = pd.read_csv(file_source, delim_whitespace = True, na_values = how_missing_values_are_registered, decimal = decimal_separator, usecols = columns, **parsing_plan)
                     
                     
-                else:
+                    else:
                     
-                    try:
+                        try:
                         
-                        # Try using the character specified as the argument txt_csv_col_sep:
-                        dataset = pd.read_csv(file_path, sep = txt_csv_col_sep, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                            # Try using the character specified as the argument txt_csv_col_sep:
+                            dataset = pd.read_csv(file_source, sep = txt_csv_col_sep, na_values = how_missing_values_are_registered, decimal = decimal_separator, usecols = columns, **parsing_plan)
                     
-                    except:
-                        # An error was raised, the separator is not valid
-                        raise InvalidInputsError(f"Enter a valid column separator for the {file_extension} file, like: \'comma\' or \'whitespace\'.")
+                        except:
+                            # An error was raised, the separator is not valid
+                            raise InvalidInputsError(f"Enter a valid column separator for the {file_extension} file, like: \'comma\' or \'whitespace\'.")
 
 
-            else:
-                # has_header == False
+                else:
+                    # has_header == False
 
-                if ((txt_csv_col_sep == "comma") | (txt_csv_col_sep == ",")):
+                    if ((txt_csv_col_sep == "comma") | (txt_csv_col_sep == ",")):
 
-                    dataset = pd.read_csv(file_path, header = None, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                        dataset = pd.read_csv(file_source, header = None, na_values = how_missing_values_are_registered, decimal = decimal_separator, usecols = columns, **parsing_plan)
 
                     
-                elif ((txt_csv_col_sep == "whitespace") | (txt_csv_col_sep == " ")):
+                    elif ((txt_csv_col_sep == "whitespace") | (txt_csv_col_sep == " ")):
 
-                    dataset = pd.read_csv(file_path, delim_whitespace = True, header = None, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                        dataset = pd.read_csv(file_source, delim_whitespace = True, header = None, na_values = how_missing_values_are_registered, decimal = decimal_separator, usecols = columns, **parsing_plan)
                     
                     
-                else:
+                    else:
                     
-                    try:
+                        try:
                         
-                        # Try using the character specified as the argument txt_csv_col_sep:
-                        dataset = pd.read_csv(file_path, sep = txt_csv_col_sep, header = None, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                            # Try using the character specified as the argument txt_csv_col_sep:
+                            dataset = pd.read_csv(file_source, sep = txt_csv_col_sep, header = None, na_values = how_missing_values_are_registered, decimal = decimal_separator, usecols = columns, **parsing_plan)
                     
-                    except:
-                        # An error was raised, the separator is not valid
-                        raise InvalidInputsError(f"Enter a valid column separator for the {file_extension} file, like: \'comma\' or \'whitespace\'.")
+                        except:
+                            # An error was raised, the separator is not valid
+                            raise InvalidInputsError(f"Enter a valid column separator for the {file_extension} file, like: \'comma\' or \'whitespace\'.")
 
-    elif (file_extension == 'json'):
+        elif (file_extension == 'json'):
         
-        with open(file_path, 'r') as opened_file:
-            
-            json_file = json.load(opened_file)
-            # The structure json_file = json.load(open(file_path)) relies on the GC to close the file. That's not a 
-            # good idea: If someone doesn't use CPython the garbage collector might not be using refcounting (which 
-            # collects unreferenced objects immediately) but e.g. collect garbage only after some time.
-            # Since file handles are closed when the associated object is garbage collected or closed 
-            # explicitly (.close() or .__exit__() from a context manager) the file will remain open until 
-            # the GC kicks in.
-            # Using 'with' ensures the file is closed as soon as the block is left - even if an exception 
-            # happens inside that block, so it should always be preferred for any real application.
-            # source: https://stackoverflow.com/questions/39447362/equivalent-ways-to-json-load-a-file-in-python
+            with (open(file_path, 'r') if (s3_file is None) else s3_file) as opened_file:
+                # json.load also parses the bytes read from an S3 object:
+                json_file = json.load(opened_file)
+                # The structure json_file = json.load(open(file_path)) relies on the GC to close the file. That's not a 
+                # good idea: If someone doesn't use CPython the garbage collector might not be using refcounting (which 
+                # collects unreferenced objects immediately) but e.g. collect garbage only after some time.
+                # Since file handles are closed when the associated object is garbage collected or closed 
+                # explicitly (.close() or .__exit__() from a context manager) the file will remain open until 
+                # the GC kicks in.
+                # Using 'with' ensures the file is closed as soon as the block is left - even if an exception 
+                # happens inside that block, so it should always be preferred for any real application.
+                # source: https://stackoverflow.com/questions/39447362/equivalent-ways-to-json-load-a-file-in-python
             
-        # json.load() : This method is used to parse JSON from URL or file.
-        # json.loads(): This method is used to parse string with JSON content.
-        # Then, json.load for a .json file
-        # and json.loads for text file containing json
-        # check: https://www.pythonpip.com/python-tutorials/how-to-load-json-file-using-python/#:~:text=The%20json.load%20%28%29%20is%20used%20to%20read%20the,and%20alter%20data%20in%20our%20application%20or%20system.   
-        dataset = json_normalize(json_file, record_path = json_record_path, sep = json_field_separator, meta = json_metadata_prefix_list)
+            # json.load() : This method is used to parse JSON from URL or file.
+            # json.loads(): This method is used to parse string with JSON content.
+            # Then, json.load for a .json file
+            # and json.loads for text file containing json
+            # check: https://www.pythonpip.com/python-tutorials/how-to-load-json-file-using-python/#:~:text=The%20json.load%20%28%29%20is%20used%20to%20read%20the,and%20alter%20data%20in%20our%20application%20or%20system.   
+            dataset = json_normalize(json_file, record_path = json_record_path, sep = json_field_separator, meta = json_metadata_prefix_list)
     
             
-    elif (file_extension == 'html'):    
+        elif (file_extension == 'html'):    
         
-        if (has_header == True):
+            if (has_header == True):
             
-            dataset = pd.read_html(file_path, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                dataset = pd.read_html(file_source, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
             
-        else:
+            else:
             
-            dataset = pd.read_html(file_path, header = None, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
+                dataset = pd.read_html(file_source, header = None, na_values = how_missing_values_are_registered, parse_dates = True, decimal = decimal_separator)
         
         
-    else:
-        # If it is not neither a csv nor a txt file, let's assume it is one of different
-        # possible Excel files.
-        print("Excel file inferred. If an error message is shown, check if a valid file extension was used: \'xlsx\', \'xls\', etc.\n")
-        # For Excel type files, Pandas automatically detects the decimal separator and requires only the parameter parse_dates.
-        # Firstly, the argument infer_datetime_format was present on read_excel function, but was removed.
-        # From version 1.4 (beta, in 10 May 2022), it will be possible to pass the parameter 'decimal' to
-        # read_excel function for detecting decimal cases in strings. For numeric variables, it is not needed, though
+        else:
+            # If it is not neither a csv nor a txt file, let's assume it is one of different
+            # possible Excel files.
+            print("Excel file inferred. If an error message is shown, check if a valid file extension was used: \'xlsx\', \'xls\', etc.\n")
+            # For Excel type files, Pandas automatically detects the decimal separator and requires only the parameter parse_dates.
+            # Firstly, the argument infer_datetime_format was present on read_excel function, but was removed.
+            # From version 1.4 (beta, in 10 May 2022), it will be possible to pass the parameter 'decimal' to
+            # read_excel function for detecting decimal cases in strings. For numeric variables, it is not needed, though
         
-        if (load_all_sheets_at_once == True):
+            if (load_all_sheets_at_once == True):
             
-            # Corresponds to setting sheet_name = None
+                # Corresponds to setting sheet_name = None
             
-            if (has_header == True):
+                if (has_header == True):
                 
-                xlsx_doc = pd.read_excel(file_path, sheet_name = None, na_values = how_missing_values_are_registered, parse_dates = True)
-                # verbose = True for showing number of NA values placed in non-numeric columns.
-                #  parse_dates = True: try parsing the index; infer_datetime_format = True : If True and parse_dates is enabled, pandas will attempt to infer the format of the datetime strings in 
-                # the columns, and if it can be inferred, switch to a faster method of parsing them. In some cases this can increase the 
-                # parsing speed by 5-10x.
+                    xlsx_doc = pd.read_excel(file_source, sheet_name = None, na_values = how_missing_values_are_registered, **parsing_plan)
+                    # verbose = True for showing number of NA values placed in non-numeric columns.
+                    #  parse_dates = True: try parsing the index; infer_datetime_format = True : If True and parse_dates is enabled, pandas will attempt to infer the format of the datetime strings in 
+                    # the columns, and if it can be inferred, switch to a faster method of parsing them. In some cases this can increase the 
+                    # parsing speed by 5-10x.
                 
-            else:
-                #No header
-                xlsx_doc = pd.read_excel(file_path, sheet_name = None, header = None, na_values = how_missing_values_are_registered, parse_dates = True)
-            
-            # xlsx_doc is a dictionary containing the sheet names as keys, and dataframes as items.
-            # Let's convert it to the desired format.
-            # Dictionary dict, dict.keys() is the array of keys; dict.values() is an array of the values;
-            # and dict.items() is an array of tuples with format ('key', value)
-            
-            # Create a list of returned datasets:
-            list_of_datasets = []
-            
-            # Let's iterate through the array of tuples. The first element returned is the key, and the
-            # second is the value
-            for sheet_name, dataframe in (xlsx_doc.items()):
-                # sheet_name = key; dataframe = value
-                # Define the dictionary with the standard format:
-                df_dict = {'sheet': sheet_name,
-                            'df': dataframe}
+                else:
+                    #No header
+                    xlsx_doc = pd.read_excel(file_source, sheet_name = None, header = None, na_values = how_missing_values_are_registered, **parsing_plan)
+            
+                # xlsx_doc is a dictionary containing the sheet names as keys, and dataframes as items.
+                # Let's convert it to the desired format.
+                # Dictionary dict, dict.keys() is the array of keys; dict.values() is an array of the values;
+                # and dict.items() is an array of tuples with format ('key', value)
+            
+                # Create a list of returned datasets:
+                list_of_datasets = []
+            
+                # Let's iterate through the array of tuples. The first element returned is the key, and the
+                # second is the value
+                for sheet_name, dataframe in (xlsx_doc.items()):
+                    # sheet_name = key; dataframe = value
+                    # Define the dictionary with the standard format:
+                    df_dict = {'sheet': sheet_name,
+                                'df': dataframe}
                 
-                # Add the dictionary to the list:
-                list_of_datasets.append(df_dict)
-            
-            if ControlVars.show_results: 
-                print("\n")
-                print(f"A total of {len(list_of_datasets)} dataframes were retrieved from the Excel file.\n")
-                print(f"The dataframes correspond to the following Excel sheets: {list(xlsx_doc.keys())}\n")
-                print("Returning a list of dictionaries. Each dictionary contains the key \'sheet\', with the original sheet name; and the key \'df\', with the Pandas dataframe object obtained.\n")
-                print(f"Check the 10 first rows of the dataframe obtained from the first sheet, named {list_of_datasets[0]['sheet']}:\n")
+                    # Add the dictionary to the list:
+                    list_of_datasets.append(df_dict)
+            
+                if ControlVars.show_results: 
+                    print("\n")
+                    print(f"A total of {len(list_of_datasets)} dataframes were retrieved from the Excel file.\n")
+                    print(f"The dataframes correspond to the following Excel sheets: {list(xlsx_doc.keys())}\n")
+                    print("Returning a list of dictionaries. Each dictionary contains the key \'sheet\', with the original sheet name; and the key \'df\', with the Pandas dataframe object obtained.\n")
+                    print(f"Check the 10 first rows of the dataframe obtained from the first sheet, named {list_of_datasets[0]['sheet']}:\n")
                 
-                try:
-                    # only works in Jupyter Notebook:
-                    from IPython.display import display
-                    display((list_of_datasets[0]['df']).head(10))
+                    try:
+                        # only works in Jupyter Notebook:
+                        from IPython.display import display
+                        display((list_of_datasets[0]['df']).head(10))
                 
-                except: # regular mode
-                    print((list_of_datasets[0]['df']).head(10))
+                    except: # regular mode
+                        print((list_of_datasets[0]['df']).head(10))
                 
-            return list_of_datasets
+                return list_of_datasets
             
-        elif (sheet_to_load is not None):        
-        #Case where the user specifies which sheet of the Excel file should be loaded.
+            elif (sheet_to_load is not None):        
+            #Case where the user specifies which sheet of the Excel file should be loaded.
             
-            if (has_header == True):
+                if (has_header == True):
                 
-                dataset = pd.read_excel(file_path, sheet_name = sheet_to_load, na_values = how_missing_values_are_registered, parse_dates = True)
-                # verbose = True for showing number of NA values placed in non-numeric columns.
-                #  parse_dates = True: try parsing the index; infer_datetime_format = True : If True and parse_dates is enabled, pandas will attempt to infer the format of the datetime strings in 
-                # the columns, and if it can be inferred, switch to a faster method of parsing them. In some cases this can increase the 
-                # parsing speed by 5-10x.
+                    dataset = pd.read_excel(file_source, sheet_name = sheet_to_load, na_values = how_missing_values_are_registered, **parsing_plan)
+                    # verbose = True for showing number of NA values placed in non-numeric columns.
+                    #  parse_dates = True: try parsing the index; infer_datetime_format = True : If True and parse_dates is enabled, pandas will attempt to infer the format of the datetime strings in 
+                    # the columns, and if it can be inferred, switch to a faster method of parsing them. In some cases this can increase the 
+                    # parsing speed by 5-10x.
                 
-            else:
-                #No header
-                dataset = pd.read_excel(file_path, sheet_name = sheet_to_load, header = None, na_values = how_missing_values_are_registered, parse_dates = True)
+                else:
+                    #No header
+                    dataset = pd.read_excel(file_source, sheet_name = sheet_to_load, header = None, na_values = how_missing_values_are_registered, **parsing_plan)
                 
         
-        else:
-            #No sheet specified
-            if (has_header == True):
+            else:
+                #No sheet specified
+                if (has_header == True):
                 
-                dataset = pd.read_excel(file_path, na_values = how_missing_values_are_registered, parse_dates = True)
+                    dataset = pd.read_excel(file_source, na_values = how_missing_values_are_registered, **parsing_plan)
                 
-            else:
-                #No header
-                dataset = pd.read_excel(file_path, header = None, na_values = how_missing_values_are_registered, parse_dates = True)
+                else:
+                    #No header
+                    dataset = pd.read_excel(file_source, header = None, na_values = how_missing_values_are_registered, **parsing_plan)
+    
+    finally:
+        if (s3_file is not None):
+            # Release the file-like object of the S3 object (also when the reading fails):
+            s3_file.close()
 
     if ControlVars.show_results:       
         print(f"Dataset extracted from {file_path}. Check the 10 first rows of this dataframe:\n")
@@ -616,6 +815,386 @@ def load_pandas_dataframe (file_directory_path, file_name_with_extension, load_t
     return dataset
 
 
+def stream_csv_chunks (file_directory_path, file_name_with_extension, chunksize = 100000, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", columns = None, dtypes = None, timestamp_columns = None, chunk_transformations = None, silence_transformations = True, schema_list = None, s3_block_size_mb = 4, s3_cache_directory = None):
+    """
+    stream_csv_chunks (file_directory_path, file_name_with_extension, chunksize = 100000, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", columns = None, dtypes = None, timestamp_columns = None, chunk_transformations = None, silence_transformations = True, schema_list = None, s3_block_size_mb = 4, s3_cache_directory = None):
+    
+    Generator: read a CSV or txt file in chunks of up to chunksize rows, yielding one dataframe at a time, so files
+    much larger than the memory can be filtered, transformed or downsampled chunk by chunk.
+    e.g.: for df_chunk in stream_csv_chunks("/folder", "file.csv", chunksize = 100000): ...
+    
+    All the chunks have the same columns and dtypes (stable schema): the dtypes are inferred from the first chunk
+    (or declared in dtypes), and the next chunks are converted to them. Integer and boolean columns of the first chunk
+    are converted to the nullable pandas dtypes ('Int64', 'boolean'), so missing values in a later chunk do not change them.
+    Values that cannot be converted to the numeric or datetime dtype of their column are replaced with missing values,
+    and a warning with the number of lost values is printed. 
+    A column with no values in the first chunk has no dtype to infer: its dtype is taken from the first chunk where it
+    has values, and a warning is printed if it is not numeric (the previous chunks had only missing values in it).
+    Declare the dtypes of these columns to keep a stable schema from the first chunk.
+    Categorical columns are not converted to the categories of the first chunk (the new categories of the next chunks
+    would be replaced with missing values): each chunk has the categories found in it. Merge them with
+    pd.api.types.union_categoricals when concatenating the chunks (process_csv_in_chunks does it).
+    
+    : param: file_directory_path, file_name_with_extension, how_missing_values_are_registered, has_header, 
+      decimal_separator, txt_csv_col_sep: same parameters of load_pandas_dataframe.
+    
+    : param: chunksize (int): maximum number of rows of each chunk.
+    
+    : param: columns: list of strings (in quotes) with the names of the columns to read. Keep None to read all the columns.
+    
+    : param: dtypes: dictionary mapping column names to dtypes, e.g. dtypes = {'tag': 'category', 'value': 'float64'}.
+      Declaring the dtypes avoids the type inference at each chunk. The other columns keep the dtypes of the first chunk.
+    
+    : param: timestamp_columns: list of strings (in quotes) with the names of the columns that must be parsed as timestamps.
+    
+    : param: schema_list: alternative to dtypes and timestamp_columns, with the format of load_pandas_dataframe
+      (also allowing fixed datetime formats). Check get_parsing_plan_from_schema.
+    
+    : param: chunk_transformations: list of functions applied, in order, to each chunk before it is yielded. Each function
+      receives a dataframe and must return a dataframe, so any IDSW transformation can be used, with parameters that
+      do not depend on the full dataset. e.g.:
+        chunk_transformations = [
+          lambda df: apply_row_filters_list(df, [(df['value'] > 0)]),
+          lambda df: feature_scaling(df, ['value'], mode = 'min_max', scale_with_new_params = False, list_of_scaling_params = scaling_list)[0],
+          lambda df: group_variables_by_timestamp(df, 'timestamp', grouping_frequency_unit = 'minute', aggregate_function = 'mean')
+        ]
+      Notice that grouping transformations return partial aggregates for each chunk: a time bin that crosses the boundary
+      between two chunks appears in both of them. Use additive aggregates (e.g. 'sum' and 'count') and group the 
+      concatenated results again to obtain the final aggregates.
+    
+    : param: silence_transformations (bool): if True, the messages and plots of the chunk transformations are not shown
+      (ControlVars.show_results and ControlVars.show_plots are set to False while they run), so the output is not
+      flooded by one message per chunk.
+    
+    : param: s3_block_size_mb, s3_cache_directory: same parameters of load_pandas_dataframe, used when file_directory_path
+      starts with 's3://'. The file is streamed from S3 through ranged requests, with no local copy.
+    """
+    
+    import os
+    import io
+    import contextlib
+    
+    if (file_directory_path is None):
+        file_directory_path = ''
+    if (file_name_with_extension is None):
+        file_name_with_extension = ''
+    
+    # Create the complete file path:
+    file_path = os.path.join(file_directory_path, file_name_with_extension)
+    
+    s3_file = None
+    
+    if (str(file_path)[:5] == 's3://'):
+        # Lazy mode: stream the object directly from S3, through ranged requests:
+        from .core import open_s3_object
+        s3_file = open_s3_object(file_path, block_size_mb = s3_block_size_mb, cache_directory = s3_cache_directory)
+        file_path = s3_file
+    
+    if (decimal_separator is None):
+        decimal_separator = '.'
+    
+    # Arguments of the reader, following the conventions of load_pandas_dataframe:
+    reader_kwargs = {'na_values': how_missing_values_are_registered, 'decimal': decimal_separator, 'usecols': columns, 'chunksize': max(int(chunksize), 1)}
+    
+    if ((txt_csv_col_sep == "comma") | (txt_csv_col_sep == ",")):
+        reader_kwargs['sep'] = ','
+    elif ((txt_csv_col_sep == "whitespace") | (txt_csv_col_sep == " ")):
+        reader_kwargs['sep'] = r'\s+'
+    else:
+        reader_kwargs['sep'] = txt_csv_col_sep
+    
+    if (has_header == False):
+        reader_kwargs['header'] = None
+    
+    if (schema_list is not None):
+        parsing_plan = get_parsing_plan_from_schema(schema_list)
+        # Merge the schema with the dtypes and timestamp columns that were directly declared:
+        dtypes = {**parsing_plan['dtype'], **(dtypes if (dtypes is not None) else {})}
+        timestamp_columns = parsing_plan['parse_dates'] + [column for column in (timestamp_columns if (timestamp_columns is not None) else []) if (column not in parsing_plan['parse_dates'])]
+        
+        if ('date_format' in parsing_plan):
+            reader_kwargs['date_format'] = parsing_plan['date_format']
+    
+    if (timestamp_columns is not None):
+        reader_kwargs['parse_dates'] = list(timestamp_columns)
+    
+    if (dtypes is not None):
+        # Timestamp columns are parsed by parse_dates, not by the dtype argument:
+        reader_kwargs['dtype'] = {column: dtype for column, dtype in dtypes.items() if ((timestamp_columns is None) or (column not in timestamp_columns))}
+    
+    # Columns whose dtypes were declared by the user (they are always enforced):
+    declared_columns = set(dtypes.keys() if (dtypes is not None) else []) | set(timestamp_columns if (timestamp_columns is not None) else [])
+    
+    def get_stream_dtype (series):
+        # Nullable dtypes for integers and booleans, so missing values in a later chunk do not change them:
+        dtype = series.dtype
+        
+        if (dtype.kind in ['i', 'u']):
+            dtype = pd.Int64Dtype()
+        elif (dtype.kind == 'b'):
+            dtype = pd.BooleanDtype()
+        
+        return dtype
+    
+    reference_dtypes = None
+    # Columns that were fully missing in all the previous chunks, so their dtypes were not inferred from real values:
+    undefined_columns = set()
+    chunk_index = 0
+    
+    try:
+        with pd.read_csv(file_path, **reader_kwargs) as reader:
+        
+            for df_chunk in reader:
+            
+                if (reference_dtypes is None):
+                    # The first chunk defines the schema of the stream:
+                    reference_dtypes = {column: get_stream_dtype(df_chunk[column]) for column in df_chunk.columns}
+                    undefined_columns = set([column for column in df_chunk.columns if ((column not in declared_columns) & (df_chunk[column].isna().all()))])
+            
+                for column in list(undefined_columns):
+                
+                    if (df_chunk[column].notna().any()):
+                        # First chunk with values for this column: now its dtype can be inferred.
+                        undefined_columns.discard(column)
+                        new_dtype = get_stream_dtype(df_chunk[column])
+                    
+                        # The fully missing column of the previous chunks was read as float64, which holds any numeric value:
+                        if (not (pd.api.types.is_numeric_dtype(new_dtype) & (not pd.api.types.is_bool_dtype(new_dtype)))):
+                            print(f"Warning: column '{column}' had only missing values in the first {chunk_index} chunk(s), which were returned with dtype {reference_dtypes[column]}. From chunk number {chunk_index + 1} on, it has dtype {new_dtype}. Declare its dtype in dtypes to keep a stable schema.")
+                            reference_dtypes[column] = new_dtype
+            
+                for column, dtype in reference_dtypes.items():
+                
+                    if isinstance(dtype, pd.CategoricalDtype):
+                        # Keep the categories of the chunk, instead of the ones of the first chunk:
+                        if (not isinstance(df_chunk[column].dtype, pd.CategoricalDtype)):
+                            df_chunk[column] = df_chunk[column].astype('category')
+                
+                    elif (df_chunk[column].dtype != dtype):
+                    
+                        series = df_chunk[column]
+                    
+                        if (pd.api.types.is_numeric_dtype(dtype) & (not pd.api.types.is_bool_dtype(dtype))):
+                            df_chunk[column] = pd.to_numeric(series, errors = 'coerce').astype(dtype)
+                    
+                        elif (pd.api.types.is_datetime64_any_dtype(dtype)):
+                            df_chunk[column] = pd.to_datetime(series, errors = 'coerce')
+                    
+                        else:
+                            df_chunk[column] = series.astype(dtype)
+                    
+                        # Never replace values with missing values silently:
+                        lost_values = int((series.notna() & df_chunk[column].isna()).sum())
+                    
+                        if (lost_values > 0):
+                            print(f"Warning: {lost_values} value(s) of column '{column}' in chunk number {chunk_index + 1} could not be converted to {dtype}, and were replaced with missing values.")
+            
+                chunk_index = chunk_index + 1
+            
+                if (chunk_transformations is not None):
+                
+                    show_results, show_plots = ControlVars.show_results, ControlVars.show_plots
+                
+                    try:
+                        if (silence_transformations):
+                            ControlVars.show_results, ControlVars.show_plots = False, False
+                            # Some transformations print warnings regardless of ControlVars:
+                            with contextlib.redirect_stdout(io.StringIO()):
+                                for transformation in chunk_transformations:
+                                    df_chunk = transformation(df_chunk)
+                    
+                        else:
+                            for transformation in chunk_transformations:
+                                df_chunk = transformation(df_chunk)
+                
+                    finally:
+                        ControlVars.show_results, ControlVars.show_plots = show_results, show_plots
+            
+                yield df_chunk
+    
+    finally:
+        if (s3_file is not None):
+            # Also when the generator is closed before the last chunk:
+            s3_file.close()
+
+
+def process_csv_in_chunks (file_directory_path, file_name_with_extension, chunk_transformations, chunksize = 100000, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", columns = None, dtypes = None, timestamp_columns = None, silence_transformations = True, schema_list = None):
+    """
+    process_csv_in_chunks (file_directory_path, file_name_with_extension, chunk_transformations, chunksize = 100000, how_missing_values_are_registered = None, has_header = True, decimal_separator = '.', txt_csv_col_sep = "comma", columns = None, dtypes = None, timestamp_columns = None, silence_transformations = True, schema_list = None):
+    
+    Read a CSV or txt file in chunks, apply the chunk_transformations to each chunk (e.g. filters and downsampling),
+    and return a single dataframe concatenating the transformed chunks. Only one raw chunk is kept in the memory at
+    a time, so it can process files much larger than the memory, as long as the transformed result fits in it.
+    The categories of the categorical columns of all the chunks are merged, so the result keeps the category dtype.
+    
+    Check stream_csv_chunks for the description of the parameters.
+    """
+    
+    transformed_chunks = [df_chunk for df_chunk in stream_csv_chunks(file_directory_path, file_name_with_extension, chunksize = chunksize, how_missing_values_are_registered = how_missing_values_are_registered, has_header = has_header, decimal_separator = decimal_separator, txt_csv_col_sep = txt_csv_col_sep, columns = columns, dtypes = dtypes, timestamp_columns = timestamp_columns, chunk_transformations = chunk_transformations, silence_transformations = silence_transformations, schema_list = schema_list)]
+    
+    if (len(transformed_chunks) > 0):
+        from pandas.api.types import union_categoricals
+        
+        # pd.concat returns object columns when the chunks have different categories: use the union of them.
+        categorical_columns = set([column for df_chunk in transformed_chunks for column in df_chunk.columns if isinstance(df_chunk[column].dtype, pd.CategoricalDtype)])
+        
+        for column in categorical_columns:
+            categorical_series = [df_chunk[column] for df_chunk in transformed_chunks if ((column in df_chunk.columns) and isinstance(df_chunk[column].dtype, pd.CategoricalDtype))]
+            categories = union_categoricals(categorical_series).categories
+            
+            for df_chunk in transformed_chunks:
+                if ((column in df_chunk.columns) and isinstance(df_chunk[column].dtype, pd.CategoricalDtype)):
+                    df_chunk[column] = df_chunk[column].cat.set_categories(categories)
+        
+        dataset = pd.concat(transformed_chunks, axis = 0, ignore_index = True)
+    else:
+        dataset = pd.DataFrame()
+    
+    if ControlVars.show_results:       
+        print(f"{len(transformed_chunks)} chunks processed. Check the 10 first rows of the resultant dataframe:\n")
+        
+        try:
+            # only works in Jupyter Notebook:
+            from IPython.display import display
+            display(dataset.head(10))
+                
+        except: # regular mode
+            print(dataset.head(10))
+    
+    return dataset
+
+
+def ingest_excel_files (files_to_ingest, has_header = True, max_workers = None, cache_directory = None, concatenate_results = True, schema_list = None):
+    """
+    ingest_excel_files (files_to_ingest, has_header = True, max_workers = None, cache_directory = None, concatenate_results = True, schema_list = None):
+    
+    Ingest many Excel files at once: each file (all its sheets and the tables formatted inside them, as in 
+    IngestExcelTables) is parsed by a different worker process, and the results may be concatenated into a 
+    single dataframe with a consistent schema. Unchanged files may be loaded from a local cache, instead of parsed again.
+    
+    : param: files_to_ingest: path of a directory (all the xls, xlsx and xlsm files in it are ingested); a glob 
+      pattern, e.g. files_to_ingest = "/lab_exports/2024-*/*.xlsx"; or a list of file paths.
+    
+    : param: has_header (bool): True if the tables have a row with the columns names.
+    
+    : param: max_workers (int): number of worker processes. Keep None to use the number of CPUs; set 1 to parse 
+      the files one after the other, in the current process.
+    
+    : param: cache_directory (str): directory of the cache of parsed results (check ExcelIngestionCache). The cache 
+      is keyed by the hash of the file content and by has_header, and the modification time is used to avoid hashing unchanged files. 
+      Keep None not to use the cache.
+    
+    : param: concatenate_results (bool): if True, returns a single dataframe with all the loaded tables, plus the
+      columns 'source_file', 'sheet' and 'table' identifying their origin. Columns missing in some of the tables are
+      filled with missing values. If False, returns a list of dictionaries with the keys 'file', 'sheet', 'table' and 'df'.
+    
+    : param: schema_list: list of dictionaries with the same format of set_schema_pd_df, applied to the concatenated
+      dataframe, so the columns have the same types regardless of the file they came from.
+    """
+    
+    import os
+    import glob
+    from concurrent.futures import ProcessPoolExecutor
+    from .core import ingest_excel_file, ExcelIngestionCache
+    
+    # List the files:
+    if (type(files_to_ingest) == str):
+        if os.path.isdir(files_to_ingest):
+            file_paths = []
+            for extension in ['xls', 'xlsx', 'xlsm']:
+                file_paths = file_paths + glob.glob(os.path.join(files_to_ingest, f"*.{extension}"))
+        
+        else:
+            file_paths = glob.glob(files_to_ingest)
+    
+    else:
+        file_paths = list(files_to_ingest)
+    
+    # Ignore the lock files created by Excel while the workbooks are opened:
+    file_paths = sorted([file_path for file_path in file_paths if (not os.path.basename(file_path).startswith('~$'))])
+    
+    if (len(file_paths) == 0):
+        raise InvalidInputsError("No Excel file was found to be ingested.")
+    
+    results_by_file = {}
+    
+    if (cache_directory is not None):
+        cache = ExcelIngestionCache(cache_directory)
+        
+        for file_path in file_paths:
+            cached_results = cache.load_results(file_path, has_header = has_header)
+            if (cached_results is not None):
+                results_by_file[file_path] = cached_results
+    
+    files_to_parse = [file_path for file_path in file_paths if (file_path not in results_by_file)]
+    
+    if (len(files_to_parse) > 0):
+        
+        if ((max_workers == 1) | (len(files_to_parse) == 1)):
+            parsed_results = [ingest_excel_file(file_path, has_header) for file_path in files_to_parse]
+        
+        else:
+            with ProcessPoolExecutor(max_workers = max_workers) as executor:
+                parsed_results = list(executor.map(ingest_excel_file, files_to_parse, [has_header] * len(files_to_parse)))
+        
+        for file_path, results in zip(files_to_parse, parsed_results):
+            results_by_file[file_path] = results
+            
+            if (cache_directory is not None):
+                cache = cache.store_results(file_path, results, has_header = has_header)
+    
+    if (cache_directory is not None):
+        cache = cache.save_manifest()
+    
+    # Keep the order of the files:
+    list_of_results = [result for file_path in file_paths for result in results_by_file[file_path]]
+    
+    if ControlVars.show_results:
+        print(f"{len(file_paths)} files ingested: {len(files_to_parse)} parsed and {len(file_paths) - len(files_to_parse)} loaded from the cache.")
+        print(f"A total of {len(list_of_results)} tables were obtained.\n")
+    
+    if (not concatenate_results):
+        return list_of_results
+    
+    dfs_to_concatenate = []
+    
+    for result in list_of_results:
+        df = result['df'].copy()
+        df.insert(0, 'source_file', result['file'])
+        df.insert(1, 'sheet', result['sheet'])
+        df.insert(2, 'table', result['table'])
+        dfs_to_concatenate.append(df)
+    
+    dataset = pd.concat(dfs_to_concatenate, axis = 0, ignore_index = True)
+    
+    if (schema_list is not None):
+        parsing_plan = get_parsing_plan_from_schema(schema_list)
+        
+        for column in parsing_plan['parse_dates']:
+            if (column in dataset.columns):
+                dataset[column] = pd.to_datetime(dataset[column], format = parsing_plan.get('date_format', {}).get(column), errors = 'coerce')
+        
+        for column, dtype in parsing_plan['dtype'].items():
+            if (column in dataset.columns):
+                if (pd.api.types.is_numeric_dtype(pd.Series(dtype = dtype)) and (dtype not in ['boolean', bool])):
+                    dataset[column] = pd.to_numeric(dataset[column], errors = 'coerce').astype(dtype)
+                else:
+                    dataset[column] = dataset[column].astype(dtype)
+    
+    if ControlVars.show_results:
+        print("Check the 10 first rows of the concatenated dataframe:\n")
+        
+        try:
+            # only works in Jupyter Notebook:
+            from IPython.display import display
+            display(dataset.head(10))
+                
+        except: # regular mode
+            print(dataset.head(10))
+    
+    return dataset
+
+
 def json_obj_to_pandas_dataframe (json_obj_to_convert, json_obj_type = 'list', json_record_path = None, json_field_separator = "_", json_metadata_prefix_list = None):
     """
     json_obj_to_pandas_dataframe (json_obj_to_convert, json_obj_type = 'list', json_record_path = None, json_field_separator = "_", json_metadata_prefix_list = None):
@@ -860,6 +1439,98 @@ def export_pd_dataframe_as_csv (dataframe_obj_to_be_exported, new_file_name_with
         print("Warning: if there was a file in this file path, it was replaced by the exported dataframe.")
 
 
+def export_pd_dataframe_as_parquet (dataframe_obj_to_be_exported, new_file_name_without_extension, file_directory_path = None, compression = 'snappy', row_group_size = None, sort_by = None):
+    """
+    export_pd_dataframe_as_parquet (dataframe_obj_to_be_exported, new_file_name_without_extension, file_directory_path = None, compression = 'snappy', row_group_size = None, sort_by = None)
+
+    WARNING: all files exported from this function are .parquet (columnar files that keep the column types).
+    They may be loaded back with load_pandas_dataframe, reading only the selected columns and row groups. Requires pyarrow.
+    
+    : param: dataframe_obj_to_be_exported: dataframe object that is going to be exported from the
+      function. Since it is an object (not a string), it should not be declared in quotes.
+      example: dataframe_obj_to_be_exported = dataset will export the dataset object.
+      ATTENTION: The dataframe object must be a Pandas dataframe.
+    
+    : param: FILE_DIRECTORY_PATH - (string, in quotes): input the path of the directory 
+      (e.g. folder path) where the file is stored. e.g. FILE_DIRECTORY_PATH = "/" 
+      or FILE_DIRECTORY_PATH = "/folder"
+
+    : param: new_file_name_without_extension - (string, in quotes): input the name of the 
+      file without the extension. e.g. new_file_name_without_extension = "my_file" 
+      will export a file 'my_file.parquet' to notebook's workspace.
+    
+    : param: compression = 'snappy' (fast), 'zstd' (smaller files), 'gzip' or None.
+    
+    : param: row_group_size (int): maximum number of rows of each row group. Smaller row groups allow
+      skipping more data when the file is loaded with row_filters. Keep None for the pyarrow default.
+    
+    : param: sort_by (str or list): column(s) used for sorting the rows before exporting, e.g. sort_by = 'timestamp'.
+      When the rows are sorted by the column used in row_filters, each row group covers a narrow range of values,
+      so most of the row groups are skipped when loading.
+    """
+    import os
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if (file_directory_path is None):
+        file_directory_path = ''
+    
+    # Create the complete file path:
+    file_path = os.path.join(file_directory_path, new_file_name_without_extension)
+    # Concatenate the extension ".parquet":
+    file_path = file_path + ".parquet"
+
+    if (sort_by is not None):
+        dataframe_obj_to_be_exported = dataframe_obj_to_be_exported.sort_values(by = sort_by)
+    
+    arrow_table = pa.Table.from_pandas(dataframe_obj_to_be_exported, preserve_index = False)
+    pq.write_table(arrow_table, file_path, compression = compression, row_group_size = row_group_size)
+
+    if ControlVars.show_results: 
+        print(f"Dataframe {new_file_name_without_extension} exported as Parquet file to notebook\'s workspace as \'{file_path}\'.")
+        print("Warning: if there was a file in this file path, it was replaced by the exported dataframe.")
+
+
+def export_pd_dataframe_as_feather (dataframe_obj_to_be_exported, new_file_name_without_extension, file_directory_path = None, compression = 'lz4'):
+    """
+    export_pd_dataframe_as_feather (dataframe_obj_to_be_exported, new_file_name_without_extension, file_directory_path = None, compression = 'lz4')
+
+    WARNING: all files exported from this function are .feather (Arrow IPC files, which keep the column types).
+    They are the fastest to load back with load_pandas_dataframe. Requires pyarrow.
+    
+    : param: dataframe_obj_to_be_exported: dataframe object that is going to be exported from the
+      function. Since it is an object (not a string), it should not be declared in quotes.
+      ATTENTION: The dataframe object must be a Pandas dataframe.
+    
+    : param: FILE_DIRECTORY_PATH - (string, in quotes): input the path of the directory 
+      (e.g. folder path) where the file is stored. e.g. FILE_DIRECTORY_PATH = "/folder"
+
+    : param: new_file_name_without_extension - (string, in quotes): input the name of the 
+      file without the extension. e.g. new_file_name_without_extension = "my_file" 
+      will export a file 'my_file.feather' to notebook's workspace.
+    
+    : param: compression = 'lz4', 'zstd' or 'uncompressed'. Uncompressed files can be memory-mapped.
+    """
+    import os
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if (file_directory_path is None):
+        file_directory_path = ''
+    
+    # Create the complete file path:
+    file_path = os.path.join(file_directory_path, new_file_name_without_extension)
+    # Concatenate the extension ".feather":
+    file_path = file_path + ".feather"
+
+    arrow_table = pa.Table.from_pandas(dataframe_obj_to_be_exported, preserve_index = False)
+    feather.write_feather(arrow_table, file_path, compression = compression)
+
+    if ControlVars.show_results: 
+        print(f"Dataframe {new_file_name_without_extension} exported as Feather file to notebook\'s workspace as \'{file_path}\'.")
+        print("Warning: if there was a file in this file path, it was replaced by the exported dataframe.")
+
+
 def export_pd_dataframe_as_excel (file_name_without_extension, exported_tables = [{'dataframedataframe_obj_to_be_exported': None, 'excel_sheet_name': None}], file_directory_path = None):
     """
     export_pd_dataframe_as_excel (file_name_without_extension, exported_tables = [{'dataframedataframe_obj_to_be_exported': dataframe_obj_to_be_exported, 'excel_sheet_name': excel_sheet_name}], file_directory_path = None):
@@ -955,16 +1626,67 @@ def export_pd_dataframe_as_excel (file_name_without_extension, exported_tables =
         print("Warning: if there was a sheet with the same name as the exported ones, it was replaced by the exported dataframe.")
 
 
-def load_anomaly_detector (saved_file):
+def get_model_registry (max_models = 8, max_memory_mb = None):
+    """
+    get_model_registry (max_models = 8, max_memory_mb = None):
+
+    Return the in-process registry of loaded models (ModelRegistry), used by import_export_model_list_dict and 
+    load_anomaly_detector when use_model_registry = True. The registry is stored in Connectors.model_registry, 
+    so it is shared by the whole session: call this function before the imports to set its limits.
+
+    : param: max_models = 8: maximum number of models kept in memory. When it is exceeded, the least recently used
+      model is removed from the registry. Set None for no limit.
+    : param: max_memory_mb = None: maximum total size (in MB) of the models kept in memory, estimated as the size of
+      their files. Keep None for no limit.
+    
+    Check the hit and miss counters with get_model_registry().get_stats(); and use get_model_registry().invalidate()
+    to remove all the models from memory.
+    """
+
+    try: # try accessing the registry, if it exists
+        if Connectors.model_registry:
+            if Connectors.persistent:
+                # Run if there is a persistent registry (if it is not None):
+                model_registry = Connectors.model_registry
+                # Update the limits:
+                model_registry.max_models = max_models
+                model_registry.max_memory_bytes = None if (max_memory_mb is None) else int(max_memory_mb * 1024 * 1024)
+            else: # Create the registry
+                model_registry = ModelRegistry(max_models, max_memory_mb)
+                Connectors.model_registry = model_registry
+
+    except: # Create the registry
+        model_registry = ModelRegistry(max_models, max_memory_mb)
+        Connectors.model_registry = model_registry
+    
+    return model_registry
+
+
+def load_anomaly_detector (saved_file, use_model_registry = False):
     """
-    load_anomaly_detector (saved_file)
+    load_anomaly_detector (saved_file, use_model_registry = False)
 
     Function for loading an anomaly detection model object.
     : param: saved_file - string containing the path for an anomaly detection model 
       saved as a pickle (binary) file
+    : param: use_model_registry = False: if True, the model is kept in the model registry of the session 
+      (check get_model_registry), and the next calls return it from memory, as long as the file did not change.
     """
 
+    import os
     import pickle
+
+    if (use_model_registry == True):
+        
+        try: # use the registry of the session, if it exists
+            model_registry = Connectors.model_registry
+        except: # create it with the default limits
+            model_registry = get_model_registry()
+        
+        saved_file_path = os.path.abspath(saved_file)
+        
+        return model_registry.get_model(('load_anomaly_detector', saved_file_path), (lambda: load_anomaly_detector(saved_file, use_model_registry = False)), [saved_file_path])
+    
     with open(saved_file, 'rb') as opened_file:
             
         attributes = pickle.load(opened_file)
@@ -979,9 +1701,110 @@ def load_anomaly_detector (saved_file):
     return anomaly_detection_model
 
 
-def import_export_model_list_dict (action = 'import', objects_manipulated = 'model_only', model_file_name = None, dictionary_or_list_file_name = None, directory_path = '', model_type = 'keras', dict_or_list_to_export = None, model_to_export = None, use_colab_memory = False):
+def export_model_artifact (model_to_export, artifact_directory, model_type = 'sklearn', min_array_size_kb = 64):
+    """
+    export_model_artifact (model_to_export, artifact_directory, model_type = 'sklearn', min_array_size_kb = 64):
+
+    Export a model as a directory (artifact) containing:
+      - model.pkl: small pickle with the structure of the model (the skeleton);
+      - one .npy file for each large NumPy array of the model (e.g., coefficients, network weights, tree arrays, 
+        or the mu and var arrays of the AnomalyDetector);
+      - manifest.json: description of the artifact (model type and class, and shape, dtype and size of each array).
+    Check import_model_artifact for loading the artifact with memory-mapped arrays.
+
+    : param: model_to_export: model object. e.g. a scikit-learn model, an ARIMA model (statsmodels), or an AnomalyDetector.
+    : param: artifact_directory: string with the path of the directory that will store the artifact. 
+      e.g. artifact_directory = 'models/random_forest'. It is created if it does not exist.
+    : param: model_type = 'sklearn', 'anomaly_detector' or 'arima', as in import_export_model_list_dict.
+    : param: min_array_size_kb = 64: arrays smaller than this size (in kB) remain embedded in the pickle.
+    """
+
+    import os
+    import json
+    import shutil
+    from .core import ArrayExternalizingPickler
+
+    # Save the artifact in a temporary directory, and only replace the previous artifact when it is complete:
+    artifact_directory = os.path.normpath(artifact_directory)
+    temporary_directory = artifact_directory + '.tmp'
+    shutil.rmtree(temporary_directory, ignore_errors = True)
+    os.makedirs(temporary_directory)
+
+    if (model_type == 'anomaly_detector'):
+        # As in AnomalyDetector.save, the dictionary of attributes is saved instead of the object:
+        object_to_pickle = vars(model_to_export)
+    else:
+        object_to_pickle = model_to_export
+    
+    with open(os.path.join(temporary_directory, 'model.pkl'), 'wb') as opened_file:
+        
+        pickler = ArrayExternalizingPickler(opened_file, temporary_directory, min_array_size_kb = min_array_size_kb)
+        pickler.dump(object_to_pickle)
+    
+    manifest = {
+        'format_version': 1,
+        'model_type': model_type,
+        'model_class': type(model_to_export).__module__ + '.' + type(model_to_export).__name__,
+        'pickle_file': 'model.pkl',
+        'arrays': pickler.arrays_manifest
+    }
+
+    with open(os.path.join(temporary_directory, 'manifest.json'), 'w') as opened_file:
+        json.dump(manifest, opened_file, indent = 2)
+    
+    shutil.rmtree(artifact_directory, ignore_errors = True)
+    os.replace(temporary_directory, artifact_directory)
+
+    if ControlVars.show_results:
+        print(f"Model exported as the artifact {artifact_directory}, with {len(pickler.arrays_manifest)} arrays stored as .npy files ({sum([array['nbytes'] for array in pickler.arrays_manifest])/(1024**2):.2f} MB).")
+
+    return manifest
+
+
+def import_model_artifact (artifact_directory, memory_map = True):
+    """
+    import_model_artifact (artifact_directory, memory_map = True):
+
+    Load a model exported by export_model_artifact.
+
+    : param: artifact_directory: string with the path of the directory storing the artifact.
+    : param: memory_map = True: if True, the .npy arrays are memory-mapped (copy-on-write) instead of read: the model
+      is loaded in milliseconds, only the accessed parts of the arrays are read from the disk, and the scoring processes
+      loading the same artifact share the same pages of memory. If False, the arrays are read into memory.
+      
+      WARNING: some objects copy their arrays when they are loaded (e.g., the trees of scikit-learn forests copy their
+      node arrays into their own buffers), so they do not share memory, even though they still avoid the pickle parsing.
+    """
+
+    import os
+    import json
+    from .core import ArrayExternalizingUnpickler
+
+    with open(os.path.join(artifact_directory, 'manifest.json'), 'r') as opened_file:
+        manifest = json.load(opened_file)
+    
+    with open(os.path.join(artifact_directory, manifest['pickle_file']), 'rb') as opened_file:
+        
+        unpickler = ArrayExternalizingUnpickler(opened_file, artifact_directory, memory_map = memory_map)
+        model = unpickler.load()
+    
+    if (manifest['model_type'] == 'anomaly_detector'):
+        # Fill the attributes of a new AnomalyDetector, as in load_anomaly_detector:
+        attributes = model
+        model = AnomalyDetector()
+        
+        for attribute, value in attributes.items():
+            vars(model)[attribute] = value
+    
+    if ControlVars.show_results:
+        print(f"Model ({manifest['model_class']}) imported from the artifact {artifact_directory}.")
+
+    return model
+
+
+def import_export_model_list_dict (action = 'import', objects_manipulated = 'model_only', model_file_name = None, dictionary_or_list_file_name = None, directory_path = '', model_type = 'keras', dict_or_list_to_export = None, model_to_export = None, use_colab_memory = False, use_mmap_artifact = False, use_model_registry = False):
     """
-    import_export_model_list_dict (action = 'import', objects_manipulated = 'model_only', model_file_name = None, dictionary_or_list_file_name = None, directory_path = '', model_type = 'keras', dict_or_list_to_export = None, model_to_export = None, use_colab_memory = False):
+    import_export_model_list_dict (action = 'import', objects_manipulated = 'model_only', model_file_name = None, dictionary_or_list_file_name = None, directory_path = '', model_type = 'keras', dict_or_list_to_export = None, model_to_export = None, use_colab_memory = False, use_mmap_artifact = False, use_model_registry = False):
     
      https://docs.python.org/3/library/tarfile.html#tar-examples
      https://docs.python.org/3/library/zipfile.html#zipfile-objects
@@ -1049,6 +1872,18 @@ def import_export_model_list_dict (action = 'import', objects_manipulated = 'mod
     
       If action == 'export' and use_colab_memory == True, then the file will be downloaded
       to your computer (running the cell will start the download).
+    
+    : param: use_mmap_artifact = False: this parameter has only effect for model_type = 'sklearn', 'anomaly_detector'
+      or 'arima'. If True, the model is exported to (or imported from) a directory named model_file_name, containing
+      a small pickle, one .npy file for each large array of the model, and a manifest (check export_model_artifact).
+      When imported, the arrays are memory-mapped, so the model loads in milliseconds and the scoring processes share
+      the same pages of memory (check import_model_artifact). It cannot be used with use_colab_memory = True.
+    
+    : param: use_model_registry = False: this parameter has only effect when action = 'import' and use_colab_memory = False.
+      If True, the imported objects are kept in the model registry of the session (check get_model_registry). The next 
+      imports of the same files return the objects already in memory, instead of loading them again from the disk, as 
+      long as the files were not modified. Works for all the model types. Recommended for scoring services that import
+      the same models at each batch.
     """
 
     import os
@@ -1061,6 +1896,36 @@ def import_export_model_list_dict (action = 'import', objects_manipulated = 'mod
     if (directory_path is None):
         # set as the root (empty string):
         directory_path = ""
+    
+    if ((use_model_registry == True) & (action == 'import') & (use_colab_memory == False)):
+        # Return the objects from the registry, if they were already imported and their files did not change:
+        try: # use the registry of the session, if it exists
+            model_registry = Connectors.model_registry
+        except: # create it with the default limits
+            model_registry = get_model_registry()
+        
+        # Files whose modifications must reload the objects:
+        watched_paths = []
+        
+        if ((objects_manipulated != 'dict_or_list_only') & (model_file_name is not None)):
+            # The extension depends on the model_type, and some models are directories (tensorflow_general models,
+            # or memory-mappable artifacts). So, watch all the possible files of the model:
+            model_base_path = os.path.join(directory_path, model_file_name)
+            watched_paths = watched_paths + [(model_base_path + extension) for extension in ['', '.keras', '.pkl', '.json', '.tar.gz', '.tar', '.zip']]
+
+            if (model_type == 'tensorflow_general'):
+                watched_paths = watched_paths + ['saved_model', 'tmp/saved_model']
+        
+        if ((objects_manipulated != 'model_only') & (dictionary_or_list_file_name is not None)):
+            watched_paths.append(os.path.join(directory_path, dictionary_or_list_file_name) + '.pkl')
+        
+        watched_paths = [os.path.abspath(path) for path in watched_paths]
+        model_key = ('import_export_model_list_dict', objects_manipulated, model_type, tuple(watched_paths), use_mmap_artifact)
+
+        def load_objects():
+            return import_export_model_list_dict(action = 'import', objects_manipulated = objects_manipulated, model_file_name = model_file_name, dictionary_or_list_file_name = dictionary_or_list_file_name, directory_path = directory_path, model_type = model_type, use_mmap_artifact = use_mmap_artifact, use_model_registry = False)
+        
+        return model_registry.get_model(model_key, load_objects, watched_paths)
         
         
     bool_check1 = (objects_manipulated != 'model_only')
@@ -1140,6 +2005,17 @@ def import_export_model_list_dict (action = 'import', objects_manipulated = 'mod
             model_path = model_path +  "." + model_extension
             
     # Now we have the full paths for the dictionary and for the model.
+
+    # Models stored as memory-mappable artifacts:
+    use_mmap_artifact = ((use_mmap_artifact == True) & (bool_check2 == True) & (model_type in ['sklearn', 'anomaly_detector', 'arima']))
+
+    if use_mmap_artifact:
+        
+        if (use_colab_memory == True):
+            raise InvalidInputsError("Memory-mappable artifacts are directories, which cannot be uploaded to or downloaded from Colab memory. Set use_colab_memory = False.")
+        
+        # The artifact is a directory with no extension:
+        model_path = os.path.join(directory_path, model_file_name)
     
     if (action == 'import'):
         
@@ -1225,8 +2101,11 @@ def import_export_model_list_dict (action = 'import', objects_manipulated = 'mod
         if (bool_check2 == True):
             #manipulate a model
             # select the proper model
+
+            if use_mmap_artifact:
+                model = import_model_artifact(model_path, memory_map = True)
         
-            if (model_type == 'keras'):
+            elif (model_type == 'keras'):
                 
                 if (use_colab_memory == True):
                     key = model_file_name + "." + model_extension
@@ -1669,8 +2548,11 @@ def import_export_model_list_dict (action = 'import', objects_manipulated = 'mod
         if (bool_check2 == True):
             #manipulate a model
             # select the proper model
+
+            if use_mmap_artifact:
+                export_model_artifact(model_to_export, model_path, model_type = model_type)
         
-            if (model_type == 'keras'):
+            elif (model_type == 'keras'):
                 
                 if (use_colab_memory == True):
                     ## Download the model
@@ -2033,9 +2915,9 @@ def generateSensitivityAnalysis_datasets (df, simulated_variables, total_bins):
     return simulation_dfs_dict
 
 
-def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'actual_name': None}], username = None, password = None, data_source = 'localhost', start_time = {'year': 2015, 'month': 1, 'day':1, 'hour': 0, 'minute': 0, 'second': 0}, stop_time = {'year': 2022, 'month': 4, 'day': 1, 'hour': 0, 'minute': 0, 'second': 0}, start_timedelta_unit = 'day', stop_timedelta_unit = 'day', ip21time_array = [], previous_df_for_concatenation = None):
+def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'actual_name': None}], username = None, password = None, data_source = 'localhost', start_time = {'year': 2015, 'month': 1, 'day':1, 'hour': 0, 'minute': 0, 'second': 0}, stop_time = {'year': 2022, 'month': 4, 'day': 1, 'hour': 0, 'minute': 0, 'second': 0}, start_timedelta_unit = 'day', stop_timedelta_unit = 'day', ip21time_array = [], previous_df_for_concatenation = None, max_concurrent_requests = 1, time_windows_per_tag = 1, estimated_sampling_period_seconds = None, max_rows_per_call = 100000, pool_size = 10, max_retries = 3, retry_backoff_factor = 0.5, timeout_seconds = 120, cache_path = None, cache_ttl_days = None, cache_max_samples = None, return_wide_df = False, alignment_method = 'asof', grid_frequency_seconds = None, asof_direction = 'backward', asof_tolerance_seconds = None, retrieval_mode = 'raw', aggregation_period_seconds = None):
     """
-    get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'actual_name': None}], username = None, password = None, data_source = 'localhost', start_time = {'year': 2015, 'month': 1, 'day':1, 'hour': 0, 'minute': 0, 'second': 0}, stop_time = {'year': 2022, 'month': 4, 'day': 1, 'hour': 0, 'minute': 0, 'second': 0}, start_timedelta_unit = 'day', stop_timedelta_unit = 'day', ip21time_array = [], previous_df_for_concatenation = None):
+    get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'actual_name': None}], username = None, password = None, data_source = 'localhost', start_time = {'year': 2015, 'month': 1, 'day':1, 'hour': 0, 'minute': 0, 'second': 0}, stop_time = {'year': 2022, 'month': 4, 'day': 1, 'hour': 0, 'minute': 0, 'second': 0}, start_timedelta_unit = 'day', stop_timedelta_unit = 'day', ip21time_array = [], previous_df_for_concatenation = None, max_concurrent_requests = 1, time_windows_per_tag = 1, estimated_sampling_period_seconds = None, max_rows_per_call = 100000, pool_size = 10, max_retries = 3, retry_backoff_factor = 0.5, timeout_seconds = 120, cache_path = None, cache_ttl_days = None, cache_max_samples = None, return_wide_df = False, alignment_method = 'asof', grid_frequency_seconds = None, asof_direction = 'backward', asof_tolerance_seconds = None, retrieval_mode = 'raw', aggregation_period_seconds = None):
     
     : param: ip21_server is a string informing the server name for the IP21 REST API.
       If you check ASPEN ONE or ASPEN IP21 REST API URL, it will have a format like:
@@ -2094,6 +2976,74 @@ def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'a
     : param: previous_df_for_concatenation = None: keep it None or, if you want to append the fetched data
       to a pre-existing database, declare the object containing the pandas dataframe where it will
       be appended. Example: previous_df_for_concatenation = dataset.   
+    
+    : param: max_concurrent_requests = 1: maximum number of requests that may be simultaneously sent to
+      the IP21 server. Keep max_concurrent_requests = 1 to fetch the tags one after the other. Set an
+      integer higher than 1, like max_concurrent_requests = 4, to fetch the tags (and the time windows
+      defined by time_windows_per_tag) in parallel threads. The limit is shared by all the extractions
+      running on the same server, so the server is not flooded with requests.
+    
+    : param: time_windows_per_tag = 1: number of disjoint time windows in which the interval from start_time
+      to stop_time is split for each tag. The windows are fetched in parallel and stitched back in
+      chronological order, so long intervals do not depend on sequential API calls. 
+      Example: time_windows_per_tag = 4 fetches each quarter of the interval independently.
+      Set time_windows_per_tag = 'auto' to let a planner define the number of windows (shards) of each tag,
+      so that each shard is expected to be fetched in a single API call. The planner uses the sampling
+      period declared in estimated_sampling_period_seconds or, if it is None, a cheap probe query that
+      fetches the first samples of the window.
+      The returned list of dictionaries has the same format for any combination of these parameters.
+    
+    : param: estimated_sampling_period_seconds = None: estimated time interval (in seconds) between two
+      consecutive samples of the tags, used when time_windows_per_tag = 'auto'. Example: 
+      estimated_sampling_period_seconds = 60 for tags registered once a minute. Keep it None to estimate
+      the period through the probe query.
+    
+    : param: max_rows_per_call = 100000: maximum number of rows returned by the server in each API call
+      (parameter X of the IP21 REST query).
+    
+    : params: pool_size = 10, max_retries = 3, retry_backoff_factor = 0.5, timeout_seconds = 120:
+      parameters of the persistent HTTP session used by all the API calls (the connections and the
+      NTLM authentication are reused by all the pages and tags, and by the next calls of this function
+      while Connectors.persistent = True).
+      pool_size: number of connections kept alive with the server. It is increased to
+      max_concurrent_requests when this value is higher.
+      max_retries: maximum number of times a failed call (connection errors or status codes 429, 500, 502,
+      503 and 504) is repeated.
+      retry_backoff_factor: the wait before each retry is retry_backoff_factor * (2 ** (retry number - 1))
+      seconds. Example: 0.5, 1, 2, 4 seconds for retry_backoff_factor = 0.5.
+      timeout_seconds: maximum time, in seconds, waiting for each server response.
+    
+    : param: cache_path = None: path of a local SQLite file used as cache of the tags history. 
+      Example: cache_path = 'ip21_cache.db'. The cache registers, for each server, data source and tag,
+      the intervals that were already extracted, so only the missing intervals are fetched from the server
+      (e.g., only the last day when the same notebook is run daily). Data registered after the moment of
+      the extraction is always fetched again. Keep cache_path = None to not use the cache.
+    
+    : param: cache_ttl_days = None: tags not accessed in the cache for more than cache_ttl_days days are
+      removed from it. Example: cache_ttl_days = 30. Keep it None to never remove tags by their age.
+    
+    : param: cache_max_samples = None: maximum number of samples stored in the cache. When it is exceeded,
+      the least recently accessed tags are removed. Keep it None for no size limit.
+    
+    : param: return_wide_df = False: if True, a single wide dataframe is returned instead of the list of
+      dictionaries. It has a 'timestamp' column and one column for each tag (named as 'actual_name' or, if
+      it is None, as 'tag'). All the tags are aligned in a single pass by the align_tags_on_timestamp function, 
+      instead of merging the dataframes two at a time.
+    : params: alignment_method = 'asof', grid_frequency_seconds = None, asof_direction = 'backward',
+      asof_tolerance_seconds = None: parameters of the alignment of the tags when return_wide_df = True.
+      Check align_tags_on_timestamp function.
+    
+    : param: retrieval_mode = 'raw': type of history retrieved from the server. 'raw' returns all the samples
+      registered (no processing). 'interpolated' returns the values interpolated by the server at each
+      aggregation_period_seconds. 'average', 'maximum', 'minimum', 'standard_deviation', 'range' and 'variance'
+      return the aggregate of the samples registered in each period, calculated by the server. 
+      'shape_preserving' returns the samples that represent the shape of the curve.
+      Requesting the reduced data from the server transfers much less data than retrieving the raw samples 
+      and grouping them with group_variables_by_timestamp.
+    
+    : param: aggregation_period_seconds = None: period, in seconds, of the samples calculated by the server.
+      It must be declared for the interpolated and aggregated modes. 
+      Example: retrieval_mode = 'average', aggregation_period_seconds = 60 returns the 1-minute averages.
     """
 
     try: # try accessing the connector, if it exists
@@ -2130,6 +3080,52 @@ def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'a
     list_of_tags_to_extract = support_list
     # Only non-empty dictionaries remained
     
+    # Maximum number of rows returned in each API call:
+    ip21_connector.max_rows_per_call = max_rows_per_call
+    # Type of history retrieved (raw, interpolated or aggregated samples):
+    ip21_connector = ip21_connector.set_retrieval_mode(retrieval_mode = retrieval_mode, aggregation_period_seconds = aggregation_period_seconds)
+    # Create (or reuse) the persistent HTTP session:
+    ip21_connector = ip21_connector.create_session(pool_size = pool_size, max_retries = max_retries, retry_backoff_factor = retry_backoff_factor, timeout_seconds = timeout_seconds)
+    
+    if ((max_concurrent_requests > 1) or (time_windows_per_tag == 'auto') or (time_windows_per_tag > 1) or (cache_path is not None)):
+        
+        if (cache_path is not None):
+            # Open the local cache of the tags history:
+            cache = IP21HistoryCache(cache_path = cache_path, ttl_days = cache_ttl_days, max_samples = cache_max_samples)
+        
+        else:
+            cache = None
+        
+        # Fetch the tags and time windows in parallel threads:
+        returned_dfs_list = ip21_connector.concurrent_extraction(list_of_tags_to_extract, start_time, stop_time, start_timedelta_unit = start_timedelta_unit, stop_timedelta_unit = stop_timedelta_unit, ip21time_array = ip21time_array, previous_df_for_concatenation = previous_df_for_concatenation, max_concurrent_requests = max_concurrent_requests, time_windows_per_tag = time_windows_per_tag, estimated_sampling_period_seconds = estimated_sampling_period_seconds, request_type = 'get', cache = cache)
+        
+        if (cache is not None):
+            # Apply the eviction rules and close the cache file:
+            cache = cache.evict()
+            cache.close()
+        
+        if (return_wide_df == True):
+            Connectors.ip21_connector = ip21_connector
+            # Align all the tags on a single dataframe:
+            return align_tags_on_timestamp(returned_dfs_list, alignment_method = alignment_method, grid_frequency_seconds = grid_frequency_seconds, asof_direction = asof_direction, asof_tolerance_seconds = asof_tolerance_seconds)
+        
+        if ControlVars.show_results: 
+            for returned_data in returned_dfs_list:
+                
+                print(f"Check the the dataframe returned from tag {returned_data['tag']}:\n")
+                
+                try:
+                    # only works in Jupyter Notebook:
+                    from IPython.display import display
+                    display(returned_data['dataset'])
+
+                except: # regular mode
+                    print(returned_data['dataset'])
+        
+        Connectors.ip21_connector = ip21_connector
+
+        return returned_dfs_list
+    
     api_call_number = 1
     # Start a list for storing the valid dataframes returned:
     returned_dfs_list = []
@@ -2140,11 +3136,11 @@ def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'a
         tag_to_extract = tag_dict['tag']
         actual_tag_name = tag_dict['actual_name']
 
-        ip21_connector = ip21_connector.set_query_parameters(tag_to_extract, actual_tag_name, start_time, stop_time, ip21time_array)
+        ip21_connector = ip21_connector.set_query_parameters(tag_to_extract, actual_tag_name, start_time, stop_time, ip21time_array, previous_df_for_concatenation)
         # Define the extracted time window:
         ip21_connector = ip21_connector.set_extracted_time_window(start_timedelta_unit = start_timedelta_unit, stop_timedelta_unit = stop_timedelta_unit)
         
-        while (extractor.need_next_call == True):
+        while (ip21_connector.need_next_call == True):
             
             try:
                 print(f"API call {api_call_number}: fetching IP21 timestamps from {ip21_connector.start_ip21_scale} to {ip21_connector.stop_ip21_scale}.\n")
@@ -2162,30 +3158,32 @@ def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'a
                 print("Returning the last valid dataframe extracted.\n")
                 # Force the modification of the attribute with vars function:
                 vars(ip21_connector)['need_next_call'] = False
+            
+            api_call_number = api_call_number + 1
         
-            # Get the dataset:
-            extracted_df = ip21_connector.dataset
-
-            # Get a dictionary with the returned information:
-            returned_data = tag_dict
-            returned_data['dataset'] = extracted_df
+        # Concatenate all the pages retrieved for the tag at once:
+        ip21_connector = ip21_connector.materialize_dataset()
+        # Get the dataset:
+        extracted_df = ip21_connector.dataset
+
+        # Get a dictionary with the returned information:
+        returned_data = tag_dict
+        returned_data['dataset'] = extracted_df
+        
+        if ControlVars.show_results: 
+            if (actual_tag_name is not None):
+                print(f"Check the the dataframe returned from tag {tag_to_extract} ('{actual_tag_name}'):\n")
             
-            if ControlVars.show_results: 
-                if (actual_tag_name is not None):
-                    print(f"Check the the dataframe returned from tag {tag_to_extract} ('{actual_tag_name}') on API call {api_call_number}:\n")
-                
-                else:
-                    print(f"Check the the dataframe returned from tag {tag_to_extract} on API call {api_call_number}:\n")
-                
-                try:
-                    # only works in Jupyter Notebook:
-                    from IPython.display import display
-                    display(extracted_df)
-
-                except: # regular mode
-                    print(extracted_df)
+            else:
+                print(f"Check the the dataframe returned from tag {tag_to_extract}:\n")
             
-            api_call_number = api_call_number + 1
+            try:
+                # only works in Jupyter Notebook:
+                from IPython.display import display
+                display(extracted_df)
+
+            except: # regular mode
+                print(extracted_df)
         
         # Save the last version of the dataset and go to next tag to query.
         # For that, append the dictionary to returned_dfs_list:
@@ -2194,13 +3192,162 @@ def get_data_from_ip21 (ip21_server, list_of_tags_to_extract = [{'tag': None, 'a
     # At this level, all tags were saved (finished 'for' loop)
     Connectors.ip21_connector = ip21_connector
 
+    if (return_wide_df == True):
+        # Align all the tags on a single dataframe:
+        return align_tags_on_timestamp(returned_dfs_list, alignment_method = alignment_method, grid_frequency_seconds = grid_frequency_seconds, asof_direction = asof_direction, asof_tolerance_seconds = asof_tolerance_seconds)
+
     # Return all queried tags. If a single query was queried, there is only one dictionary in the list.
     return returned_dfs_list
 
 
-def manipulate_sqlite_db (file_path, table_name, action = 'fetch_table', pre_created_engine = None, df = None):
+def align_tags_on_timestamp (returned_dfs_list, alignment_method = 'asof', grid_frequency_seconds = None, asof_direction = 'backward', asof_tolerance_seconds = None):
+    """
+    align_tags_on_timestamp (returned_dfs_list, alignment_method = 'asof', grid_frequency_seconds = None, asof_direction = 'backward', asof_tolerance_seconds = None):
+    
+    Align several tags on a common timeline, returning a single wide dataframe with a 'timestamp' column and
+    one column for each tag. All the tags are aligned in a single pass over their sorted timestamps, with
+    no pairwise merges (which copy and sort both dataframes on each call).
+    
+    : param: returned_dfs_list: list of dictionaries returned by get_data_from_ip21, like 
+      [{'tag': 'TEMP', 'actual_name': 'temperature', 'dataset': df}]. Each dataset has the columns 'timestamp' 
+      and the variable. The tag columns are named as 'actual_name' or, if it is None, as 'tag'.
+    
+    : param: alignment_method = 'asof': the timeline is the union of the timestamps of all the tags. For each
+      timestamp, each tag receives the value of the sample selected by asof_direction.
+      alignment_method = 'grid': the timeline is a regular grid, from the first to the last timestamp, with
+      a step of grid_frequency_seconds. The values are selected as in the 'asof' method.
+    
+    : param: grid_frequency_seconds = None: step of the regular grid, in seconds, when alignment_method = 'grid'.
+      Example: grid_frequency_seconds = 60 for a timeline with one timestamp per minute.
+    
+    : param: asof_direction = 'backward': which sample is picked for each timestamp of the timeline.
+      'backward' picks the last sample registered up to the timestamp (the value is kept until a new one is
+      registered); 'forward' picks the first sample registered from the timestamp on; 'nearest' picks the
+      closest sample in both directions.
+    
+    : param: asof_tolerance_seconds = None: maximum distance, in seconds, between the timestamp of the timeline
+      and the selected sample. Farther samples are not used (the value is missing). Keep it None for no limit.
     """
-    manipulate_sqlite_db (file_path, table_name, action = 'fetch_table', pre_created_engine = None, df = None)
+    
+    if (alignment_method not in ['asof', 'grid']):
+        raise InvalidInputsError("alignment_method must be 'asof' or 'grid'.")
+    
+    if (asof_direction not in ['backward', 'forward', 'nearest']):
+        raise InvalidInputsError("asof_direction must be 'backward', 'forward' or 'nearest'.")
+    
+    # Get the sorted arrays of timestamps (as int64 nanoseconds) and values of each tag:
+    column_names = []
+    tags_arrays = []
+    
+    for returned_data in returned_dfs_list:
+        
+        column_name = returned_data.get('actual_name')
+        if (column_name is None):
+            column_name = returned_data['tag']
+        
+        column_names.append(column_name)
+        
+        df = returned_data.get('dataset')
+        
+        if ((df is None) or (len(df) == 0) or ('timestamp' not in df.columns)):
+            tags_arrays.append(None)
+            continue
+        
+        timestamps = df['timestamp'].to_numpy(dtype = 'datetime64[ns]').astype(np.int64)
+        # The value is the column different from 'timestamp':
+        values = df[[column for column in df.columns if column != 'timestamp'][0]].to_numpy()
+        
+        if (np.any(np.diff(timestamps) < 0)):
+            # Guarantee that the timestamps are sorted (the extracted datasets are already sorted):
+            sorting_indices = np.argsort(timestamps, kind = 'stable')
+            timestamps, values = timestamps[sorting_indices], values[sorting_indices]
+        
+        tags_arrays.append((timestamps, values))
+    
+    valid_arrays = [arrays for arrays in tags_arrays if arrays is not None]
+    
+    if (len(valid_arrays) == 0):
+        print("There is no data available for aligning the tags.\n")
+        return pd.DataFrame(columns = ['timestamp'] + column_names)
+    
+    if (alignment_method == 'grid'):
+        
+        if (grid_frequency_seconds is None):
+            raise InvalidInputsError("Declare grid_frequency_seconds for using alignment_method = 'grid'.")
+        
+        first_timestamp = min([arrays[0][0] for arrays in valid_arrays])
+        last_timestamp = max([arrays[0][-1] for arrays in valid_arrays])
+        step = int(np.rint(grid_frequency_seconds * (10**9)))
+        timeline = np.arange(first_timestamp, (last_timestamp + 1), step, dtype = np.int64)
+    
+    else:
+        # Union of all the sorted timestamps, with no repetitions:
+        timeline = np.unique(np.concatenate([arrays[0] for arrays in valid_arrays]))
+    
+    if (asof_tolerance_seconds is not None):
+        tolerance = int(np.rint(asof_tolerance_seconds * (10**9)))
+    
+    wide_dict = {'timestamp': timeline.astype('datetime64[ns]')}
+    
+    for column_name, arrays in zip(column_names, tags_arrays):
+        
+        if (arrays is None):
+            wide_dict[column_name] = np.full(len(timeline), np.nan)
+            continue
+        
+        timestamps, values = arrays
+        
+        # Binary search of the position of each timestamp of the timeline on the tag timestamps:
+        if (asof_direction == 'forward'):
+            indices = np.searchsorted(timestamps, timeline, side = 'left')
+        
+        else:
+            # Last sample registered up to each timestamp:
+            indices = np.searchsorted(timestamps, timeline, side = 'right') - 1
+            
+            if (asof_direction == 'nearest'):
+                # Compare with the next sample and keep the closest one:
+                next_indices = np.minimum((indices + 1), (len(timestamps) - 1))
+                previous_distance = np.where((indices >= 0), (timeline - timestamps[np.maximum(indices, 0)]), np.iinfo(np.int64).max)
+                next_distance = np.abs(timestamps[next_indices] - timeline)
+                indices = np.where((next_distance < previous_distance), next_indices, indices)
+        
+        # Timestamps with no sample in the selected direction:
+        missing = ((indices < 0) | (indices >= len(timestamps)))
+        valid_indices = np.clip(indices, 0, (len(timestamps) - 1))
+        
+        if (asof_tolerance_seconds is not None):
+            missing = missing | (np.abs(timestamps[valid_indices] - timeline) > tolerance)
+        
+        # Append a missing value to the end of the values, and point the missing positions to it:
+        values = np.append(values, np.nan)
+        indices = np.where(missing, (len(values) - 1), valid_indices)
+        wide_dict[column_name] = values[indices]
+    
+    # Create the dataframe only once:
+    wide_df = pd.DataFrame(wide_dict)
+    
+    if ControlVars.show_results:
+        print("Check the first rows of the dataframe with the aligned tags:\n")
+        
+        try:
+            # only works in Jupyter Notebook:
+            from IPython.display import display
+            display(wide_df.head(10))
+
+        except: # regular mode
+            print(wide_df.head(10))
+    
+    return wide_df
+
+
+def manipulate_sqlite_db (file_path, table_name, action = 'fetch_table', pre_created_engine = None, df = None, 
+                          if_exists = 'replace', chunksize = None, columns = None, time_column = None, 
+                          start_timestamp = None, stop_timestamp = None, where_clause = None, params = None):
+    """
+    manipulate_sqlite_db (file_path, table_name, action = 'fetch_table', pre_created_engine = None, df = None, 
+                          if_exists = 'replace', chunksize = None, columns = None, time_column = None, 
+                          start_timestamp = None, stop_timestamp = None, where_clause = None, params = None)
 
     : param: file_path: full path of the SQLite file. It may start with './' or '/', but with no more than 2 slashes.
       It is a string: input in quotes. Example: file_path = '/my_db.db'
@@ -2209,12 +3356,25 @@ def manipulate_sqlite_db (file_path, table_name, action = 'fetch_table', pre_cre
 
     : param: action = 'fetch_table' to access a table named table_name from the database.
       action = 'update_table' to update a table named table_name from the database.
+      action = 'fast_update_table' to write df on table_name with prepared inserts (executemany) in large 
+        transactions, on a WAL connection with synchronous = OFF. Much faster for large dataframes.
+      action = 'fast_fetch_table' to read table_name with the selection of columns and time range done by SQLite.
+        Returns only the dataframe (or a generator of dataframes, if chunksize is not None).
 
     : param: pre_created_engine = None - If None, a new engine will be created. If an engine was already created, pass it as argument:
       pre_created_engine = engine
 
     : param: df = None - if a table is going to be updated, input here the new Pandas dataframe (object) correspondent to the table.
       Example: df = dataset.
+
+    : param: if_exists = 'replace' to recreate the table, or 'append' to add the rows to it, when action = 'fast_update_table'.
+    : param: chunksize (int): number of rows of each transaction ('fast_update_table', default 100000) or of each 
+      returned dataframe ('fast_fetch_table'; keep None to return a single dataframe).
+    : param: columns (list): list of columns to read, when action = 'fast_fetch_table'. None to read all the columns.
+    : param: time_column (str): column with the timestamps used for filtering the rows between start_timestamp (inclusive)
+      and stop_timestamp (exclusive), when action = 'fast_fetch_table'. An index is created on it.
+    : param: where_clause (str): additional SQL condition for 'fast_fetch_table', e.g. where_clause = "tag = ?".
+    : param: params (list): parameters of the '?' placeholders of where_clause.
     """
 
     
@@ -2241,10 +3401,30 @@ def manipulate_sqlite_db (file_path, table_name, action = 'fetch_table', pre_cre
         
     elif (action == 'update_table'):
 
-            df, engine = sqlite_connector.update_or_create_table(table_name)
+            df, engine = sqlite_connector.update_or_create_table(table_name, df)
             Connectors.sqlite_connector = sqlite_connector
 
             return df, engine
+    
+    elif (action == 'fast_update_table'):
+
+            if (chunksize is None):
+                chunksize = 100000
+            
+            sqlite_connector = sqlite_connector.fast_write_table(table_name, df, if_exists, chunksize)
+            Connectors.sqlite_connector = sqlite_connector
+
+            return sqlite_connector
+    
+    elif (action == 'fast_fetch_table'):
+
+            if (time_column is not None):
+                sqlite_connector = sqlite_connector.create_index_on_table(table_name, time_column)
+            
+            df = sqlite_connector.fast_read_table(table_name, columns, time_column, start_timestamp, stop_timestamp, where_clause, params, chunksize)
+            Connectors.sqlite_connector = sqlite_connector
+
+            return df
 
 
 def bigquery_pipeline(project = '', dataset = '', already_authenticated = True,
@@ -2259,7 +3439,11 @@ def bigquery_pipeline(project = '', dataset = '', already_authenticated = True,
                         old_value = None,
                         updated_value = None, comparative_column = None, value_to_search = None, 
                         string_column = '', str_or_substring_to_search = '',
-                        view_id = ''
+                        view_id = '',
+                        use_arrow_transfer = False, arrow_backed_dtypes = False,
+                        use_load_job = False, write_disposition = 'WRITE_APPEND', chunksize = None,
+                        key_columns = None, update_columns = None, insert_new_rows = True,
+                        old_to_updated_values = None
                         ):
     """
     Pipeline for fetching or updating data stored on Google Cloud Platform (GCP).
@@ -2275,10 +3459,24 @@ def bigquery_pipeline(project = '', dataset = '', already_authenticated = True,
         - 'get_full_table': run a query to return the full content from a table declared in parameter 'table'
             Notice that 'table' cannot be an empty string or None object for using this action.
         
+        - 'stream_record_batches': returns a generator of pyarrow RecordBatches with the results of 'query' or,
+            if 'query' is empty, with the full content from 'table'. Use it for results that do not fit in the memory.
+        
         - 'write_data_on_bigquery_table': write data from a dataframe declared in
             parameter 'df' on a table declared in parameter 'table'. Notice that neither 'table' nor 'df' cannot
             be empty strings or None objects for using this action.
         
+        - 'load_dataframe_to_table': bulk write of the dataframe 'df' on the table 'table' through Parquet load jobs 
+            (one job per 'chunksize' rows), with the 'write_disposition' ('WRITE_APPEND', 'WRITE_TRUNCATE' or 'WRITE_EMPTY').
+        
+        - 'merge_dataframe_on_table': batched upsert of the rows of 'df' on 'table'. The rows are matched by 'key_columns';
+            'update_columns' are updated in the matched rows (all the non-key columns, if None), and the rows with no
+            match are inserted if 'insert_new_rows' = True. All the rows are applied with a single MERGE statement.
+        
+        - 'batch_update_values_from_column_on_table': analogous to 'update_specific_value_from_column_on_table', but
+            replaces all the values declared in the dictionary 'old_to_updated_values' ({old_value: updated_value})
+            with a single MERGE statement.
+        
         - 'delete_specific_values_from_column_on_table': look at a column specified in the parameter 'column' from a
             table declared in parameter 'table'; and then search for values specified as 'values_to_delete'. 
             Notice that 'column', 'table' or 'values_to_delete' cannot be empty strings or None objects for 
@@ -2399,6 +3597,24 @@ def bigquery_pipeline(project = '', dataset = '', already_authenticated = True,
         column 'string_column'. When it is find, the value on 'column' will be updated.
 
     : param: view_id (str): The ID of the view to be created. If no ID is provided, a table is created
+
+    : param: use_arrow_transfer (bool): if True, 'run_sql_query' and 'get_full_table' download the results
+        in columnar (Arrow) format through the BigQuery Storage Read API, which is faster for large results.
+        'get_full_table' also reads the table directly, instead of running a SELECT * query.
+    : param: arrow_backed_dtypes (bool): if True (and use_arrow_transfer = True), the returned dataframes keep
+        Arrow-backed (pd.ArrowDtype) columns, avoiding the conversion to NumPy.
+    
+    : param: use_load_job (bool): if True, 'write_data_on_bigquery_table' appends the dataframe through
+        Parquet load jobs, instead of the row-by-row streaming insertion.
+    : param: write_disposition (str): 'WRITE_APPEND', 'WRITE_TRUNCATE' or 'WRITE_EMPTY', for 'load_dataframe_to_table'.
+    : param: chunksize (int): maximum number of rows of each load job. Keep None to load the dataframe in a single job.
+    : param: key_columns (str or list): column(s) used for matching the rows, for 'merge_dataframe_on_table'.
+    : param: update_columns (list): columns updated by 'merge_dataframe_on_table'. If None, all the non-key columns.
+    : param: insert_new_rows (bool): if True, 'merge_dataframe_on_table' inserts the rows with no match on the table.
+    : param: old_to_updated_values (dict): dictionary mapping the values that must be replaced to the new values,
+        for 'batch_update_values_from_column_on_table'. e.g. {'old_name1': 'new_name1', 'old_name2': 'new_name2'}
+    
+    The write actions report the throughput (rows per second), also stored as the attribute write_throughput.
     """
     
     try: # try accessing the connector, if it exists
@@ -2422,17 +3638,37 @@ def bigquery_pipeline(project = '', dataset = '', already_authenticated = True,
         return gcp_connector
     
     elif (action == 'run_sql_query'):
-        df = gcp_connector.run_sql_query(query, show_table, export_csv, saving_directory_path)
+        df = gcp_connector.run_sql_query(query, show_table, export_csv, saving_directory_path, use_arrow_transfer, arrow_backed_dtypes)
         Connectors.gcp_connector = gcp_connector
         return df
     
     elif (action == 'get_full_table'):
-        df_table = gcp_connector.get_full_table(table, show_table, export_csv, saving_directory_path)
+        df_table = gcp_connector.get_full_table(table, show_table, export_csv, saving_directory_path, use_arrow_transfer, arrow_backed_dtypes)
         Connectors.gcp_connector = gcp_connector
         return df_table
     
+    elif (action == 'stream_record_batches'):
+        batches_generator = gcp_connector.stream_record_batches(query, table)
+        Connectors.gcp_connector = gcp_connector
+        return batches_generator
+    
     elif (action == 'write_data_on_bigquery_table'):
-        gcp_connector = gcp_connector.write_data_on_bigquery_table(table, df)
+        gcp_connector = gcp_connector.write_data_on_bigquery_table(table, df, use_load_job, chunksize)
+        Connectors.gcp_connector = gcp_connector
+        return gcp_connector
+    
+    elif (action == 'load_dataframe_to_table'):
+        gcp_connector = gcp_connector.load_dataframe_to_table(table, df, write_disposition, chunksize)
+        Connectors.gcp_connector = gcp_connector
+        return gcp_connector
+    
+    elif (action == 'merge_dataframe_on_table'):
+        gcp_connector = gcp_connector.merge_dataframe_on_table(table, df, key_columns, update_columns, insert_new_rows)
+        Connectors.gcp_connector = gcp_connector
+        return gcp_connector
+    
+    elif (action == 'batch_update_values_from_column_on_table'):
+        gcp_connector = gcp_connector.batch_update_values_from_column_on_table(table, column, old_to_updated_values)
         Connectors.gcp_connector = gcp_connector
         return gcp_connector
     
@@ -2471,10 +3707,14 @@ def sqlserver_pipeline (server,
                   username = '', 
                   password = '',
                   system = 'windows',
+                  action = 'connect',
                   show_schema = True, export_csv = False, saving_directory_path = "",
                   query = '', show_table = True,
                   table = '',
-                  tag = '', variable_name = None,   
+                  tag = '', variable_name = None,
+                  list_of_tags = [{'tag': None, 'actual_name': None}], batch_size = 500, max_parallel_queries = 1,
+                  pool_size = 4,
+                  chunksize = 100000, file_format = 'parquet', dtypes = None
                   ):
     """
     Pipeline for fetching or updating data stored on Microsoft SQL Server.
@@ -2508,6 +3748,19 @@ def sqlserver_pipeline (server,
             use this action to query only a specific tag (variable or attribute). Notice that the parameter 'tag'
             cannot be empty string or None object for using this action. The parameter 'variable_name' is optional
             and can be used to modify the tag to a name of variable easier to understand.
+        
+        - 'query_multiple_tags_ip21sqlserver': analogous to 'query_specific_tag_ip21sqlserver', but queries all the tags
+            declared in 'list_of_tags' in batches of parameterized WHERE TagName IN (...) queries, instead of one query per tag.
+        
+        - 'stream_sql_query': analogous to 'run_sql_query', but returns a generator of dataframes with up to 'chunksize'
+            rows each, so that tables larger than the memory can be processed chunk by chunk.
+        
+        - 'stream_full_table': analogous to 'get_full_table', but returns a generator of dataframes with up to 'chunksize' rows each.
+        
+        - 'spill_sql_query': run the query declared in 'query' and write the result straight to the file
+            'saving_directory_path' ('parquet' or 'csv', declared in 'file_format'), chunk by chunk, without loading it to the memory.
+        
+        - 'spill_full_table': analogous to 'spill_sql_query', for the full content from the table declared in 'table'.
     
     : param: show_schema (bool): if True, the schema of the tables on the SQL Server will be shown.
     : param: show_table (bool): keep as True to print the queried table, set False to hide it.
@@ -2521,6 +3774,17 @@ def sqlserver_pipeline (server,
     : param: variable_name (str): string containing a more readable name for the tag, that will be also shown.
         e.g. variable_name = 'Temperature in C'
     
+    : param: list_of_tags: list of dictionaries with the keys 'tag' and 'actual_name' (readable name, may be None).
+        e.g. list_of_tags = [{'tag': 'ABC00AA101-01', 'actual_name': 'Temperature in C'}, {'tag': 'ABC00AA101-02', 'actual_name': None}]
+    : param: batch_size (int): maximum number of tags fetched by each query (up to 1000).
+    : param: max_parallel_queries (int): number of batches queried at the same time. Keep 1 to run them sequentially.
+    : param: pool_size (int): maximum number of connections kept open with the server and reused by the queries.
+    
+    : param: chunksize (int): maximum number of rows of each chunk, for the streaming and spilling actions.
+    : param: file_format (str): 'parquet' or 'csv', format of the file written by the spilling actions.
+    : param: dtypes (dict): optional dictionary mapping column names to the dtypes of the streamed chunks,
+        e.g. dtypes = {'value': 'float64', 'tag': 'category'}. The other columns keep the dtypes of the first chunk.
+    
     """
     
 
@@ -2531,11 +3795,11 @@ def sqlserver_pipeline (server,
                 sqlserver_connector = Connectors.sqlserver_connector
             else:
                 # Create the connector
-                sqlserver_connector = SQLServerConnection(server, database, username, password, system)
+                sqlserver_connector = SQLServerConnection(server, database, username, password, system, pool_size)
             
     except:
         # Create the connector
-        sqlserver_connector = SQLServerConnection(server, database, username, password, system)
+        sqlserver_connector = SQLServerConnection(server, database, username, password, system, pool_size)
     
 
     if (action == 'connect'):
@@ -2548,17 +3812,42 @@ def sqlserver_pipeline (server,
         return sqlserver_connector
     
     elif (action == 'run_sql_query'):
-        sqlserver_connector = sqlserver_connector.run_sql_query(query, show_table, export_csv, saving_directory_path)
+        df = sqlserver_connector.run_sql_query(query, show_table, export_csv, saving_directory_path)
         Connectors.sqlserver_connector = sqlserver_connector
-        return sqlserver_connector
+        return df
     
     elif (action == 'get_full_table'):
-        sqlserver_connector = sqlserver_connector.get_full_table(table, show_table, export_csv, saving_directory_path)
+        df = sqlserver_connector.get_full_table(table, show_table, export_csv, saving_directory_path)
         Connectors.sqlserver_connector = sqlserver_connector
-        return sqlserver_connector
+        return df
     
     elif (action == 'query_specific_tag_ip21sqlserver'):
-        sqlserver_connector = sqlserver_connector.query_specific_tag_ip21sqlserver(tag, variable_name, show_table, export_csv, saving_directory_path)
+        df = sqlserver_connector.query_specific_tag_ip21sqlserver(tag, variable_name, show_table, export_csv, saving_directory_path)
+        Connectors.sqlserver_connector = sqlserver_connector
+        return df
+    
+    elif (action == 'query_multiple_tags_ip21sqlserver'):
+        df = sqlserver_connector.query_multiple_tags_ip21sqlserver(list_of_tags, batch_size, max_parallel_queries, show_table, export_csv, saving_directory_path)
+        Connectors.sqlserver_connector = sqlserver_connector
+        return df
+    
+    elif (action == 'stream_sql_query'):
+        chunks_generator = sqlserver_connector.stream_sql_query(query, chunksize, dtypes)
+        Connectors.sqlserver_connector = sqlserver_connector
+        return chunks_generator
+    
+    elif (action == 'stream_full_table'):
+        chunks_generator = sqlserver_connector.stream_full_table(table, chunksize, dtypes)
+        Connectors.sqlserver_connector = sqlserver_connector
+        return chunks_generator
+    
+    elif (action == 'spill_sql_query'):
+        sqlserver_connector = sqlserver_connector.spill_sql_query(query, saving_directory_path, file_format, chunksize, dtypes)
+        Connectors.sqlserver_connector = sqlserver_connector
+        return sqlserver_connector
+    
+    elif (action == 'spill_full_table'):
+        sqlserver_connector = sqlserver_connector.spill_full_table(table, saving_directory_path, file_format, chunksize, dtypes)
         Connectors.sqlserver_connector = sqlserver_connector
         return sqlserver_connector
     
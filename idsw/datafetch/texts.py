@@ -11,13 +11,183 @@ import pandas as pd
 from idsw import (InvalidInputsError, ControlVars)
 
 
+def load_text_document (file_path):
+    """
+    Load a single file with the langchain document loader correspondent to its extension.
+    It is defined at module level so that it can be sent to the processes of a process pool.
+    
+    Parameters:
+    ----------
+    file_path : str
+        Full path to the file to be processed. Extensions may be pdf, csv, html, txt, docx or doc.
+
+    Returns:
+    
+        (file_name, meta, text) tuple, or None if the extension is not supported or if the file could not be read.
+
+    """
+
+    import os
+    from langchain_community.document_loaders import PyPDFLoader, CSVLoader, UnstructuredHTMLLoader, Docx2txtLoader, TextLoader
+
+    error_msg = """Run the command for downloading the required package:
+        ! pip install """
+    
+    # Ensure the object has a valid extension
+    if (os.path.splitext(file_path)[1][1:] == ''):
+        return None
+    
+    extension = os.path.splitext(file_path)[1].lower()
+    extension = extension.strip('.')
+    file_name = os.path.basename(file_path)
+    
+    # Load the file based on its extension
+    if extension == "pdf":
+        try:
+            loader = PyPDFLoader(file_path)
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(error_msg + "pypdf")
+
+    elif extension == "csv":
+        loader = CSVLoader (file_path = file_path)
+
+    elif extension == "html":
+        try:
+            loader = UnstructuredHTMLLoader(file_path)
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(error_msg + "unstructured")
+
+    elif extension == "txt":
+        loader = TextLoader (file_path)
+
+    elif ((extension == "docx") | (extension == "doc")):
+        try:
+            loader = Docx2txtLoader (file_path)
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(error_msg + "docx2txt")
+
+    else:
+        print(f"Found file with extension that is not supported: {extension}")
+        return None
+
+    # Try to read the document:
+    try:
+
+        data = loader.load()
+
+    except:
+        return None
+
+    # Try to extract metadata. If no metadata is available, add this info:
+    try:
+        # Extract metadata
+        meta = data[0].metadata
+
+    except:
+        meta = 'file with no metadata'
+
+    # Extract all the pages:
+    pages = [page.page_content for page in data]
+    # Concatenate the full text, separating each page with a line break
+    text = '\n'.join(pages)
+    
+    return file_name, meta, text
+
+
+def get_file_content_hash (file_path, known_files = None):
+    """
+    Return the SHA-256 hash of the content of a file, read in blocks, so that large files are not fully loaded into memory.
+    
+    Parameters:
+    ----------
+    file_path : str
+        Full path to the file.
+
+    known_files : dict or None, optional (default = None)
+        Dictionary mapping absolute file paths to manifest entries, with the keys 'size', 'mtime' and 'hash'.
+        If the size and modification time of the file did not change, the stored hash is returned without reading the file.
+
+    Returns:
+    
+        (hash, size, mtime) tuple
+
+    """
+
+    import os
+    import hashlib
+
+    file_stat = os.stat(file_path)
+
+    if (known_files is not None):
+        entry = known_files.get(os.path.abspath(file_path))
+        
+        if ((entry is not None) and (entry['size'] == file_stat.st_size) and (entry['mtime'] == file_stat.st_mtime)):
+            return entry['hash'], file_stat.st_size, file_stat.st_mtime
+    
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    
+    return sha256.hexdigest(), file_stat.st_size, file_stat.st_mtime
+
+
+def read_extraction_manifest (manifest_path):
+    """
+    Read the manifest of the files already extracted to a text database by text_extraction.
+    The manifest is a JSON-lines file: each line is the entry of a file, with the keys 'hash' (SHA-256 of the file content),
+    'file_path', 'file_name', 'size' and 'mtime'.
+    
+    Parameters:
+    ----------
+    manifest_path : str
+        Path of the manifest file.
+
+    Returns:
+    
+        extracted_hashes: set with the hashes of the contents already extracted
+        known_files: dictionary mapping the absolute file paths to their last entries
+
+    """
+
+    import os
+    import json
+
+    extracted_hashes = set()
+    known_files = {}
+
+    if (not os.path.exists(manifest_path)):
+        return extracted_hashes, known_files
+    
+    with open(manifest_path, 'r') as f:
+        for line in f:
+            
+            line = line.strip()
+            if (line == ''):
+                continue
+            
+            try:
+                entry = json.loads(line)
+            except:
+                # Ignore a partially written line (e.g., from an interrupted run):
+                continue
+            
+            extracted_hashes.add(entry['hash'])
+            known_files[entry['file_path']] = entry
+
+    return extracted_hashes, known_files
+
+
 def text_extraction (file_paths, doc_separator = '\n\n-----\n\n',
                         output_text_path = None, output_meta_path = None,
                         previous_text_database_path = None, previous_metadata_database_path = None,
-                        previous_filenames_database_path = None):
+                        previous_filenames_database_path = None,
+                        output_filenames_path = None, append_to_database = False,
+                        manifest_path = None, max_workers = None):
 
     import os
-    from langchain_community.document_loaders import PyPDFLoader, CSVLoader, UnstructuredHTMLLoader, Docx2txtLoader, TextLoader
+    import json
+    from concurrent.futures import ProcessPoolExecutor
     
     """
     Extracts the full text and metadata from a file or list of files. Extensions may be pdf, csv, html, txt.
@@ -37,18 +207,47 @@ def text_extraction (file_paths, doc_separator = '\n\n-----\n\n',
     output_meta_path : str or None, optional (default = None)
         If provided, saves the metadata of the processed files to a text file at this path.
         If None, output_meta_path will be set to 'metadata.txt'
+        If the path ends with '.jsonl', the metadata is saved as a JSON-lines database (one JSON per line), which is
+        read back as dicts by read_jsonl_metadata_db in a single parsing pass.
     
     previous_text_database_path : str or None, optional (default = None)
         If provided, the text database from this path will be read, and new data will be appended to it
 
     previous_metadata_database_path : str or None, optional (default = None)
         If provided, the metadata database from this path will be read, and new data will be appended to it
+        (JSON-lines databases, with the '.jsonl' extension, are read with read_jsonl_metadata_db)
 
     previous_filenames_database_path : str or None, optional (default = None)
         If provided, the file names database from this path will be read, and new data will be appended to it
     
     WARNING: The new database will not automatically overwrite the previous ones. It will be saved to the provided path or to the default path.
 
+    output_filenames_path : str or None, optional (default = None)
+        If provided, saves the names of the processed files to a text file at this path.
+        If None, output_filenames_path will be set to 'file_names.txt'
+
+    append_to_database : bool, optional (default = False)
+        If True, output_text_path, output_meta_path and output_filenames_path are the databases themselves: the new
+        documents are appended to the end of these files, which are neither read nor rewritten. So, the cost of a run 
+        depends only on the new files, not on the size of the database. The previous_..._database_path parameters are 
+        ignored in this mode, and only the new documents are returned.
+        If False, the outputs are rewritten with the new documents (combined with the previous databases, if provided).
+
+    manifest_path : str or None, optional (default = None)
+        Path of a JSON-lines manifest with the SHA-256 hashes of the contents of the files already extracted 
+        (check read_extraction_manifest). Files whose content is in the manifest, and repeated files in file_paths,
+        are skipped, even if they were renamed or moved. The entries of the new files are appended to the manifest.
+        If None and append_to_database = True, the manifest is saved to output_text_path with the suffix '_manifest.jsonl'.
+        If None and append_to_database = False, no deduplication is performed.
+        The manifest describes the documents of the database, so it is only used when the new documents are added to
+        the previous ones: append_to_database = True, or the three previous_..._database_path parameters provided. 
+        Otherwise, the outputs would be rewritten with only the new documents, and the manifest is ignored.
+
+    max_workers : int or None, optional (default = None)
+        If None or 1, the files are loaded one at a time. If an integer higher than 1 is provided, the files are loaded 
+        in parallel by a pool of max_workers processes (the document loaders are CPU-bound, so processes are used 
+        instead of threads). The order of the documents follows the order of file_paths in both cases.
+
     Returns:
     
         texts: list where each element is one of the documents read
@@ -68,10 +267,47 @@ def text_extraction (file_paths, doc_separator = '\n\n-----\n\n',
     
     if output_meta_path is None:
         output_meta_path = 'metadata.txt'
-
-
-    error_msg = """Run the command for downloading the required package:
-        ! pip install """
+    
+    if output_filenames_path is None:
+        output_filenames_path = 'file_names.txt'
+    
+    if ((manifest_path is None) & (append_to_database == True)):
+        manifest_path = os.path.splitext(output_text_path)[0] + '_manifest.jsonl'
+    
+    # Files can only be skipped if the documents already extracted are kept in the outputs:
+    keeps_previous_documents = ((append_to_database == True) | ((previous_text_database_path is not None) & (previous_metadata_database_path is not None) & (previous_filenames_database_path is not None)))
+    
+    if ((manifest_path is not None) & (not keeps_previous_documents)):
+        print(f"Warning: the manifest {manifest_path} was ignored, since the outputs will be rewritten with only the new documents. Set append_to_database = True, or provide the three previous_..._database_path parameters, to skip the files already extracted.\n")
+        manifest_path = None
+    
+    # Entries of the new files, to be appended to the manifest:
+    new_manifest_entries = []
+
+    if manifest_path is not None:
+        # Skip the files whose content was already extracted. The hashes of the files that did not
+        # change (same size and modification time) are taken from the manifest, without reading them.
+        extracted_hashes, known_files = read_extraction_manifest(manifest_path)
+        files_to_extract = []
+        
+        for file_path in file_paths:
+            
+            content_hash, size, mtime = get_file_content_hash(file_path, known_files)
+            
+            if (content_hash in extracted_hashes):
+                if (os.path.abspath(file_path) not in known_files):
+                    # Same content under a new path: register the path, so it is not hashed again.
+                    new_manifest_entries.append({'hash': content_hash, 'file_path': os.path.abspath(file_path), 'file_name': os.path.basename(file_path), 'size': size, 'mtime': mtime})
+                continue
+            
+            # Also avoid extracting twice a content repeated in file_paths:
+            extracted_hashes.add(content_hash)
+            files_to_extract.append((file_path, {'hash': content_hash, 'file_path': os.path.abspath(file_path), 'file_name': os.path.basename(file_path), 'size': size, 'mtime': mtime}))
+        
+        print(f"{len(file_paths) - len(files_to_extract)} files were skipped, since their contents were already extracted.\n")
+    
+    else:
+        files_to_extract = [(file_path, None) for file_path in file_paths]
 
     # Initialize the list to store metadata for reporting and a structured result to return
     # Create empty lists for storing files information
@@ -79,140 +315,365 @@ def text_extraction (file_paths, doc_separator = '\n\n-----\n\n',
     texts = []
     file_names = []
 
+    if ((max_workers is not None) and (max_workers > 1) and (len(files_to_extract) > 1)):
+        # Parallel mode: executor.map returns the results in the same order of the inputs.
+        with ProcessPoolExecutor(max_workers = max_workers) as executor:
+            loaded_documents = list(executor.map(load_text_document, [file_path for file_path, entry in files_to_extract]))
+    
+    else:
+        loaded_documents = [load_text_document(file_path) for file_path, entry in files_to_extract]
     
-    for file_path in file_paths:
+    for loaded_document, (file_path, entry) in zip(loaded_documents, files_to_extract):
         
-        # Ensure the object has a valid extension
-        if (os.path.splitext(file_path)[1][1:] != ''):
+        if loaded_document is None:
+            # Not supported or not readable: it is not registered in the manifest, so it is tried again in the next run.
+            continue
+        
+        file_name, meta, text = loaded_document
+        file_names.append(file_name)
+        metadata.append(meta)
+        texts.append(text)
+
+        if entry is not None:
+            new_manifest_entries.append(entry)
             
-            extension = os.path.splitext(file_path)[1].lower()
-            extension = extension.strip('.')
-            file_name = os.path.basename(file_path)
-            file_names.append(file_name)
+    print(f"Total of {len(texts)} documents read.")
+    
+    if (len(texts) > 0):
+        print(f"First document metadata: {metadata[0]}")
+        print(f"First document 50 initial characters: {texts[0][:50]}")
+        print(f"Last document metadata: {metadata[-1]}")
+        print(f"Last document 50 initial characters:: {texts[-1][:50]}")
+    
+    if (len(texts) != len(metadata)):
+        print(f"Attention! Found metadata for only {len(metadata)} documents.")
+        
+    print("\n")
+
+    if append_to_database:
+        # Append-only mode: write only the new documents to the end of the databases.
+        
+        if (len(texts) > 0):
             
-            # Load the file based on its extension
-            if extension == "pdf":
-                try:
-                    loader = PyPDFLoader(file_path)
-                except ModuleNotFoundError:
-                    raise ModuleNotFoundError(error_msg + "pypdf")
-
-            elif extension == "csv":
-                loader = CSVLoader (file_path = file_path)
-
-            elif extension == "html":
-                try:
-                    loader = UnstructuredHTMLLoader(file_path)
-                except ModuleNotFoundError:
-                    raise ModuleNotFoundError(error_msg + "unstructured")
-
-            elif extension == "txt":
-                loader = TextLoader (file_path)
-
-            elif ((extension == "docx") | (extension == "doc")):
-                try:
-                    loader = Docx2txtLoader (file_path)
-                except ModuleNotFoundError:
-                    raise ModuleNotFoundError(error_msg + "docx2txt")
+            # The JSON-lines metadata has no separators; it is appended separately:
+            save_metadata_as_jsonl = (os.path.splitext(output_meta_path)[1].lower() == '.jsonl')
+            
+            if save_metadata_as_jsonl:
+                create_jsonl_metadata_db(output_meta_path, metadata, append = True)
+                outputs_list = [(output_text_path, texts), (output_filenames_path, file_names)]
+            
+            else:
+                outputs_list = [(output_text_path, texts), (output_meta_path, [str(meta) for meta in metadata]), (output_filenames_path, file_names)]
+            
+            for output_path, new_strings in outputs_list:
+                
+                # If the database already has documents, separate them from the new ones:
+                has_documents = (os.path.exists(output_path) and (os.path.getsize(output_path) > 0))
+                
+                with open(output_path, 'a') as f:
+                    if has_documents:
+                        f.write(doc_separator)
+                    f.write(doc_separator.join(new_strings))
+    
+    else:
+        
+        # doc_separator = '\n\n-----\n\n'
+            
+        if previous_text_database_path is not None:
+            # Read it as a string and append the new texts to it:
+            with open (previous_text_database_path, 'r') as f:
+                previous_db = f.read()
+                
+            # Separate documents into a list
+            previous_db_texts = previous_db.split(doc_separator)
+            # Combine the lists:
+            texts = previous_db_texts + texts
+                
+        # Concatenate all documents in a single text
+        all_texts = doc_separator.join(texts)
 
+            
+        if previous_metadata_database_path is not None:
+            
+            if (os.path.splitext(previous_metadata_database_path)[1].lower() == '.jsonl'):
+                previous_metadata_db_texts = read_jsonl_metadata_db(previous_metadata_database_path)
+            
             else:
-                print(f"Found file with extension that is not supported: {extension}")
-                continue # Skip to the next file
+                # Read it as a string and append the new texts to it:
+                with open (previous_metadata_database_path, 'r') as f:
+                    previous_metadata_db = f.read()
+                    
+                # Separate documents into a list
+                previous_metadata_db_texts = previous_metadata_db.split(doc_separator)
+            
+            # Combine the lists:
+            metadata = previous_metadata_db_texts + metadata
+            
+        # Concatenate all metadata in a single text
+        metadata_text = doc_separator.join([str(meta) for meta in metadata])
+            
+            
+        if previous_filenames_database_path is not None:
+            # Read it as a string and append the new texts to it:
+            with open (previous_filenames_database_path, 'r') as f:
+                filenames_db = f.read()
+                
+            # Separate documents into a list
+            filenames_db_texts = filenames_db.split(doc_separator)
+            # Combine the lists:
+            file_names = filenames_db_texts + file_names
+    
+        # Concatenate all file names:
+        files = doc_separator.join(file_names)
 
-            # Try to read the document:
-            try:
+        # Save outputs
+            
+        if (os.path.splitext(output_meta_path)[1].lower() == '.jsonl'):
+            create_jsonl_metadata_db(output_meta_path, metadata)
+        
+        else:
+            with open(output_meta_path, 'w') as f:
+                f.write(metadata_text)
 
-                data = loader.load()
+        with open(output_text_path, 'w') as f:
+            f.write(all_texts)
+            
+        with open(output_filenames_path, 'w') as f:
+            f.write(files)
+        
+        # The rewritten files must be scanned again, so existing offsets indices stay in sync with them 
+        # (a rewrite with the same size would not be detected by build_txt_db_index):
+        for output_path in [output_text_path, output_meta_path, output_filenames_path]:
+            if ((os.path.splitext(output_path)[1].lower() != '.jsonl') and os.path.exists(output_path + '.idx.npy')):
+                build_txt_db_index(output_path, doc_separator, rebuild = True)
+    
+    if ((manifest_path is not None) & (len(new_manifest_entries) > 0)):
+        # The manifest is only updated after the documents were saved, so an interrupted run never registers
+        # a file that is missing from the database:
+        with open(manifest_path, 'a') as f:
+            for entry in new_manifest_entries:
+                f.write(json.dumps(entry) + '\n')
+    
+    
+    return texts, metadata, file_names
 
-                # Try to extract metadata. If no metadata is available, add this info:
-                try:
-                      # Extract metadata and append it to the metadata list
-                      meta = data[0].metadata
 
-                except:
-                      meta = 'file with no metadata'
-                    
-                metadata.append(meta)
+def build_txt_db_index (file_path, doc_separator = '\n\n-----\n\n', rebuild = False):
+    
+    """
+    Create or update the offsets index of a txt database, saved as the sidecar file file_path + '.idx.npy'.
+    The index is a NumPy array with one row [start, stop] per document, containing the positions (in bytes) of the 
+    document in the txt file. So, any document can be read without reading or splitting the whole file.
+    
+    The txt database itself is not modified, so it remains readable by read_txt_database with split_strings = True.
+    If documents were appended to the database after the index was created (e.g., by create_txt_db with append = True,
+    or by text_extraction with append_to_database = True), only the new bytes are scanned.
+    
+    Parameters:
+    ----------
+    file_path : str
+        Path of the txt database.
 
-                # Extract all the pages:
-                pages = [page.page_content for page in data]
-                # Concatenate the full text and append it to the texts list, separating each page with a line break
-                text = '\n'.join(pages)
-                texts.append(text)
+    doc_separator : str
+        The string that separates the different documents in the txt file.
 
-            except:
-                  pass
-            
-    print(f"Total of {len(texts)} documents read.")
-    print(f"First document metadata: {metadata[0]}")
-    print(f"First document 50 initial characters: {texts[0][:50]}")
-    print(f"Last document metadata: {metadata[-1]}")
-    print(f"Last document 50 initial characters:: {texts[-1][:50]}")
+    rebuild : bool
+        If True, the whole file is scanned again, ignoring the existing index. Use it if the file was rewritten.
+
+    Returns:
     
-    if (len(texts) != len(metadata)):
-        print(f"Attention! Found metadata for only {len(metadata)} documents.")
+        offsets: NumPy array of shape (number_of_documents, 2) with the start and stop positions of each document.
+        An empty file has no documents.
+
+    """
+
+    import os
+    import mmap
+
+    index_path = file_path + '.idx.npy'
+    # The separator is searched as it is written in the file (text mode converts the line breaks to os.linesep):
+    separator_bytes = doc_separator.replace('\n', os.linesep).encode('utf-8')
+    file_size = os.path.getsize(file_path)
+    offsets = np.zeros((0, 2), dtype = np.int64)
+
+    if ((not rebuild) and (os.path.exists(index_path))):
         
-    print("\n")
+        offsets = np.load(index_path)
+
+        if ((len(offsets) > 0) and (offsets[-1, 1] == file_size)):
+            # The index is up to date:
+            return offsets
         
-    # doc_separator = '\n\n-----\n\n'
+        if ((len(offsets) > 0) and (offsets[-1, 1] > file_size)):
+            # The file was truncated or rewritten: the index is not valid anymore.
+            offsets = np.zeros((0, 2), dtype = np.int64)
+    
+    if (file_size == 0):
+        offsets = np.zeros((0, 2), dtype = np.int64)
+    
+    else:
         
-    if previous_text_database_path is not None:
-        # Read it as a string and append the new texts to it:
-        with open (previous_text_database_path, 'r') as f:
-            previous_db = f.read()
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as mapped_file:
             
-        # Separate documents into a list
-        previous_db_texts = previous_db.split(doc_separator)
-        # Combine the lists:
-        texts = previous_db_texts + texts
+            if ((len(offsets) > 1) and (mapped_file[offsets[0, 1]:(offsets[0, 1] + len(separator_bytes))] != separator_bytes)):
+                # The first separator is not where the index says it should be (e.g., the file was rewritten
+                # with a different content, or another separator). Scan the whole file again:
+                offsets = np.zeros((0, 2), dtype = np.int64)
             
-    # Concatenate all documents in a single text
-    all_texts = doc_separator.join(texts)
+            # The last indexed document may have been extended by the appended bytes, so scan again from its start:
+            scan_start = 0 if (len(offsets) == 0) else int(offsets[-1, 0])
+            offsets = offsets[:-1]
+            
+            starts = [scan_start]
+            stops = []
+            # mmap.find searches the separator without loading the file into memory:
+            position = mapped_file.find(separator_bytes, scan_start)
+            
+            while (position != -1):
+                stops.append(position)
+                starts.append(position + len(separator_bytes))
+                position = mapped_file.find(separator_bytes, (position + len(separator_bytes)))
+            
+            stops.append(file_size)
+        
+        offsets = np.concatenate([offsets, np.array([starts, stops], dtype = np.int64).T])
+    
+    # Save to a temporary file and rename it, so that an interrupted save never leaves a corrupted index:
+    temporary_path = file_path + '.idx.tmp.npy'
+    np.save(temporary_path, offsets)
+    os.replace(temporary_path, index_path)
 
+    return offsets
+
+
+class IndexedTxtDatabase:
+    """
+    Random-access reader for a txt database, based on the offsets index created by build_txt_db_index.
+    The file is memory-mapped, so reading the document i only reads its own bytes from the disk:
+
+        with IndexedTxtDatabase('extracted_text.txt') as db:
+            number_of_documents = len(db)
+            document = db[10]
+            documents = db.get_documents([0, 5, 42])
+            for document in db: # streaming iteration, one document at a time
+                ...
+    """
+
+    def __init__ (self, file_path, doc_separator = '\n\n-----\n\n'):
+
+        self.file_path = file_path
+        self.doc_separator = doc_separator
+        self.opened_file = None
+        self.mapped_file = None
         
-    if previous_metadata_database_path is not None:
-        # Read it as a string and append the new texts to it:
-        with open (previous_metadata_database_path, 'r') as f:
-            previous_metadata_db = f.read()
-            
-        # Separate documents into a list
-        previous_metadata_db_texts = previous_metadata_db.split(doc_separator)
-        # Combine the lists:
-        metadata = previous_metadata_db_texts + metadata
+        self = self.refresh()
+
+
+    def refresh(self):
         
-    # Concatenate all metadata in a single text
-    metadata_text = doc_separator.join([str(meta) for meta in metadata])
+        # Update the index and map the file again (e.g., after new documents were appended to it):
+        import os
+        import mmap
+
+        self = self.close()
+        self.offsets = build_txt_db_index(self.file_path, self.doc_separator)
+
+        if (os.path.getsize(self.file_path) > 0):
+            # An empty file cannot be memory-mapped.
+            self.opened_file = open(self.file_path, 'rb')
+            self.mapped_file = mmap.mmap(self.opened_file.fileno(), 0, access = mmap.ACCESS_READ)
         
+        return self
+
+
+    def __len__ (self):
         
-    if previous_filenames_database_path is not None:
-        # Read it as a string and append the new texts to it:
-        with open (previous_filenames_database_path, 'r') as f:
-            filenames_db = f.read()
-            
-        # Separate documents into a list
-        filenames_db_texts = filenames_db.split(doc_separator)
-        # Combine the lists:
-        file_names = filenames_db_texts + file_names
-   
-    # Concatenate all file names:
-    files = doc_separator.join(file_names)
-
-    # Save outputs
+        return len(self.offsets)
+
+
+    def get_document(self, document_index):
+
+        import os
+
+        # Negative indices are counted from the end, as in lists:
+        start, stop = self.offsets[document_index]
+        document = self.mapped_file[start:stop].decode('utf-8')
+
+        if (os.linesep != '\n'):
+            # Convert the line breaks back, as the text mode does when reading:
+            document = document.replace(os.linesep, '\n')
         
-    with open(output_meta_path, 'w') as f:
-        f.write(metadata_text)
+        return document
+
 
-    with open(output_text_path, 'w') as f:
-        f.write(all_texts)
+    def get_documents(self, document_indices):
+
+        return [self.get_document(document_index) for document_index in document_indices]
+
+
+    def __getitem__ (self, document_index):
+
+        if isinstance(document_index, slice):
+            return self.get_documents(range(*document_index.indices(len(self))))
+        
+        return self.get_document(document_index)
+
+
+    def __iter__ (self):
+
+        for document_index in range(len(self)):
+            yield self.get_document(document_index)
+
+
+    def close(self):
+
+        if (self.mapped_file is not None):
+            self.mapped_file.close()
+            self.mapped_file = None
         
-    with open('file_names.txt', 'w') as f:
-        f.write(files)
+        if (self.opened_file is not None):
+            self.opened_file.close()
+            self.opened_file = None
+        
+        return self
+
+
+    def __enter__ (self):
+
+        return self
+
+
+    def __exit__ (self, exc_type, exc_value, traceback):
+
+        self.close()
+
+
+def stream_txt_database (file_path, doc_separator = '\n\n-----\n\n'):
     
+    """
+    Generator: yield the documents of a txt database one at a time, so databases much larger than the memory can be processed.
+    e.g.: for document in stream_txt_database('extracted_text.txt'): ...
     
-    return texts, metadata, file_names
+    Parameters:
+    ----------
+    file_path : str
+        file path to be processed
 
+    doc_separator : str
+        The string that will be used to separate different texts when all documents are saved in a same string or txt.
 
-def read_txt_database (file_path, split_strings = True, doc_separator = '\n\n-----\n\n'):
+    Returns:
+    
+        Generator of strings, each one being a document of the database.
+
+    """
+
+    with IndexedTxtDatabase(file_path, doc_separator) as db:
+        for document in db:
+            yield document
+
+
+def read_txt_database (file_path, split_strings = True, doc_separator = '\n\n-----\n\n', document_indices = None):
     
     """
     Read a text database saved as a single txt file. The different files in the database may be returned as different
@@ -230,11 +691,26 @@ def read_txt_database (file_path, split_strings = True, doc_separator = '\n\n---
     doc_separator : str
         The string that will be used to separate different texts when all documents are saved in a same string or txt.
 
+    document_indices : int, list of ints or None, optional (default = None)
+        If provided, only the documents with these indices (starting from 0) are read, through the offsets index 
+        of the database (check build_txt_db_index and IndexedTxtDatabase), instead of reading the whole file.
+        split_strings is ignored in this case.
+
     Returns:
     
         texts: list of strings containing the read texts. If split_strings = False, the list will contain a single element
 
     """    
+
+    if document_indices is not None:
+        # Random access: read only the requested documents.
+        if isinstance(document_indices, (int, np.integer)):
+            document_indices = [document_indices]
+        
+        with IndexedTxtDatabase(file_path, doc_separator) as db:
+            texts = db.get_documents(document_indices)
+        
+        return texts
     
     # Read the database:
     with open (file_path, 'r') as f:
@@ -251,7 +727,7 @@ def read_txt_database (file_path, split_strings = True, doc_separator = '\n\n---
     return texts
 
 
-def create_txt_db (file_path, strings_to_save, doc_separator = '\n\n-----\n\n'):
+def create_txt_db (file_path, strings_to_save, doc_separator = '\n\n-----\n\n', append = False, create_index = False):
     
     """
     Create a txt database from the provided strings. 
@@ -268,6 +744,14 @@ def create_txt_db (file_path, strings_to_save, doc_separator = '\n\n-----\n\n'):
     doc_separator : str
         The string that will be used to separate different texts when all documents are saved in a same string or txt.
 
+    append : bool, optional (default = False)
+        If True, the strings are appended to the end of an existing database (separated from its documents by 
+        doc_separator), instead of rewriting the whole file.
+
+    create_index : bool, optional (default = False)
+        If True, the offsets index of the database (file_path + '.idx.npy') is created or updated, allowing the 
+        random access to the documents (check build_txt_db_index). If an index already exists, it is always updated.
+
     Returns:
     
         None (only the file is exported)
@@ -282,12 +766,79 @@ def create_txt_db (file_path, strings_to_save, doc_separator = '\n\n-----\n\n'):
     else:
         files = strings_to_save
 
-    # Save outputs
-    with open(file_path, 'w') as f:
-        f.write(files)
+    import os
+
+    if append:
+        # If the database already has documents, separate them from the new ones:
+        if (os.path.exists(file_path) and (os.path.getsize(file_path) > 0)):
+            files = doc_separator + files
+        
+        with open(file_path, 'a') as f:
+            f.write(files)
+    
+    else:
+        # Save outputs
+        with open(file_path, 'w') as f:
+            f.write(files)
+    
+    if (create_index or os.path.exists(file_path + '.idx.npy')):
+        # When appending, only the new bytes are scanned. A rewritten file is scanned again:
+        build_txt_db_index(file_path, doc_separator, rebuild = (not append))
+
+
+def convert_string_to_dict(input_string: str) -> dict:
+    """
+    Converts a string representation of a Python dictionary literal
+    into an actual Python dictionary.
+    Strings in JSON format (e.g., lines of a JSON-lines metadata database) are parsed by the faster json parser.
+
+    Args:
+        input_string: The string containing the dictionary literal.
+
+    Returns:
+        A Python dictionary with the exact same structure as the input string.
+
+    Raises:
+        ValueError: If the input string is not a valid Python dictionary literal.
+    """
+    # Subfunction created with Gemini's support:
+    import ast
+    import json
+
+    result_dict = None
+    
+    if (input_string.lstrip()[:2] == '{"'):
+        # Possible JSON object: json.loads is several times faster than ast.literal_eval.
+        try:
+            result_dict = json.loads(input_string)
+        except ValueError:
+            # Not JSON (e.g., a Python literal with True, None or single-quoted strings):
+            result_dict = None
+    
+    if result_dict is None:
+        try:
+            # Use ast.literal_eval to safely parse the string as a Python literal
+            # This is safer than eval() as it only evaluates literals and not arbitrary code.
+            result_dict = ast.literal_eval(input_string)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError(f"Failed to parse string as dictionary: {e}")
+    
+    if isinstance(result_dict, dict):
+        return result_dict
+    else:
+        raise ValueError("The provided string does not represent a dictionary.")
+
+
+def convert_str_list_to_dicts(strings_list):
+    """
+    Converts a batch (list) of strings representing Python dictionaries with convert_string_to_dict.
+    It is defined at module level so that the batches can be sent to the processes of a process pool.
+    """
+
+    return [convert_string_to_dict(input_string) for input_string in strings_list]
 
 
-def convert_str_to_dicts (text_to_convert):
+def convert_str_to_dicts (text_to_convert, max_workers = None, batch_size = 10000):
     """
     If the text being converted is already structured as a dictionary, use this function to automatically return Python dicts, instead of strings.
     This is particularly useful for processing metadata text databases.
@@ -297,6 +848,15 @@ def convert_str_to_dicts (text_to_convert):
     text_to_convert : str or list of strs
         texts to be converted to dictionaries
 
+    max_workers : int or None, optional (default = None)
+        If None or 1, the strings are parsed in the current process. If an integer higher than 1 is provided, the strings
+        are split into batches of batch_size strings, parsed in parallel by a pool of max_workers processes (parsing is
+        CPU-bound, so processes are used instead of threads). The order of the returned dicts is the order of the strings.
+
+    batch_size : int, optional (default = 10000)
+        Number of strings sent to each process at a time, when max_workers > 1. Large batches reduce the communication
+        between processes.
+
     Returns:
         returned_dicts: list of dictionaries retrieved from the string.
         The Python dictionar with the exact same structure as the input string.
@@ -305,40 +865,119 @@ def convert_str_to_dicts (text_to_convert):
         ValueError: If the input string is not a valid Python dictionary literal.
     """
 
-    # Subfunction created with Gemini's support:
-    import ast
-
-    def convert_string_to_dict(input_string: str) -> dict:
-        """
-        Converts a string representation of a Python dictionary literal
-        into an actual Python dictionary.
-
-        Args:
-            input_string: The string containing the dictionary literal.
-
-        Returns:
-            A Python dictionary with the exact same structure as the input string.
-
-        Raises:
-            ValueError: If the input string is not a valid Python dictionary literal.
-        """
-        try:
-            # Use ast.literal_eval to safely parse the string as a Python literal
-            # This is safer than eval() as it only evaluates literals and not arbitrary code.
-            result_dict = ast.literal_eval(input_string)
-            if isinstance(result_dict, dict):
-                return result_dict
-            else:
-                raise ValueError("The provided string does not represent a dictionary.")
-        except (ValueError, SyntaxError) as e:
-            raise ValueError(f"Failed to parse string as dictionary: {e}")
+    from concurrent.futures import ProcessPoolExecutor
     
     if type(text_to_convert) == str:
         returned_dicts = [convert_string_to_dict(text_to_convert)]
     
     else:
-        returned_dicts = [convert_string_to_dict(text) for text in text_to_convert]
+        text_to_convert = list(text_to_convert)
+        
+        if ((max_workers is not None) and (max_workers > 1) and (len(text_to_convert) > batch_size)):
+            
+            batches = [text_to_convert[i:(i + batch_size)] for i in range(0, len(text_to_convert), batch_size)]
+            returned_dicts = []
+            
+            with ProcessPoolExecutor(max_workers = max_workers) as executor:
+                # executor.map returns the batches in the same order of the inputs:
+                for parsed_batch in executor.map(convert_str_list_to_dicts, batches):
+                    returned_dicts.extend(parsed_batch)
+        
+        else:
+            returned_dicts = convert_str_list_to_dicts(text_to_convert)
         
         
     return returned_dicts
 
+
+def create_jsonl_metadata_db (file_path, metadata, append = False):
+    """
+    Save metadata as a JSON-lines database: each line of the file is the JSON of a dictionary (or value).
+    Differently from the txt databases, the metadata is read back by read_jsonl_metadata_db in a single pass of the
+    json parser, with no need of converting strings to dicts.
+    
+    Parameters:
+    ----------
+    file_path : str
+        Path of the database. The extension '.jsonl' is recommended.
+    
+    metadata: dict or list of dicts
+        Metadata to save. Values that cannot be represented in JSON (e.g., timestamps) are saved as strings.
+
+    append : bool, optional (default = False)
+        If True, the metadata is appended to the end of an existing database, instead of rewriting the file.
+
+    Returns:
+    
+        None (only the file is exported)
+
+    """
+
+    import json
+
+    if isinstance(metadata, dict):
+        metadata = [metadata]
+    
+    # default = str converts the values that are not JSON serializable to strings:
+    lines = ''.join([(json.dumps(meta, default = str) + '\n') for meta in metadata])
+
+    with open(file_path, ('a' if append else 'w')) as f:
+        f.write(lines)
+
+
+def read_jsonl_metadata_db (file_path):
+    """
+    Read a JSON-lines metadata database created by create_jsonl_metadata_db (or by text_extraction, when output_meta_path
+    ends with '.jsonl').
+    
+    Parameters:
+    ----------
+    file_path : str
+        Path of the database.
+
+    Returns:
+        
+        metadata: list of dictionaries, one for each line of the file.
+
+    """
+
+    import json
+
+    with open(file_path, 'r') as f:
+        lines = [line for line in f.read().split('\n') if (line.strip() != '')]
+    
+    # Join the lines into a single JSON array, so the whole database is parsed by a single call to the json parser:
+    metadata = json.loads('[' + ','.join(lines) + ']')
+
+    return metadata
+
+
+def read_metadata_database (file_path, doc_separator = '\n\n-----\n\n', max_workers = None):
+    """
+    Read a metadata database as a list of dictionaries, whatever its format: JSON-lines databases (files with the 
+    '.jsonl' extension) are read by read_jsonl_metadata_db; txt databases are split with read_txt_database and
+    converted by convert_str_to_dicts.
+    
+    Parameters:
+    ----------
+    file_path : str
+        Path of the database.
+    
+    doc_separator : str
+        The string that separates the different entries of a txt database.
+
+    max_workers : int or None, optional (default = None)
+        Number of processes used for converting the entries of a txt database (check convert_str_to_dicts).
+
+    Returns:
+        
+        metadata: list of dictionaries.
+
+    """
+
+    import os
+
+    if (os.path.splitext(file_path)[1].lower() == '.jsonl'):
+        return read_jsonl_metadata_db(file_path)
+    
+    return convert_str_to_dicts(read_txt_database(file_path, split_strings = True, doc_separator = doc_separator), max_workers = max_workers)
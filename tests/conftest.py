@@ -0,0 +1,149 @@
+"""Make the idsw.datafetch modules importable by the tests.
+
+Importing the idsw package also imports idsw.modelling, which requires tensorflow and the other
+modelling dependencies. When they are not installed, the idsw and idsw.datafetch packages are
+registered without running their __init__ imports, so the datafetch modules can still be tested.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import types
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+REPOSITORY_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_PATH = os.path.join(REPOSITORY_PATH, 'idsw')
+
+if REPOSITORY_PATH not in sys.path:
+    sys.path.insert(0, REPOSITORY_PATH)
+
+
+def register_lightweight_package ():
+
+    # Remove the modules partially imported by the failed import:
+    for module_name in [module_name for module_name in sys.modules if ((module_name == 'idsw') or module_name.startswith('idsw.'))]:
+        del sys.modules[module_name]
+
+    # idsw: only the classes shared by all the modules (InvalidInputsError, ControlVars), defined
+    # before the imports of the subpackages:
+    with open(os.path.join(PACKAGE_PATH, '__init__.py'), 'r') as opened_file:
+        package_source = opened_file.read().split('from .datafetch import *')[0]
+
+    idsw = types.ModuleType('idsw')
+    idsw.__path__ = [PACKAGE_PATH]
+    idsw.__file__ = os.path.join(PACKAGE_PATH, '__init__.py')
+    sys.modules['idsw'] = idsw
+    exec(compile(package_source, idsw.__file__, 'exec'), idsw.__dict__)
+
+    for subpackage in ['datafetch', 'modelling']:
+        module = types.ModuleType(f'idsw.{subpackage}')
+        module.__path__ = [os.path.join(PACKAGE_PATH, subpackage)]
+        sys.modules[f'idsw.{subpackage}'] = module
+        setattr(idsw, subpackage, module)
+
+    # idsw.datafetch.pipes imports AnomalyDetector from idsw.modelling.core (tensorflow):
+    modelling_core = types.ModuleType('idsw.modelling.core')
+
+    class AnomalyDetector:
+        def __init__ (self, *args, **kwargs):
+            raise ImportError("idsw.modelling is not available: tensorflow is not installed.")
+
+    modelling_core.AnomalyDetector = AnomalyDetector
+    sys.modules['idsw.modelling.core'] = modelling_core
+
+
+try:
+    import idsw
+
+except ImportError:
+    register_lightweight_package()
+
+
+class IP21StubHandler (BaseHTTPRequestHandler):
+    """
+    Minimal IP21 REST API: returns one sample per second of history, between St and Et, limited to X rows.
+    The server attributes control failures (failures_to_send responses with status 503) and delays.
+    """
+
+    # Keep the connections alive, as the IP21 server:
+    protocol_version = 'HTTP/1.1'
+
+    def log_message (self, *args):
+        pass
+
+    def build_response (self, query):
+
+        server = self.server
+        query = urllib.parse.unquote(query)
+        start = int(re.search('<St>(-?\\d+)</St>', query).group(1))
+        stop = int(re.search('<Et>(-?\\d+)</Et>', query).group(1))
+        max_rows = int(re.search('<X>(\\d+)</X>', query).group(1)) if ('<X>' in query) else 100000
+        tag = re.search('CDATA\\[(.*?)\\]', query).group(1)
+
+        with server.lock:
+            server.requests.append({'tag': tag, 'start': start, 'stop': stop, 'client': self.client_address})
+            fail = (server.failures_to_send > 0)
+            if fail:
+                server.failures_to_send = server.failures_to_send - 1
+
+        time.sleep(server.delay_seconds)
+
+        if fail:
+            return 503, b'Service Unavailable'
+
+        # Samples registered at each PERIOD ms, from history_start to history_stop:
+        first = max(start, server.history_start)
+        first = server.history_start + (-((server.history_start - first) // server.period)) * server.period
+        timestamps = list(range(first, min(stop, server.history_stop) + 1, server.period))[:max_rows]
+
+        if (len(timestamps) == 0):
+            body = {"data": [{"r": "D", "n": tag, "samples": [{"er": 1, "es": "No data"}]}]}
+        else:
+            body = {"data": [{"r": "D", "n": tag, "l": 0, "samples": [{"t": t, "v": str(((t - server.history_start) // server.period) % 97), "s": 8} for t in timestamps]}]}
+
+        return 200, json.dumps(body).encode()
+
+    def send_body (self, status, body):
+
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET (self):
+        self.send_body(*self.build_response(self.path.split('?', 1)[1]))
+
+    def do_POST (self):
+        length = int(self.headers['Content-Length'])
+        self.send_body(*self.build_response(self.rfile.read(length).decode()))
+
+
+@pytest.fixture
+def ip21_server ():
+    """IP21 stub server listening on a free local port. Its address is server.address."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), IP21StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures_to_send = 0
+    server.delay_seconds = 0
+    server.period = 1000
+    # IP21 timescale (ms) of 2022-06-18 00:00:00 and 2022-06-18 12:00:00:
+    server.history_start = 1655517600000
+    server.history_stop = 1655560800000
+    server.address = f"127.0.0.1:{server.server_address[1]}"
+
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
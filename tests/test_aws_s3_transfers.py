@@ -0,0 +1,234 @@
+import os
+import sys
+import types
+import hashlib
+import threading
+
+import pytest
+
+from idsw.datafetch import core
+
+MB = 1024 * 1024
+
+
+class FakeClientError (Exception):
+    """botocore.exceptions.ClientError: the error code returned by S3 is in response."""
+
+    def __init__ (self, code):
+        super().__init__(f"An error occurred ({code})")
+        self.response = {'Error': {'Code': code}}
+
+
+def compute_etag (data, chunksize = None):
+    if (chunksize is None):
+        return '"' + hashlib.md5(data).hexdigest() + '"'
+    digests = b''.join(hashlib.md5(data[i:(i + chunksize)]).digest() for i in range(0, len(data), chunksize))
+    return '"' + hashlib.md5(digests).hexdigest() + f'-{-(-len(data) // chunksize)}"'
+
+
+class FakeBody:
+
+    def __init__ (self, data):
+        self.data = data
+
+    def read (self):
+        return self.data
+
+    def iter_chunks (self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:(i + chunk_size)]
+
+
+class FakeS3:
+    """Bucket objects (key: (data, ETag)), with the low-level client and the resource listing used by AWSS3Connection."""
+
+    def __init__ (self):
+        self.objects = {}
+        self.ranges = []
+        self.lock = threading.Lock()
+        # get_object fails from this call on (network interruption), when not None:
+        self.fail_from_call = None
+        self.error_code = None
+
+    def put (self, key, data, chunksize = None):
+        self.objects[key] = (data, compute_etag(data, chunksize))
+
+    # Low-level client (boto3.client('s3')):
+    def get_object (self, Bucket, Key, Range, IfMatch = None):
+        data, etag = self.objects[Key]
+
+        with self.lock:
+            self.ranges.append((Key, Range))
+            call_number = len(self.ranges)
+
+        if ((IfMatch is not None) and (IfMatch != etag.strip('"'))):
+            raise FakeClientError('PreconditionFailed')
+        if (self.error_code is not None):
+            raise FakeClientError(self.error_code)
+        if ((self.fail_from_call is not None) and (call_number >= self.fail_from_call)):
+            raise ConnectionError("Connection reset by peer")
+
+        start, stop = Range[len('bytes='):].split('-')
+        stop = int(stop) if (stop != '') else (len(data) - 1)
+        return {'Body': FakeBody(data[int(start):(stop + 1)])}
+
+    def head_object (self, Bucket, Key):
+        if (Key not in self.objects):
+            raise FakeClientError('404')
+        data, etag = self.objects[Key]
+        return {'ContentLength': len(data), 'ETag': etag}
+
+    def upload_file (self, Filename, Bucket, Key, Config):
+        with open(Filename, 'rb') as opened_file:
+            self.put(Key, opened_file.read())
+
+    # Resource listing (s3_bucket.objects):
+    def listed_objects (self, prefix = ''):
+        return [types.SimpleNamespace(key = key, size = len(data), e_tag = etag) for key, (data, etag) in self.objects.items() if key.startswith(prefix)]
+
+    def all (self):
+        return self.listed_objects()
+
+    def filter (self, Prefix):
+        return self.listed_objects(Prefix)
+
+
+@pytest.fixture
+def fake_s3 (monkeypatch, tmp_path):
+    fake_s3 = FakeS3()
+    boto3 = types.ModuleType('boto3')
+    boto3.client = lambda *args, **kwargs: fake_s3
+    transfer = types.ModuleType('boto3.s3.transfer')
+    transfer.TransferConfig = lambda **kwargs: kwargs
+    botocore_config = types.ModuleType('botocore.config')
+    botocore_config.Config = lambda **kwargs: kwargs
+    botocore_exceptions = types.ModuleType('botocore.exceptions')
+    botocore_exceptions.ClientError = FakeClientError
+
+    for module_name, module in [('boto3', boto3), ('boto3.s3', types.ModuleType('boto3.s3')), ('boto3.s3.transfer', transfer), ('botocore', types.ModuleType('botocore')), ('botocore.config', botocore_config), ('botocore.exceptions', botocore_exceptions)]:
+        monkeypatch.setitem(sys.modules, module_name, module)
+
+    # The workspace paths are relative to the notebook directory:
+    monkeypatch.chdir(tmp_path)
+    return fake_s3
+
+
+def build_connection (fake_s3, prefix = None):
+    connection = core.AWSS3Connection('workspace', 'bucket', prefix)
+    connection.ACCESS_KEY, connection.SECRET_KEY = 'key', 'secret'
+    connection = connection.get_bucket_info()
+    connection.s3_bucket = types.SimpleNamespace(objects = fake_s3)
+    return connection
+
+
+def fetch (connection):
+    return connection.fetch_s3_files_pipeline(max_workers = 4, max_concurrency = 1, multipart_threshold_mb = 1, multipart_chunksize_mb = 1)
+
+
+def read_file (path):
+    with open(path, 'rb') as opened_file:
+        return opened_file.read()
+
+
+def test_unchanged_files_are_not_downloaded_again (fake_s3):
+    for i in range(5):
+        fake_s3.put(f'data/file_{i}.csv', os.urandom(1000 + i))
+    fake_s3.put('data/large.bin', os.urandom(2 * MB + 10), chunksize = MB)
+    connection = fetch(build_connection(fake_s3, 'data/'))
+    assert len(connection.copied_files) == 6
+
+    fake_s3.ranges = []
+    fake_s3.put('data/file_0.csv', os.urandom(1000))
+    connection = fetch(connection.map_bucket_contents())
+
+    # Only the object modified in the bucket (same size, different ETag) is downloaded:
+    assert connection.copied_files == ['file_0.csv']
+    assert len(connection.skipped_files) == 5
+    assert [key for key, _ in fake_s3.ranges] == ['data/file_0.csv']
+    assert read_file('workspace/file_0.csv') == fake_s3.objects['data/file_0.csv'][0]
+
+
+def test_interrupted_multipart_download_is_resumed (fake_s3):
+    data = os.urandom(3 * MB + 512)
+    fake_s3.put('large.bin', data, chunksize = MB)
+    fake_s3.fail_from_call = 3
+    connection = fetch(build_connection(fake_s3))
+
+    # The two first parts were stored, and the failure was reported for the file:
+    assert connection.failed_files == ['large.bin']
+    assert not os.path.exists('workspace/large.bin')
+    with open('workspace/large.bin.part.progress', 'r') as progress_file:
+        assert progress_file.read().split() == [compute_etag(data, MB).strip('"'), '0', '1']
+
+    fake_s3.fail_from_call, fake_s3.ranges = None, []
+    connection = fetch(connection)
+
+    assert sorted(fake_s3.ranges) == [('large.bin', f'bytes={2 * MB}-{3 * MB - 1}'), ('large.bin', f'bytes={3 * MB}-{3 * MB + 511}')]
+    assert read_file('workspace/large.bin') == data
+    assert sorted(os.listdir('workspace')) == ['large.bin']
+
+
+def test_single_request_download_resumes_from_the_part_file (fake_s3):
+    data = os.urandom(5000)
+    fake_s3.put('small.csv', data)
+    os.makedirs('workspace')
+    with open('workspace/small.csv.part', 'wb') as part_file:
+        part_file.write(data[:1234])
+    with open('workspace/small.csv.part.progress', 'w') as progress_file:
+        progress_file.write(compute_etag(data).strip('"') + '\n')
+
+    fetch(build_connection(fake_s3))
+
+    assert fake_s3.ranges == [('small.csv', 'bytes=1234-')]
+    assert read_file('workspace/small.csv') == data
+
+
+def test_objects_modified_during_the_copy_are_reported (fake_s3, capsys):
+    fake_s3.put('a.csv', os.urandom(100))
+    fake_s3.put('b.csv', os.urandom(100))
+    connection = build_connection(fake_s3).map_bucket_contents()
+    # The object changes after the listing: IfMatch makes S3 refuse the download.
+    fake_s3.put('a.csv', os.urandom(100))
+
+    connection = connection.set_transfer_config().copy_bucket_files()
+    output = capsys.readouterr().out
+
+    assert connection.failed_files == ['a.csv']
+    assert connection.copied_files == ['b.csv']
+    assert "'a.csv' could not be copied" in output
+    assert 'PreconditionFailed' in output
+    assert 'IAM' not in output
+
+
+def test_permission_errors_show_the_iam_guide (fake_s3, capsys):
+    fake_s3.put('a.csv', os.urandom(100))
+    fake_s3.error_code = 'AccessDenied'
+
+    fetch(build_connection(fake_s3))
+
+    assert 'IAM' in capsys.readouterr().out
+
+
+def test_objects_sharing_a_file_name_keep_their_key_paths (fake_s3):
+    for key in ['2023/x.csv', '2024/x.csv', '2024/y.csv']:
+        fake_s3.put(key, os.urandom(100))
+
+    connection = fetch(build_connection(fake_s3))
+
+    assert sorted(connection.copied_files) == [os.path.join('2023', 'x.csv'), os.path.join('2024', 'x.csv'), 'y.csv']
+    for key, file_path in [('2023/x.csv', 'workspace/2023/x.csv'), ('2024/x.csv', 'workspace/2024/x.csv'), ('2024/y.csv', 'workspace/y.csv')]:
+        assert read_file(file_path) == fake_s3.objects[key][0]
+
+
+def test_export_failures_are_reported_per_file (fake_s3, capsys):
+    os.makedirs('workspace')
+    with open('workspace/a.csv', 'wb') as opened_file:
+        opened_file.write(b'a,b\n1,2\n')
+
+    connection = build_connection(fake_s3, 'exports/')
+    connection = connection.export_to_s3_pipeline(['a.csv', 'missing.csv'], 'workspace')
+
+    assert connection.exported_files == ['a.csv']
+    assert connection.failed_files == ['missing.csv']
+    assert fake_s3.objects['exports/a.csv'][0] == b'a,b\n1,2\n'
+    assert 'IAM' not in capsys.readouterr().out
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from idsw import ControlVars
+from idsw.datafetch import pipes
+
+TAGS = [f'TAG-{i}' for i in range(10)]
+
+
+@pytest.fixture(autouse = True)
+def silence_results ():
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+@pytest.fixture
+def csv_path (tmp_path):
+    # Each chunk of 5 rows brings tags that were not in the previous chunks:
+    df = pd.DataFrame({'tag': [TAGS[i // 2] for i in range(20)], 'value': [float(i) for i in range(20)]})
+    df.to_csv(tmp_path / 'tags.csv', index = False)
+    return tmp_path
+
+
+@pytest.mark.parametrize("declaration", [{'dtypes': {'tag': 'category'}}, {'schema_list': [{'column_name': 'tag', 'column_type': 'category'}]}])
+def test_new_categories_of_later_chunks_are_kept (csv_path, capsys, declaration):
+    chunks = list(pipes.stream_csv_chunks(str(csv_path), 'tags.csv', chunksize = 5, **declaration))
+
+    assert len(chunks) == 4
+    assert all(isinstance(df_chunk['tag'].dtype, pd.CategoricalDtype) for df_chunk in chunks)
+    assert [tag for df_chunk in chunks for tag in df_chunk['tag']] == [TAGS[i // 2] for i in range(20)]
+    assert 'could not be converted' not in capsys.readouterr().out
+
+
+def test_processed_chunks_merge_the_categories (csv_path):
+    dataset = pipes.process_csv_in_chunks(str(csv_path), 'tags.csv', chunk_transformations = [lambda df: df[df['value'] >= 0]], chunksize = 5, dtypes = {'tag': 'category'})
+
+    assert isinstance(dataset['tag'].dtype, pd.CategoricalDtype)
+    assert sorted(dataset['tag'].cat.categories) == TAGS
+    assert list(dataset['tag']) == [TAGS[i // 2] for i in range(20)]
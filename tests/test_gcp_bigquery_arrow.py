@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from idsw import ControlVars, InvalidInputsError
+from idsw.datafetch import core
+
+TABLE = pd.DataFrame({
+    'tag': ['A', 'B', None, 'D'],
+    'value': [1.5, np.nan, -2.25, 1e10],
+    'count': [1, 2, 3, 4],
+    'timestamp': pd.to_datetime(['2024-01-01 00:00:00.0', '2024-01-01 00:00:01.5', '2024-06-30 23:59:59.0', '2025-02-28 12:00:00.0'], utc = True)
+})
+
+
+class FakeRowIterator:
+    """Rows returned by a query job or by the listing of a table (google.cloud.bigquery RowIterator)."""
+
+    def __init__ (self, df):
+        self.df = df
+
+    def to_arrow (self, bqstorage_client = None, create_bqstorage_client = True):
+        return pa.Table.from_pandas(self.df, preserve_index = False)
+
+    def to_arrow_iterable (self, bqstorage_client = None):
+        return iter(self.to_arrow().to_batches(max_chunksize = 2))
+
+
+class FakeQueryJob:
+
+    def __init__ (self, df):
+        self.df = df
+
+    def result (self):
+        return FakeRowIterator(self.df)
+
+    def to_dataframe (self):
+        # Legacy path: rows converted by the client library.
+        return self.df.copy()
+
+
+class FakeBigQueryClient:
+
+    def __init__ (self, df):
+        self.df = df
+        self.queries = []
+        self.listed_tables = []
+
+    def query (self, query):
+        self.queries.append(query)
+        return FakeQueryJob(self.df)
+
+    def list_rows (self, table_id):
+        self.listed_tables.append(table_id)
+        return FakeRowIterator(self.df)
+
+
+@pytest.fixture
+def connector ():
+    # The constructor imports the GCP packages and asks for the credentials: use a connector
+    # with a fake client instead.
+    connector = core.GCPBigQueryConnection.__new__(core.GCPBigQueryConnection)
+    connector.project = 'project'
+    connector.dataset = 'dataset'
+    connector.query_counter = 0
+    connector.bqclient = FakeBigQueryClient(TABLE)
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield connector
+    ControlVars.show_results = show_results
+
+
+def test_arrow_query_returns_the_legacy_dataframe (connector):
+    legacy = connector.run_sql_query("SELECT * FROM t")
+    arrow = connector.run_sql_query("SELECT * FROM t", use_arrow_transfer = True)
+    pd.testing.assert_frame_equal(arrow, legacy)
+
+
+def test_arrow_full_table_reads_the_table_without_a_query (connector):
+    legacy = connector.get_full_table('t')
+    arrow = connector.get_full_table('t', use_arrow_transfer = True)
+    pd.testing.assert_frame_equal(arrow, legacy)
+    # Only the legacy path ran a SELECT * job:
+    assert len(connector.bqclient.queries) == 1
+    assert connector.bqclient.listed_tables == ['project.dataset.t']
+
+
+def test_arrow_backed_dtypes_keep_the_values (connector):
+    arrow = connector.run_sql_query("SELECT * FROM t", use_arrow_transfer = True, arrow_backed_dtypes = True)
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in arrow.dtypes)
+    # The Arrow memory is kept as returned by BigQuery:
+    assert pa.Table.from_pandas(arrow, preserve_index = False).equals(pa.Table.from_pandas(TABLE, preserve_index = False))
+
+
+def test_record_batches_rebuild_the_table (connector):
+    record_batches = list(connector.stream_record_batches(table = 't'))
+    assert len(record_batches) == 2
+    streamed = pa.Table.from_batches(record_batches).to_pandas()
+    pd.testing.assert_frame_equal(streamed, connector.get_full_table('t'))
+
+
+def test_record_batches_require_a_query_or_table (connector):
+    with pytest.raises(InvalidInputsError):
+        list(connector.stream_record_batches())
+
+
+def test_merge_with_nothing_to_merge_raises (connector):
+    with pytest.raises(InvalidInputsError):
+        connector.merge_dataframe_on_table('t', TABLE[['tag']], key_columns = 'tag', update_columns = [], insert_new_rows = False)
+    assert connector.bqclient.queries == []
@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from idsw import ControlVars
+from idsw.datafetch import core
+
+START_TIME = {'year': 2022, 'month': 6, 'day': 18, 'hour': 0, 'minute': 0, 'second': 0}
+STOP_TIME = {'year': 2022, 'month': 6, 'day': 18, 'hour': 1, 'minute': 0, 'second': 0}
+
+
+@pytest.fixture(autouse = True)
+def silence_results ():
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+@pytest.fixture
+def cache (tmp_path):
+    cache = core.IP21HistoryCache(cache_path = str(tmp_path / 'ip21_cache.db'))
+    yield cache
+    cache.close()
+
+
+def extract (server, cache, start_time = START_TIME, stop_time = STOP_TIME, tag = 'TAG-A'):
+    extractor = core.IP21Extractor(None)
+    extractor = extractor.get_credentials(server.address, 'localhost', 'user', 'password')
+    extractor = extractor.create_session(max_retries = 0)
+    returned = extractor.concurrent_extraction([{'tag': tag, 'actual_name': None}], start_time, stop_time, max_concurrent_requests = 2, time_windows_per_tag = 2, cache = cache)
+    return returned[0]['dataset']
+
+
+def stored_intervals (cache):
+    return cache.connection.execute("SELECT start, stop FROM intervals").fetchall()
+
+
+def test_retrieved_windows_are_not_requested_again (ip21_server, cache):
+    first = extract(ip21_server, cache)
+    number_of_requests = len(ip21_server.requests)
+    second = extract(ip21_server, cache)
+
+    assert len(first) == 3601
+    assert second.equals(first)
+    assert len(ip21_server.requests) == number_of_requests
+    assert len(stored_intervals(cache)) == 1
+
+
+def test_no_data_responses_are_not_stored (ip21_server, cache):
+    # No history was registered in 2021:
+    start_time = dict(START_TIME, year = 2021)
+    stop_time = dict(STOP_TIME, year = 2021)
+
+    assert extract(ip21_server, cache, start_time, stop_time) is None
+    number_of_requests = len(ip21_server.requests)
+    extract(ip21_server, cache, start_time, stop_time)
+
+    assert stored_intervals(cache) == []
+    # The windows are requested again:
+    assert len(ip21_server.requests) == 2 * number_of_requests
+
+
+def test_failed_responses_are_not_stored (ip21_server, cache):
+    ip21_server.failures_to_send = 100
+    assert extract(ip21_server, cache) is None
+    assert stored_intervals(cache) == []
+
+    ip21_server.failures_to_send = 0
+    assert len(extract(ip21_server, cache)) == 3601
+
+
+def test_future_windows_are_not_stored (ip21_server, cache):
+    tomorrow = pd.Timestamp.now() + pd.Timedelta(1, 'D')
+    start_time = {'year': tomorrow.year, 'month': tomorrow.month, 'day': tomorrow.day, 'hour': 0, 'minute': 0, 'second': 0}
+    stop_time = dict(start_time, hour = 6)
+
+    extract(ip21_server, cache, start_time, stop_time)
+
+    assert stored_intervals(cache) == []
+
+
+def test_inverted_intervals_are_ignored (cache):
+    tag_key = cache.get_tag_key('server', 'localhost', 'TAG-A')
+    cache = cache.store_samples(tag_key, 2000, 1000, None, None)
+    assert stored_intervals(cache) == []
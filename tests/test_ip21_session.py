@@ -0,0 +1,106 @@
+import copy
+import threading
+
+import pytest
+import requests
+
+from idsw import ControlVars
+from idsw.datafetch import core
+
+START_TIME = {'year': 2022, 'month': 6, 'day': 18, 'hour': 0, 'minute': 0, 'second': 0}
+STOP_TIME = {'year': 2022, 'month': 6, 'day': 18, 'hour': 2, 'minute': 0, 'second': 0}
+
+
+@pytest.fixture(autouse = True)
+def silence_results ():
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+def build_extractor (server, tag = 'TAG-A'):
+    extractor = core.IP21Extractor(None)
+    extractor = extractor.get_credentials(server.address, 'localhost', 'user', 'password')
+    extractor = extractor.set_query_parameters(tag, None, START_TIME, STOP_TIME)
+    extractor = extractor.set_extracted_time_window()
+    return extractor.get_rest_api_url()
+
+
+def test_calls_reuse_the_session_and_its_connection (ip21_server):
+    extractor = build_extractor(ip21_server)
+    extractor = extractor.create_session(max_retries = 0)
+
+    for _ in range(5):
+        extractor = extractor.fetch_database()
+
+    assert len(extractor.opened_sessions) == 1
+    assert len(ip21_server.requests) == 5
+    # Keep-alive: all the requests were sent through a single TCP connection.
+    assert len({request['client'] for request in ip21_server.requests}) == 1
+    assert '"samples"' in extractor.json_response
+
+
+def test_each_thread_gets_its_own_session (ip21_server):
+    extractor = build_extractor(ip21_server)
+    extractor = extractor.create_session(pool_size = 4, max_retries = 0)
+    sessions = {}
+    barrier = threading.Barrier(4)
+
+    def fetch (worker_index):
+        barrier.wait()
+        # The copies of the concurrent extraction share the session parameters:
+        worker_extractor = copy.copy(extractor)
+        worker_extractor.fetch_database()
+        worker_extractor.fetch_database()
+        sessions[worker_index] = worker_extractor.get_session()
+
+    threads = [threading.Thread(target = fetch, args = (i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions.values()}) == 4
+    assert len(extractor.opened_sessions) == 4
+    # The main thread has no session yet: a new one is created for it.
+    assert extractor.get_session() not in sessions.values()
+
+
+def test_failed_calls_are_retried (ip21_server):
+    extractor = build_extractor(ip21_server)
+    extractor = extractor.create_session(max_retries = 3, retry_backoff_factor = 0)
+    ip21_server.failures_to_send = 2
+
+    extractor = extractor.fetch_database()
+
+    assert len(ip21_server.requests) == 3
+    assert '"samples"' in extractor.json_response
+
+
+def test_slow_responses_time_out (ip21_server):
+    extractor = build_extractor(ip21_server)
+    extractor = extractor.create_session(max_retries = 1, retry_backoff_factor = 0, timeout_seconds = 0.2)
+    ip21_server.delay_seconds = 1
+
+    with pytest.raises(requests.exceptions.RequestException):
+        extractor.fetch_database()
+
+    # The first call and one retry:
+    assert len(ip21_server.requests) == 2
+
+
+def test_concurrent_extraction_matches_serial_windows (ip21_server):
+    tags = [{'tag': f'TAG-{i}', 'actual_name': None} for i in range(3)]
+    results = []
+
+    for max_concurrent_requests, time_windows_per_tag in [(1, 1), (4, 4), (4, 'auto')]:
+        extractor = build_extractor(ip21_server)
+        extractor.max_rows_per_call = 2000
+        returned = extractor.concurrent_extraction([dict(tag) for tag in tags], START_TIME, STOP_TIME, max_concurrent_requests = max_concurrent_requests, time_windows_per_tag = time_windows_per_tag)
+        results.append([returned_tag['dataset'] for returned_tag in returned])
+
+    for datasets in results[1:]:
+        for dataset, reference in zip(datasets, results[0]):
+            assert len(dataset) == 7201
+            assert dataset.equals(reference)
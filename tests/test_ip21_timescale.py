@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from idsw import InvalidInputsError
+from idsw.datafetch import core
+
+# Reference epochs of the previous (element by element) conversions, as (timestamp, IP21 value):
+REFERENCE_EPOCHS = [
+    (pd.Timestamp('06-21-2022 0:00:00.001', unit = 'ns'), 1655780400001),
+    (pd.Timestamp('06-21-2022', unit = 'd'), 1655780400000),
+    (pd.Timestamp('06-20-2022', unit = 'd'), 1655694000000),
+    (pd.Timestamp('01-01-2018', unit = 'd'), 1514772000000),
+    (pd.Timestamp('01-01-2000', unit = 'd'), 946692000000),
+    (pd.Timestamp('01-01-1970', unit = 'd'), 10800000),
+    (pd.Timestamp('01-01-1960', unit = 'd'), -315608400000)
+]
+
+OFFSETS = [pd.Timedelta(0), pd.Timedelta(1, 'ms'), pd.Timedelta(-1, 'ms'), pd.Timedelta(499999, 'ns'), pd.Timedelta(500001, 'ns'), pd.Timedelta(37, 'h'), pd.Timedelta(-400, 'D')]
+
+
+def reference_to_ip21 (timestamp, reference_selection_timestamp):
+    # Previous IP21Extractor.convert_window_to_ip21_timescale, for a single timestamp:
+    for reference, reference_ip21 in REFERENCE_EPOCHS:
+        if (reference_selection_timestamp >= reference):
+            break
+    return int(np.rint(reference_ip21 + (timestamp - reference).value / (10**6)))
+
+
+def reference_to_timestamps (ip21time_array):
+    # Previous IP21Extractor.convert_ip21_timescale_array_to_timestamp: the reference is picked from the
+    # first element of the input (label 0), and the timestamps are returned in ascending order.
+    ip21time_window = pd.Series(ip21time_array).sort_values(ascending = True)
+    start_ip21_scale = ip21time_window[0]
+    for reference, reference_ip21 in REFERENCE_EPOCHS:
+        if (start_ip21_scale >= reference_ip21):
+            break
+    return pd.Series([reference + pd.Timedelta(value - reference_ip21, 'ms') for value in ip21time_window])
+
+
+@pytest.mark.parametrize("reference, reference_ip21", REFERENCE_EPOCHS)
+def test_timestamps_to_ip21_match_the_reference_epochs (reference, reference_ip21):
+    timestamps = [reference + offset for offset in OFFSETS]
+
+    for start in timestamps:
+        window = [start, start + pd.Timedelta(3, 'D')]
+        converted = core.convert_timestamps_to_ip21_timescale(window, reference_selection_timestamp = start)
+        assert converted.dtype == np.int64
+        assert list(converted) == [reference_to_ip21(timestamp, start) for timestamp in window]
+
+
+@pytest.mark.parametrize("reference, reference_ip21", REFERENCE_EPOCHS)
+def test_ip21_to_timestamps_match_the_reference_epochs (reference, reference_ip21):
+    ip21time_array = np.array([reference_ip21 + offset for offset in [0, 1, -1, 1000, 86400000, -86400000 * 400]], dtype = np.int64)
+    extractor = core.IP21Extractor(None)
+
+    for first_index in range(len(ip21time_array)):
+        # Each element is tried as the first one (the one that picks the reference):
+        unsorted_array = np.roll(ip21time_array, -first_index)
+        extractor.ip21time_array = unsorted_array
+        extractor = extractor.convert_ip21_timescale_array_to_timestamp()
+        expected = reference_to_timestamps(unsorted_array)
+        assert list(extractor.timestamp_series) == list(expected)
+
+
+def test_round_trip_keeps_the_order_of_the_elements ():
+    timestamps = pd.to_datetime(['2023-05-01 10:00:00.123', '2019-02-03 00:00:00.000', '2023-05-01 09:00:00.000'])
+    ip21time_array = core.convert_timestamps_to_ip21_timescale(timestamps)
+    converted = core.convert_ip21_timescale_to_timestamps(ip21time_array)
+    assert list(converted) == list(timestamps.to_numpy())
+
+
+def test_missing_timestamps_raise ():
+    with pytest.raises(InvalidInputsError):
+        core.convert_timestamps_to_ip21_timescale([pd.Timestamp('2023-01-01'), pd.NaT])
+
+
+def test_missing_ip21_values_are_converted_to_nat ():
+    # The missing first element does not pick the reference: the first valid value does.
+    converted = core.convert_ip21_timescale_to_timestamps([np.nan, 1655780400001, None, 1655780401001])
+    expected = reference_to_timestamps([1655780400001, 1655780401001])
+    assert pd.isna(converted[0]) and pd.isna(converted[2])
+    assert list(converted[[1, 3]]) == list(expected)
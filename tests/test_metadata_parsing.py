@@ -0,0 +1,47 @@
+import json
+import datetime
+
+import pytest
+
+from idsw.datafetch import texts
+
+SEPARATOR = '\n\n-----\n\n'
+METADATA = [{'source': f'file_{i}.pdf', 'page': i, 'flags': [True, None], 'title': f"O'Neil {i}"} for i in range(57)]
+
+
+@pytest.mark.parametrize("max_workers, batch_size", [(None, 10000), (1, 5), (3, 5), (4, 1)])
+def test_parsed_dicts_keep_the_order_of_the_strings (max_workers, batch_size):
+    # Python literals (parsed by ast) and JSON strings (parsed by json) mixed in the same list:
+    strings = [(str(meta) if (i % 2 == 0) else json.dumps(meta)) for i, meta in enumerate(METADATA)]
+
+    assert texts.convert_str_to_dicts(strings, max_workers = max_workers, batch_size = batch_size) == METADATA
+
+
+def test_invalid_strings_raise_in_the_workers ():
+    strings = [str(meta) for meta in METADATA] + ['not a dict']
+
+    with pytest.raises(ValueError):
+        texts.convert_str_to_dicts(strings, max_workers = 2, batch_size = 10)
+
+
+def test_jsonl_database_round_trip (tmp_path):
+    file_path = str(tmp_path / 'metadata.jsonl')
+    texts.create_jsonl_metadata_db(file_path, METADATA[:30])
+    texts.create_jsonl_metadata_db(file_path, METADATA[30:], append = True)
+
+    assert texts.read_jsonl_metadata_db(file_path) == METADATA
+    assert texts.read_metadata_database(file_path) == METADATA
+
+
+def test_jsonl_database_stores_other_values_as_strings (tmp_path):
+    file_path = str(tmp_path / 'metadata.jsonl')
+    texts.create_jsonl_metadata_db(file_path, {'created': datetime.date(2024, 1, 31), 'pages': 3})
+
+    assert texts.read_jsonl_metadata_db(file_path) == [{'created': '2024-01-31', 'pages': 3}]
+
+
+def test_txt_metadata_database_is_parsed_in_order (tmp_path):
+    file_path = str(tmp_path / 'metadata.txt')
+    texts.create_txt_db(file_path, [str(meta) for meta in METADATA])
+
+    assert texts.read_metadata_database(file_path, max_workers = 3) == METADATA
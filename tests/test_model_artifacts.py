@@ -0,0 +1,97 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from idsw import ControlVars
+from idsw.datafetch import pipes
+
+
+@pytest.fixture(autouse = True)
+def silence_results ():
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+class FakeAnomalyDetector:
+    """Stand-in for idsw.modelling.core.AnomalyDetector (tensorflow), which is saved through its attributes."""
+
+    def __init__ (self):
+        self.mu = None
+        self.var = None
+
+
+@pytest.fixture
+def model ():
+    weights = np.random.default_rng(0).normal(size = (300, 100))
+    # The same array referenced twice, a small array, and a structured array:
+    return {'weights': weights, 'tied_weights': weights, 'bias': np.arange(10.0),
+            'records': np.zeros(20000, dtype = [('tag', 'i4'), ('value', 'f8')]), 'name': 'model'}
+
+
+def test_large_arrays_are_memory_mapped (tmp_path, model):
+    artifact_directory = str(tmp_path / 'model')
+    manifest = pipes.export_model_artifact(model, artifact_directory)
+
+    assert sorted(os.listdir(artifact_directory)) == ['array_00000.npy', 'array_00001.npy', 'manifest.json', 'model.pkl']
+    assert [array['shape'] for array in manifest['arrays']] == [[300, 100], [20000]]
+
+    loaded = pipes.import_model_artifact(artifact_directory)
+
+    assert isinstance(loaded['weights'], np.memmap) and (loaded['weights'].mode == 'c')
+    assert isinstance(loaded['records'], np.memmap)
+    assert not isinstance(loaded['bias'], np.memmap)
+    # The shared reference is loaded once:
+    assert loaded['tied_weights'] is loaded['weights']
+    for key in ['weights', 'bias', 'records']:
+        assert np.array_equal(loaded[key], model[key])
+    assert loaded['name'] == 'model'
+
+
+def test_writes_to_the_loaded_arrays_do_not_modify_the_artifact (tmp_path, model):
+    artifact_directory = str(tmp_path / 'model')
+    pipes.export_model_artifact(model, artifact_directory)
+
+    loaded = pipes.import_model_artifact(artifact_directory)
+    loaded['weights'][:] = 0
+
+    assert np.array_equal(pipes.import_model_artifact(artifact_directory)['weights'], model['weights'])
+
+
+def test_arrays_are_read_without_memory_map (tmp_path, model):
+    artifact_directory = str(tmp_path / 'model')
+    pipes.export_model_artifact(model, artifact_directory)
+
+    loaded = pipes.import_model_artifact(artifact_directory, memory_map = False)
+
+    assert type(loaded['weights']) is np.ndarray
+    assert np.array_equal(loaded['weights'], model['weights'])
+
+
+def test_export_replaces_the_previous_artifact (tmp_path, model):
+    artifact_directory = str(tmp_path / 'model')
+    pipes.export_model_artifact(model, artifact_directory)
+    pipes.export_model_artifact({'weights': np.ones((200, 100))}, artifact_directory)
+
+    assert sorted(os.listdir(tmp_path)) == ['model']
+    assert sorted(os.listdir(artifact_directory)) == ['array_00000.npy', 'manifest.json', 'model.pkl']
+    assert np.array_equal(pipes.import_model_artifact(artifact_directory)['weights'], np.ones((200, 100)))
+
+
+def test_anomaly_detector_round_trip (tmp_path, monkeypatch):
+    monkeypatch.setattr(pipes, 'AnomalyDetector', FakeAnomalyDetector)
+    detector = FakeAnomalyDetector()
+    detector.mu, detector.var = np.linspace(0, 1, 50000), np.full(50000, 2.0)
+
+    pipes.import_export_model_list_dict(action = 'export', model_file_name = 'detector', directory_path = str(tmp_path), model_type = 'anomaly_detector', model_to_export = detector, use_mmap_artifact = True)
+    with open(tmp_path / 'detector' / 'manifest.json', 'r') as opened_file:
+        assert json.load(opened_file)['model_type'] == 'anomaly_detector'
+
+    loaded = pipes.import_export_model_list_dict(action = 'import', model_file_name = 'detector', directory_path = str(tmp_path), model_type = 'anomaly_detector', use_mmap_artifact = True)
+
+    assert isinstance(loaded, FakeAnomalyDetector)
+    assert isinstance(loaded.mu, np.memmap)
+    assert np.array_equal(loaded.mu, detector.mu) and np.array_equal(loaded.var, detector.var)
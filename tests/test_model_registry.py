@@ -0,0 +1,154 @@
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from idsw import ControlVars
+from idsw.datafetch import core, pipes
+
+
+@pytest.fixture(autouse = True)
+def session_registry (monkeypatch):
+    # Each test starts without the registry of the session:
+    monkeypatch.delattr(core.Connectors, 'model_registry', raising = False)
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+def write_file (path, content):
+    with open(path, 'wb') as opened_file:
+        opened_file.write(content)
+    return str(path)
+
+
+class CountingLoader:
+    """Loader of the files of the tests, counting the loads of each path."""
+
+    def __init__ (self):
+        self.loads = []
+
+    def __call__ (self, path):
+        def load ():
+            self.loads.append(path)
+            with open(path, 'rb') as opened_file:
+                return {'path': path, 'content': opened_file.read()}
+        return load
+
+
+def test_least_recently_used_models_are_evicted (tmp_path):
+    registry = core.ModelRegistry(max_models = 2)
+    loader = CountingLoader()
+    paths = {name: write_file(tmp_path / name, b'x' * 10) for name in ['a', 'b', 'c']}
+
+    def get (name):
+        return registry.get_model(name, loader(paths[name]), [paths[name]])
+
+    model_a = get('a')
+    get('b')
+    # 'a' becomes the most recently used, so 'b' is evicted by 'c':
+    assert get('a') is model_a
+    get('c')
+
+    assert list(registry.entries.keys()) == ['a', 'c']
+    get('b')
+    assert loader.loads == [paths['a'], paths['b'], paths['c'], paths['b']]
+    assert registry.get_stats() == {'models': 2, 'memory_mb': 20 / (1024**2), 'hits': 1, 'misses': 4, 'evictions': 2, 'hit_rate': 0.2}
+
+
+def test_memory_limit_evicts_models_but_keeps_the_newest (tmp_path):
+    registry = core.ModelRegistry(max_models = None, max_memory_mb = 1)
+    loader = CountingLoader()
+    small_path = write_file(tmp_path / 'small', b'x' * (300 * 1024))
+    medium_path = write_file(tmp_path / 'medium', b'x' * (600 * 1024))
+    large_path = write_file(tmp_path / 'large', b'x' * (2 * 1024 * 1024))
+
+    registry.get_model('small', loader(small_path), [small_path])
+    registry.get_model('medium', loader(medium_path), [medium_path])
+    assert len(registry.entries) == 2
+
+    # Larger than the limit alone: it is kept, and the others are evicted.
+    registry.get_model('large', loader(large_path), [large_path])
+    assert list(registry.entries.keys()) == ['large']
+    assert registry.total_bytes == 2 * 1024 * 1024
+
+
+def test_models_are_reloaded_when_their_files_change (tmp_path):
+    registry = core.ModelRegistry()
+    loader = CountingLoader()
+    path = write_file(tmp_path / 'model.pkl', b'version 1')
+    first = registry.get_model('model', loader(path), [path])
+
+    # Same size, new modification time:
+    write_file(path, b'version 2')
+    stat = os.stat(path)
+    os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    second = registry.get_model('model', loader(path), [path])
+    assert (second is not first) and (second['content'] == b'version 2')
+
+    # Same modification time, new size:
+    stat = os.stat(path)
+    write_file(path, b'version 3, longer')
+    os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns))
+    third = registry.get_model('model', loader(path), [path])
+    assert third['content'] == b'version 3, longer'
+
+    assert registry.get_model('model', loader(path), [path]) is third
+    assert len(loader.loads) == 3
+    assert len(registry.entries) == 1
+
+
+def test_concurrent_requests_load_the_model_once (tmp_path):
+    registry = core.ModelRegistry()
+    path = write_file(tmp_path / 'model.pkl', b'model')
+    loads = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def slow_load ():
+        loads.append(1)
+        time.sleep(0.2)
+        return object()
+
+    def request ():
+        barrier.wait()
+        results.append(registry.get_model('model', slow_load, [path]))
+
+    threads = [threading.Thread(target = request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len({id(result) for result in results}) == 1
+
+
+class FakeAnomalyDetector:
+    """Stand-in for idsw.modelling.core.AnomalyDetector (tensorflow)."""
+
+    def __init__ (self):
+        self.mu = None
+
+
+def test_imported_models_are_kept_in_the_session_registry (tmp_path, monkeypatch):
+    monkeypatch.setattr(pipes, 'AnomalyDetector', FakeAnomalyDetector)
+    arguments = {'model_file_name': 'detector', 'directory_path': str(tmp_path), 'model_type': 'anomaly_detector', 'use_mmap_artifact': True}
+
+    def export (mu):
+        detector = FakeAnomalyDetector()
+        detector.mu = mu
+        pipes.import_export_model_list_dict(action = 'export', model_to_export = detector, **arguments)
+
+    export(np.zeros(20000))
+    first = pipes.import_export_model_list_dict(action = 'import', use_model_registry = True, **arguments)
+    assert pipes.import_export_model_list_dict(action = 'import', use_model_registry = True, **arguments) is first
+    assert core.Connectors.model_registry.get_stats()['hits'] == 1
+
+    # The artifact directory is watched: a new export is loaded by the next import.
+    export(np.ones(30000))
+    second = pipes.import_export_model_list_dict(action = 'import', use_model_registry = True, **arguments)
+    assert (second is not first) and np.array_equal(second.mu, np.ones(30000))
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from idsw.datafetch import core
+
+
+def build_response (values):
+    samples = ",".join('{"t":%d,"v":%s}' % (i, v) for i, v in enumerate(values))
+    return '{"data":[{"tag":"TAG","samples":[' + samples + ']}]}'
+
+
+def test_numeric_values_use_fast_path ():
+    parsed = core.parse_ip21_samples(build_response(['"12.5"', '3', '"-1e3"']))
+    assert parsed is not None
+    ip21time_array, values_array = parsed
+    np.testing.assert_array_equal(ip21time_array, [0, 1, 2])
+    np.testing.assert_array_equal(values_array, [12.5, 3.0, -1000.0])
+
+
+@pytest.mark.parametrize("value", ['"1,234.5"', '"12,5"'])
+def test_values_with_commas_fall_back_to_json_parsing (value):
+    # Regression: "1,234.5" used to be cut at the comma and parsed as 1.0
+    assert core.parse_ip21_samples(build_response(['"1.0"', value])) is None
+
+
+def test_non_numeric_values_fall_back_to_json_parsing ():
+    assert core.parse_ip21_samples(build_response(['"OPEN"', '"CLOSED"'])) is None
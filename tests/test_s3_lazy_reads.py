@@ -0,0 +1,79 @@
+import io
+
+import pandas as pd
+import pytest
+
+from idsw import ControlVars
+from idsw.datafetch import core, pipes
+
+CSV_CONTENT = "\n".join(["tag,value"] + [f"TAG-{i % 3},{i}" for i in range(50)]).encode()
+
+
+@pytest.fixture(autouse = True)
+def silence_results ():
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+class FakeS3Client:
+    """boto3 low-level client with the HEAD and ranged GET requests used by S3RangedFile."""
+
+    def __init__ (self, objects):
+        self.objects = objects
+
+    def head_object (self, Bucket, Key):
+        return {'ContentLength': len(self.objects[Key]), 'ETag': '"etag"'}
+
+    def get_object (self, Bucket, Key, Range, IfMatch = None):
+        start, stop = Range[len('bytes='):].split('-')
+        return {'Body': io.BytesIO(self.objects[Key][int(start):(int(stop) + 1)])}
+
+
+@pytest.fixture
+def opened_files (monkeypatch):
+    """Replace open_s3_object by S3RangedFiles over a fake client, and return the list of the opened files."""
+
+    buffer = io.BytesIO()
+    pd.DataFrame({'tag': ['a', 'b'], 'value': [1.0, 2.0]}).to_parquet(buffer)
+    client = FakeS3Client({'data.csv': CSV_CONTENT, 'data.parquet': buffer.getvalue(), 'broken.json': b'{"a": '})
+    opened_files = []
+
+    def open_s3_object (s3_uri, block_size_mb = 4, cache_size_mb = 256, cache_directory = None):
+        s3_file = core.S3RangedFile(client, 'bucket', s3_uri.split('/', 3)[-1], block_size_mb = 0.001, block_cache = core.S3BlockCache())
+        opened_files.append(s3_file)
+        return s3_file
+
+    monkeypatch.setattr(core, 'open_s3_object', open_s3_object)
+    return opened_files
+
+
+@pytest.mark.parametrize("file_name", ['data.csv', 'data.parquet'])
+def test_loaded_s3_objects_are_closed (opened_files, file_name):
+    dataset = pipes.load_pandas_dataframe('s3://bucket', file_name)
+
+    assert len(dataset) > 0
+    assert len(opened_files) == 1
+    assert opened_files[0].closed
+
+
+def test_s3_objects_are_closed_when_the_reading_fails (opened_files):
+    with pytest.raises(ValueError):
+        pipes.load_pandas_dataframe('s3://bucket', 'broken.json')
+
+    assert opened_files[0].closed
+
+
+def test_streamed_s3_objects_are_closed (opened_files):
+    chunks = pipes.stream_csv_chunks('s3://bucket', 'data.csv', chunksize = 10)
+    next(chunks)
+    assert not opened_files[0].closed
+
+    # Stopping before the last chunk:
+    chunks.close()
+    assert opened_files[0].closed
+
+    dataset = pipes.process_csv_in_chunks('s3://bucket', 'data.csv', chunk_transformations = None, chunksize = 10)
+    assert list(dataset['value']) == list(range(50))
+    assert opened_files[1].closed
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from idsw import ControlVars
+from idsw.datafetch import core
+
+
+@pytest.fixture(autouse = True)
+def silence_results ():
+    show_results = ControlVars.show_results
+    ControlVars.show_results = False
+    yield
+    ControlVars.show_results = show_results
+
+
+@pytest.fixture
+def connection (tmp_path):
+    connection = core.SQLiteConnection(str(tmp_path / 'database.db'))
+    yield connection
+    connection.close_fast_connection()
+
+
+def test_numpy_limits_filter_numeric_time_columns (connection):
+    df = pd.DataFrame({'time': np.arange(10, dtype = np.int64), 'value': np.arange(10) * 1.5})
+    connection = connection.fast_write_table('t', df)
+
+    for start, stop in [(np.int64(3), np.int64(7)), (np.float64(3), np.float64(7)), (3, 7.0)]:
+        # Numeric limits are compared with the stored numbers, not converted to timestamps:
+        selected = connection.fast_read_table('t', time_column = 'time', start_timestamp = start, stop_timestamp = stop)
+        assert list(selected['value']) == [4.5, 6.0, 7.5, 9.0]
+
+
+def test_timezone_aware_timestamps_are_stored_in_utc (connection):
+    timestamps = pd.to_datetime(['2024-01-01 00:00:00', '2024-01-01 01:00:00', '2024-01-01 02:00:00']).tz_localize('America/Sao_Paulo')
+    df = pd.DataFrame({'timestamp': timestamps, 'value': [1.0, 2.0, 3.0]})
+    connection = connection.fast_write_table('t', df)
+
+    read_df = connection.fast_read_table('t', time_column = 'timestamp')
+    assert list(read_df['timestamp']) == list(timestamps.tz_convert('UTC').tz_localize(None))
+
+    # Timezone-aware limits select the same instants:
+    selected = connection.fast_read_table('t', time_column = 'timestamp', start_timestamp = timestamps[1], stop_timestamp = pd.Timestamp('2024-01-01 06:00:00', tz = 'UTC'))
+    assert list(selected['value']) == [2.0, 3.0]
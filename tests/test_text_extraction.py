@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import types
+
+import pytest
+
+from idsw.datafetch import texts
+
+SEPARATOR = '\n\n-----\n\n'
+
+
+class FakeDocument:
+
+    def __init__ (self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+@pytest.fixture(autouse = True)
+def loaded_files (monkeypatch, tmp_path):
+    """Replace the langchain document loaders by a loader reading the txt files. Returns the list of loaded paths."""
+
+    loaded_files = []
+
+    class FakeLoader:
+
+        def __init__ (self, file_path, *args, **kwargs):
+            self.file_path = file_path
+
+        def load (self):
+            loaded_files.append(self.file_path)
+            with open(self.file_path, 'r') as opened_file:
+                return [FakeDocument(opened_file.read(), {'source': os.path.basename(self.file_path)})]
+
+    document_loaders = types.ModuleType('langchain_community.document_loaders')
+    for loader_name in ['PyPDFLoader', 'CSVLoader', 'UnstructuredHTMLLoader', 'Docx2txtLoader', 'TextLoader']:
+        setattr(document_loaders, loader_name, FakeLoader)
+
+    monkeypatch.setitem(sys.modules, 'langchain_community', types.ModuleType('langchain_community'))
+    monkeypatch.setitem(sys.modules, 'langchain_community.document_loaders', document_loaders)
+    monkeypatch.chdir(tmp_path)
+    return loaded_files
+
+
+def write_files (contents):
+    for file_name, content in contents.items():
+        with open(file_name, 'w') as opened_file:
+            opened_file.write(content)
+    return list(contents.keys())
+
+
+def read_manifest (manifest_path):
+    with open(manifest_path, 'r') as manifest_file:
+        return [json.loads(line) for line in manifest_file]
+
+
+def test_appended_databases_skip_the_files_already_extracted (loaded_files):
+    write_files({'a.txt': 'document a', 'b.txt': 'document b'})
+    texts.text_extraction(['a.txt', 'b.txt'], append_to_database = True)
+
+    # c.txt is new; d.txt is a copy of a.txt; b.txt is repeated in the list:
+    write_files({'c.txt': 'document c', 'd.txt': 'document a'})
+    del loaded_files[:]
+    new_texts, new_metadata, new_file_names = texts.text_extraction(['a.txt', 'b.txt', 'c.txt', 'd.txt', 'b.txt'], append_to_database = True)
+
+    assert loaded_files == ['c.txt']
+    assert (new_texts, new_file_names) == (['document c'], ['c.txt'])
+    assert texts.read_txt_database('extracted_text.txt') == ['document a', 'document b', 'document c']
+    assert texts.read_txt_database('file_names.txt') == ['a.txt', 'b.txt', 'c.txt']
+
+    # The path of the copy was registered, so it is not hashed again:
+    manifest = read_manifest('extracted_text_manifest.jsonl')
+    assert sorted(entry['file_name'] for entry in manifest) == ['a.txt', 'b.txt', 'c.txt', 'd.txt']
+
+
+def test_modified_files_are_extracted_again (loaded_files):
+    write_files({'a.txt': 'document a'})
+    texts.text_extraction(['a.txt'], append_to_database = True)
+    write_files({'a.txt': 'document A, modified'})
+    del loaded_files[:]
+
+    texts.text_extraction(['a.txt'], append_to_database = True)
+
+    assert loaded_files == ['a.txt']
+    assert texts.read_txt_database('extracted_text.txt') == ['document a', 'document A, modified']
+
+
+def test_rewritten_outputs_ignore_the_manifest (loaded_files, capsys):
+    write_files({'a.txt': 'document a', 'b.txt': 'document b'})
+    texts.text_extraction(['a.txt'], append_to_database = True, manifest_path = 'manifest.jsonl')
+    del loaded_files[:]
+
+    # Without the previous databases, the outputs are rewritten: a.txt must be extracted again.
+    returned_texts, _, _ = texts.text_extraction(['a.txt', 'b.txt'], manifest_path = 'manifest.jsonl')
+
+    assert loaded_files == ['a.txt', 'b.txt']
+    assert returned_texts == ['document a', 'document b']
+    assert texts.read_txt_database('extracted_text.txt') == ['document a', 'document b']
+    assert 'manifest.jsonl was ignored' in capsys.readouterr().out
+    assert [entry['file_name'] for entry in read_manifest('manifest.jsonl')] == ['a.txt']
+
+
+def test_combined_previous_databases_use_the_manifest (loaded_files):
+    write_files({'a.txt': 'document a', 'b.txt': 'document b'})
+    texts.text_extraction(['a.txt'], output_text_path = 'v1.txt', output_meta_path = 'v1_meta.txt', output_filenames_path = 'v1_names.txt', manifest_path = 'manifest.jsonl', append_to_database = True)
+    del loaded_files[:]
+
+    returned_texts, _, _ = texts.text_extraction(['a.txt', 'b.txt'], output_text_path = 'v2.txt', output_meta_path = 'v2_meta.txt', output_filenames_path = 'v2_names.txt',
+                                                 previous_text_database_path = 'v1.txt', previous_metadata_database_path = 'v1_meta.txt', previous_filenames_database_path = 'v1_names.txt', manifest_path = 'manifest.jsonl')
+
+    assert loaded_files == ['b.txt']
+    assert texts.read_txt_database('v2.txt') == ['document a', 'document b']
+    assert texts.read_txt_database('v2_names.txt') == ['a.txt', 'b.txt']
+
+
+def test_parallel_extraction_keeps_the_order_of_the_files ():
+    file_paths = write_files({f'file_{i}.txt': f'document {i}' for i in range(12)})
+
+    returned_texts, metadata, file_names = texts.text_extraction(file_paths, max_workers = 4)
+
+    assert returned_texts == [f'document {i}' for i in range(12)]
+    assert file_names == file_paths
+    assert [meta['source'] for meta in metadata] == file_paths
@@ -0,0 +1,99 @@
+import sys
+import mmap
+import types
+
+import numpy as np
+
+from idsw.datafetch import texts
+
+SEPARATOR = '\n\n-----\n\n'
+
+
+def full_scan (file_path):
+    return texts.build_txt_db_index(file_path, rebuild = True)
+
+
+def test_index_is_updated_with_the_appended_documents (tmp_path):
+    file_path = str(tmp_path / 'db.txt')
+    texts.create_txt_db(file_path, ['first', 'second document'], create_index = True)
+    offsets = np.load(file_path + '.idx.npy')
+
+    texts.create_txt_db(file_path, ['third', 'fourth'], append = True)
+    updated_offsets = np.load(file_path + '.idx.npy')
+
+    # The documents already indexed keep their offsets, and the new ones are added:
+    assert np.array_equal(updated_offsets[:2], offsets)
+    assert np.array_equal(updated_offsets, full_scan(file_path))
+
+    with texts.IndexedTxtDatabase(file_path) as db:
+        assert len(db) == 4
+        assert db[-1] == 'fourth'
+        assert db[1:3] == ['second document', 'third']
+        assert list(db) == texts.read_txt_database(file_path)
+
+
+def test_only_the_appended_bytes_are_scanned (tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'db.txt')
+    texts.create_txt_db(file_path, [f'document {i}' for i in range(100)], create_index = True)
+    indexed_size = np.load(file_path + '.idx.npy')[-1, 1]
+
+    with open(file_path, 'a') as opened_file:
+        opened_file.write(SEPARATOR + 'document 100')
+
+    # Record the positions where the separators are searched from:
+    scan_positions = []
+    class RecordingMmap (mmap.mmap):
+        def find (self, sub, start = None, *args):
+            scan_positions.append(start)
+            return super().find(sub, start, *args)
+
+    monkeypatch.setitem(sys.modules, 'mmap', types.SimpleNamespace(mmap = RecordingMmap, ACCESS_READ = mmap.ACCESS_READ))
+    offsets = texts.build_txt_db_index(file_path)
+
+    assert len(offsets) == 101
+    # The scan starts at the last indexed document, not at the beginning of the file:
+    assert min(scan_positions) >= offsets[99, 0]
+    assert min(scan_positions) < indexed_size
+
+
+def test_text_extraction_rebuilds_the_index_of_a_same_size_rewrite (tmp_path, monkeypatch):
+    document_loaders = types.ModuleType('langchain_community.document_loaders')
+
+    class FakeLoader:
+
+        def __init__ (self, file_path, *args, **kwargs):
+            self.file_path = file_path
+
+        def load (self):
+            with open(self.file_path, 'r') as opened_file:
+                return [types.SimpleNamespace(page_content = opened_file.read(), metadata = {'source': self.file_path})]
+
+    for loader_name in ['PyPDFLoader', 'CSVLoader', 'UnstructuredHTMLLoader', 'Docx2txtLoader', 'TextLoader']:
+        setattr(document_loaders, loader_name, FakeLoader)
+
+    monkeypatch.setitem(sys.modules, 'langchain_community', types.ModuleType('langchain_community'))
+    monkeypatch.setitem(sys.modules, 'langchain_community.document_loaders', document_loaders)
+    monkeypatch.chdir(tmp_path)
+
+    for file_name, content in [('a.txt', 'aaaa'), ('b.txt', 'bb')]:
+        with open(file_name, 'w') as opened_file:
+            opened_file.write(content)
+
+    texts.text_extraction(['a.txt', 'b.txt'])
+    texts.build_txt_db_index('extracted_text.txt')
+
+    # Same total size, but the separator moves: 'bb' + SEPARATOR + 'aaaa'
+    texts.text_extraction(['b.txt', 'a.txt'])
+
+    with texts.IndexedTxtDatabase('extracted_text.txt') as db:
+        assert list(db) == ['bb', 'aaaa']
+
+
+def test_create_txt_db_rebuilds_the_index_of_a_same_size_rewrite (tmp_path):
+    file_path = str(tmp_path / 'db.txt')
+    texts.create_txt_db(file_path, ['aaaa', 'bb', 'c'], create_index = True)
+
+    texts.create_txt_db(file_path, ['c', 'bb', 'aaaa'])
+
+    assert texts.read_txt_database(file_path, document_indices = [0, 2]) == ['c', 'aaaa']
+    assert np.array_equal(np.load(file_path + '.idx.npy'), full_scan(file_path))